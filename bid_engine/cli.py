@@ -0,0 +1,273 @@
+"""
+Command line interface for the Shift Bidding Engine.
+
+Only the engine is imported up front.  Each command imports what it needs
+(process pools, shared memory, the benchmark harness) when it runs, so
+starting the CLI stays cheap for short-lived workers.
+"""
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
+
+from .core.engine import EXPORT_FORMATS, BidEngine, ValidationError
+from .core.solvers import DRAFT_ORDERS
+
+if TYPE_CHECKING:
+    from .core.batch import GroupResult
+    from .core.benchmark import PhaseResult
+    from .core.scenarios import Scenario, ScenarioResult
+
+
+def load_scenarios(filename: str) -> List['Scenario']:
+    """
+    Loads scenarios from a JSON file.
+
+    The file holds a list of objects with a ``name`` and any of ``order``
+    (user IDs in priority order), ``rankings`` (path to a rankings CSV),
+    ``removed_shifts``, ``capacity`` (shift label to seats) and
+    ``excluded_users``.
+
+    Raises:
+        ValidationError: If the file is not a valid scenario list
+    """
+    from .core.scenarios import Scenario
+
+    try:
+        with open(filename) as file:
+            specs = json.load(file)
+    except (OSError, ValueError) as e:
+        raise ValidationError(f"Error loading scenarios: {str(e)}")
+    if not isinstance(specs, list):
+        raise ValidationError("Error loading scenarios: expected a JSON list")
+
+    scenarios = []
+    for index, spec in enumerate(specs, 1):
+        if not isinstance(spec, dict) or 'name' not in spec:
+            raise ValidationError(f"Error loading scenarios: entry {index} needs a name")
+        order = spec.get('order')
+        if 'rankings' in spec:
+            ranked = BidEngine()
+            ranked.import_user_rankings(spec['rankings'])
+            order = [user for user, _ in sorted(ranked.user_rankings, key=lambda x: x[1])]
+        try:
+            scenarios.append(Scenario(
+                name=str(spec['name']),
+                order=[int(user) for user in order] if order is not None else None,
+                removed_shifts=list(spec.get('removed_shifts', [])),
+                capacity={label: int(seats) for label, seats in spec.get('capacity', {}).items()},
+                excluded_users=[int(user) for user in spec.get('excluded_users', [])],
+            ))
+        except (TypeError, ValueError, AttributeError) as e:
+            raise ValidationError(
+                f"Error loading scenarios: entry {index} ({spec['name']}): {str(e)}")
+    return scenarios
+
+
+def write_scenario_results(results: List['ScenarioResult'], file) -> None:
+    """Writes scenario summaries as CSV."""
+    from .core.scenarios import ScenarioResult
+
+    writer = csv.writer(file)
+    writer.writerow(ScenarioResult._fields)
+    for result in results:
+        writer.writerow([
+            result.name, result.ranked, result.assigned, result.unassigned,
+            f"{result.first_choice_rate:.4f}", f"{result.mean_choice:.4f}",
+        ])
+
+
+def _scenarios_command(args: argparse.Namespace) -> None:
+    from .core.scenarios import run_scenarios
+
+    engine = BidEngine()
+    engine.import_user_selections(args.selections)
+    engine.import_user_rankings(args.rankings)
+    if args.capacity:
+        engine.import_shift_capacity(args.capacity)
+    results = run_scenarios(engine, load_scenarios(args.scenarios), processes=args.processes)
+
+    if args.output:
+        with open(args.output, 'w', newline='') as file:
+            write_scenario_results(results, file)
+    else:
+        write_scenario_results(results, sys.stdout)
+
+
+def write_batch_summary(results: List['GroupResult'], file) -> None:
+    """Writes one summary row per queue group as CSV."""
+    from .core.batch import GroupResult
+
+    writer = csv.writer(file)
+    writer.writerow(GroupResult._fields)
+    for result in results:
+        writer.writerow([
+            result.queue_group, result.status, result.ranked, result.assigned, result.unassigned,
+            f"{result.first_choice_rate:.4f}", f"{result.mean_choice:.4f}",
+            f"{result.seconds:.3f}", result.output, result.error, result.dropped_choices,
+        ])
+
+
+def _batch_command(args: argparse.Namespace) -> int:
+    from .core.batch import discover_groups, load_manifest, run_batch
+
+    if Path(args.source).is_dir():
+        groups = discover_groups(args.source, timezone=args.timezone,
+                                 shift_timezone=args.shift_timezone, solver=args.solver,
+                                 output_format=args.format, rounds=args.rounds,
+                                 draft_order=args.draft_order)
+    else:
+        groups = load_manifest(args.source)
+    results = run_batch(groups, args.output_dir, processes=args.processes)
+
+    summary_path = Path(args.output_dir) / 'summary.csv'
+    with open(summary_path, 'w', newline='') as file:
+        write_batch_summary(results, file)
+    write_batch_summary(results, sys.stdout)
+
+    failed = [result for result in results if result.status != 'done']
+    for result in failed:
+        print(f"Error: {result.queue_group}: {result.error}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def write_benchmark_results(results: List['PhaseResult'], file) -> None:
+    """Writes benchmark timings and peak memory as CSV."""
+    from .core.benchmark import PhaseResult
+
+    writer = csv.writer(file)
+    writer.writerow(PhaseResult._fields)
+    for result in results:
+        writer.writerow([result.users, result.phase, f"{result.seconds:.4f}", result.peak_bytes])
+
+
+def _diff_command(args: argparse.Namespace) -> None:
+    from .core.diff import diff_assignments, iter_assignment_file, write_changes, write_headcount
+
+    diff = diff_assignments(iter_assignment_file(args.before), iter_assignment_file(args.after),
+                            keep_unchanged=args.all)
+    if args.output:
+        with open(args.output, 'w', newline='') as file:
+            write_changes(diff, file)
+    else:
+        write_changes(diff, sys.stdout)
+    if args.headcount:
+        with open(args.headcount, 'w', newline='') as file:
+            write_headcount(diff, file)
+    print(', '.join(f"{status} {count}" for status, count in diff.counts.items()), file=sys.stderr)
+
+
+def _generate_command(args: argparse.Namespace) -> None:
+    from .core.synthetic import write_workload
+
+    paths = write_workload(Path(args.directory), args.users, shifts=args.shifts,
+                           min_choices=args.min_choices, max_choices=args.max_choices,
+                           skew=args.skew, seed=args.seed)
+    for path in paths:
+        print(path)
+
+
+def _bench_command(args: argparse.Namespace) -> int:
+    from .core.benchmark import (benchmark_startup, find_regressions, load_baseline,
+                                 run_benchmarks, save_baseline)
+
+    results = [benchmark_startup(repeat=args.repeat)]
+    results += run_benchmarks(args.users, repeat=args.repeat, shifts=args.shifts, seed=args.seed,
+                              directory=Path(args.workdir) if args.workdir else None)
+    write_benchmark_results(results, sys.stdout)
+
+    if args.save_baseline:
+        save_baseline(results, args.save_baseline)
+    if args.baseline:
+        regressions = find_regressions(results, load_baseline(args.baseline), args.tolerance)
+        for message in regressions:
+            print(f"Regression: {message}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Shift Bidding Engine command line tools.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scenarios = commands.add_parser('scenarios', help='Compare what-if variants of a bid')
+    scenarios.add_argument('selections', help='User selections CSV')
+    scenarios.add_argument('rankings', help='User rankings CSV')
+    scenarios.add_argument('scenarios', help='JSON file listing the scenarios to run')
+    scenarios.add_argument('--capacity', help='Shift capacity CSV')
+    scenarios.add_argument('--processes', type=int, default=None,
+                           help='Worker processes (default: all cores)')
+    scenarios.add_argument('--output', help='Write the summary CSV here instead of stdout')
+    scenarios.set_defaults(handler=_scenarios_command)
+
+    batch = commands.add_parser('batch', help='Run many queue groups in one invocation')
+    batch.add_argument('source', help='JSON manifest, or a directory with one sub-directory '
+                                      '(selections.csv, rankings.csv, capacity.csv) per queue group')
+    batch.add_argument('--output-dir', required=True,
+                       help='Directory for the exports and summary.csv')
+    batch.add_argument('--processes', type=int, default=None,
+                       help='Worker processes (default: all cores)')
+    batch.add_argument('--timezone', default='UTC',
+                       help='Timezone for exports of discovered groups (default: UTC)')
+    batch.add_argument('--shift-timezone', default='UTC',
+                       help='Timezone the shift labels of discovered groups are written in')
+    batch.add_argument('--solver', default='greedy', help='Solver for discovered groups')
+    batch.add_argument('--format', default='csv', choices=EXPORT_FORMATS,
+                       help='Export format for discovered groups (default: csv)')
+    batch.add_argument('--rounds', type=int, default=1,
+                       help='Items per user for discovered groups; more than 1 runs a draft')
+    batch.add_argument('--draft-order', default='snake', choices=DRAFT_ORDERS,
+                       help='Round order of a draft (default: snake)')
+    batch.set_defaults(handler=_batch_command)
+
+    diff = commands.add_parser('diff', help='Compare two assignment exports by user')
+    diff.add_argument('before', help='Earlier export (CSV or JSONL)')
+    diff.add_argument('after', help='Later export (CSV or JSONL)')
+    diff.add_argument('--output', help='Write the per-user changes CSV here instead of stdout')
+    diff.add_argument('--headcount', help='Write per-shift headcount deltas CSV here')
+    diff.add_argument('--all', action='store_true', help='Also list users whose shifts did not change')
+    diff.set_defaults(handler=_diff_command)
+
+    generate = commands.add_parser('generate', help='Write synthetic selections and rankings files')
+    generate.add_argument('directory', help='Directory to write selections.csv and rankings.csv to')
+    generate.add_argument('--users', type=int, default=1000, help='Number of users (default: 1000)')
+    generate.add_argument('--shifts', type=int, default=60, help='Shifts in the catalog (default: 60)')
+    generate.add_argument('--min-choices', type=int, default=1, help='Shortest preference list')
+    generate.add_argument('--max-choices', type=int, default=21, help='Longest preference list')
+    generate.add_argument('--skew', type=float, default=1.1,
+                          help='Zipf exponent for shift popularity (default: 1.1)')
+    generate.add_argument('--seed', type=int, default=0, help='Random seed')
+    generate.set_defaults(handler=_generate_command)
+
+    bench = commands.add_parser('bench', help='Time startup, import, assignment and export on '
+                                              'synthetic bids')
+    bench.add_argument('--users', type=int, nargs='+', default=[1000, 10000, 100000],
+                       help='Workload sizes to run (default: 1000 10000 100000)')
+    bench.add_argument('--repeat', type=int, default=3, help='Timed runs per size (default: 3)')
+    bench.add_argument('--shifts', type=int, default=60, help='Shifts in the catalog (default: 60)')
+    bench.add_argument('--seed', type=int, default=0, help='Random seed')
+    bench.add_argument('--workdir', help='Keep generated workloads here instead of a temp dir')
+    bench.add_argument('--baseline', help='Fail if results regress against this baseline JSON')
+    bench.add_argument('--save-baseline', help='Write the results as a baseline JSON file')
+    bench.add_argument('--tolerance', type=float, default=0.25,
+                       help='Allowed slowdown or memory growth as a fraction (default: 0.25)')
+    bench.set_defaults(handler=_bench_command)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point for the shift-bid console script."""
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args) or 0
+    except ValidationError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Batch runner for many independent queue groups.
+
+A batch is read from a JSON manifest or discovered from a directory with
+one sub-directory per queue group.  Every group is imported, assigned and
+exported in its own worker process; a failing group is reported in the
+summary without stopping the others.
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional
+
+from .engine import EXPORT_FORMATS, BidEngine, ValidationError
+from .solvers import DRAFT_ORDERS
+
+
+class QueueGroup(NamedTuple):
+    """One queue group's input files and options."""
+    name: str
+    selections: Path
+    rankings: Path
+    capacity: Optional[Path] = None
+    timezone: str = 'UTC'
+    shift_timezone: str = 'UTC'
+    solver: str = 'greedy'
+    output_format: str = 'csv'
+    # More than one round runs a multi-round draft instead of the solver
+    rounds: int = 1
+    draft_order: str = 'snake'
+    # Eligibility constraints: user attributes and shift requirements
+    attributes: Optional[Path] = None
+    requirements: Optional[Path] = None
+
+    @property
+    def output_name(self) -> str:
+        return f"user_item_assignments_{self.name}_{self.timezone}.{self.output_format}"
+
+    @property
+    def report_name(self) -> str:
+        """File listing the choices dropped for eligibility, next to the export."""
+        return f"ineligible_choices_{self.name}_{self.timezone}_{self.output_format}.csv"
+
+
+class GroupResult(NamedTuple):
+    """Outcome of one queue group in a batch."""
+    queue_group: str
+    status: str
+    ranked: int
+    assigned: int
+    unassigned: int
+    first_choice_rate: float
+    mean_choice: float
+    seconds: float
+    output: str
+    error: str
+    # Choices skipped because the user was not eligible for the shift
+    dropped_choices: int = 0
+
+
+def _check_name(name: str) -> str:
+    if not name or name in ('.', '..') or '/' in name or os.sep in name:
+        raise ValidationError(f"Invalid queue group name: {name!r}")
+    return name
+
+
+def load_manifest(filename: str) -> List[QueueGroup]:
+    """
+    Loads queue groups from a JSON manifest.
+
+    The file holds a list of objects with ``queue_group``, ``selections``
+    and ``rankings`` and optionally ``capacity``, ``attributes``,
+    ``requirements``, ``timezone``, ``shift_timezone``, ``solver``,
+    ``format``, ``rounds`` and ``draft_order``.  Relative paths are
+    resolved against the manifest's directory.
+
+    Raises:
+        ValidationError: If the file is not a valid manifest
+    """
+    try:
+        with open(filename) as file:
+            specs = json.load(file)
+    except (OSError, ValueError) as e:
+        raise ValidationError(f"Error loading manifest: {str(e)}")
+    if not isinstance(specs, list):
+        raise ValidationError("Error loading manifest: expected a JSON list")
+
+    base = Path(filename).parent
+    groups = []
+    for index, spec in enumerate(specs, 1):
+        if not isinstance(spec, dict) or not all(key in spec for key in
+                                                 ('queue_group', 'selections', 'rankings')):
+            raise ValidationError(
+                f"Error loading manifest: entry {index} needs queue_group, selections and rankings")
+        output_format = spec.get('format', 'csv')
+        if output_format not in EXPORT_FORMATS:
+            raise ValidationError(
+                f"Error loading manifest: entry {index} has unsupported format {output_format!r}")
+        rounds = spec.get('rounds', 1)
+        draft_order = spec.get('draft_order', 'snake')
+        if not isinstance(rounds, int) or rounds < 1 or draft_order not in DRAFT_ORDERS:
+            raise ValidationError(
+                f"Error loading manifest: entry {index} needs rounds >= 1 and draft_order "
+                f"in {DRAFT_ORDERS}")
+        groups.append(QueueGroup(
+            name=_check_name(str(spec['queue_group'])),
+            selections=base / spec['selections'],
+            rankings=base / spec['rankings'],
+            capacity=base / spec['capacity'] if spec.get('capacity') else None,
+            timezone=spec.get('timezone', 'UTC'),
+            shift_timezone=spec.get('shift_timezone', 'UTC'),
+            solver=spec.get('solver', 'greedy'),
+            output_format=output_format,
+            rounds=rounds,
+            draft_order=draft_order,
+            attributes=base / spec['attributes'] if spec.get('attributes') else None,
+            requirements=base / spec['requirements'] if spec.get('requirements') else None,
+        ))
+    _check_unique(groups)
+    return groups
+
+
+def discover_groups(directory: str, timezone: str = 'UTC', shift_timezone: str = 'UTC',
+                    solver: str = 'greedy', output_format: str = 'csv', rounds: int = 1,
+                    draft_order: str = 'snake') -> List[QueueGroup]:
+    """
+    Finds queue groups laid out as ``<directory>/<queue group>/``.
+
+    Each sub-directory holding ``selections.csv`` and ``rankings.csv`` (and
+    optionally ``capacity.csv``, ``attributes.csv`` and ``requirements.csv``)
+    is one group named after the directory.
+    All groups share the given options.
+
+    Raises:
+        ValidationError: If no group is found
+    """
+    groups = []
+    for folder in sorted(Path(directory).iterdir()):
+        selections = folder / 'selections.csv'
+        rankings = folder / 'rankings.csv'
+        if not (selections.is_file() and rankings.is_file()):
+            continue
+        capacity = folder / 'capacity.csv'
+        attributes = folder / 'attributes.csv'
+        requirements = folder / 'requirements.csv'
+        groups.append(QueueGroup(
+            name=folder.name,
+            selections=selections,
+            rankings=rankings,
+            capacity=capacity if capacity.is_file() else None,
+            timezone=timezone,
+            shift_timezone=shift_timezone,
+            solver=solver,
+            output_format=output_format,
+            rounds=rounds,
+            draft_order=draft_order,
+            attributes=attributes if attributes.is_file() else None,
+            requirements=requirements if requirements.is_file() else None,
+        ))
+    if not groups:
+        raise ValidationError(
+            f"No queue groups found in {directory}: expected sub-directories with "
+            f"selections.csv and rankings.csv")
+    return groups
+
+
+def _check_unique(groups: List[QueueGroup]) -> None:
+    seen = set()
+    for group in groups:
+        if group.output_name in seen:
+            raise ValidationError(f"Queue group {group.name!r} is listed twice with the same output")
+        seen.add(group.output_name)
+
+
+def run_group(group: QueueGroup, output_dir: Path) -> GroupResult:
+    """
+    Imports, assigns and exports one queue group, reporting errors in the result.
+
+    Groups with eligibility constraints also get ``group.report_name``
+    beside the export, listing every choice the constraints dropped.
+    """
+    started = time.perf_counter()
+    output = Path(output_dir) / group.output_name
+    try:
+        engine = BidEngine()
+        engine.shift_timezone = group.shift_timezone
+        engine.import_user_selections(group.selections)
+        engine.import_user_rankings(group.rankings)
+        if group.capacity is not None:
+            engine.import_shift_capacity(group.capacity)
+        if group.attributes is not None:
+            engine.import_user_attributes(group.attributes)
+        if group.requirements is not None:
+            engine.import_shift_requirements(group.requirements)
+        if group.rounds > 1:
+            picks = engine.draft(group.rounds, group.draft_order)
+        else:
+            picks = {user: [assignment]
+                     for user, assignment in engine.assign_items(solver=group.solver).items()}
+        engine.export_assignments(str(output), group.name, group.timezone,
+                                  output_format=group.output_format)
+        dropped = 0
+        if engine.eligibility:
+            dropped = engine.export_eligibility_report(str(Path(output_dir) / group.report_name))
+    except ValidationError as e:
+        return GroupResult(group.name, 'failed', 0, 0, 0, 0.0, 0.0,
+                           time.perf_counter() - started, '', str(e))
+
+    ranked = len({user for user, _ in engine.user_rankings})
+    assigned = len(picks)
+    # In a draft every pick counts; a user has at most one 1st-choice pick.  Shifts
+    # picked off a user's list have no choice number and aren't counted
+    choices = [choice for user_picks in picks.values() for _, choice in user_picks
+               if choice is not None]
+    return GroupResult(
+        queue_group=group.name,
+        status='done',
+        ranked=ranked,
+        assigned=assigned,
+        unassigned=ranked - assigned,
+        first_choice_rate=choices.count(1) / ranked if ranked else 0.0,
+        mean_choice=sum(choices) / len(choices) if choices else 0.0,
+        seconds=time.perf_counter() - started,
+        output=str(output),
+        error='',
+        dropped_choices=dropped,
+    )
+
+
+def run_batch(groups: Iterable[QueueGroup], output_dir: str,
+              processes: Optional[int] = None) -> List[GroupResult]:
+    """
+    Runs every queue group, writing each export into ``output_dir``.
+
+    Args:
+        groups: Queue groups to run
+        output_dir: Directory for the exports (created if missing)
+        processes: Worker processes; 1 runs in this process, None uses all cores
+
+    Returns:
+        One GroupResult per group, in input order
+    """
+    groups = list(groups)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if processes == 1 or len(groups) <= 1:
+        return [run_group(group, output_dir) for group in groups]
+
+    # Only pay for the process pool machinery when there is more than one worker
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = min(processes or os.cpu_count() or 1, len(groups))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_group, groups, [output_dir] * len(groups)))
@@ -0,0 +1,203 @@
+"""
+Benchmark harness for the bid pipeline.
+
+Each run writes a synthetic workload, then times import, assignment and
+export separately (best of ``repeat`` runs) and records the peak memory
+each phase allocates with tracemalloc in one extra traced run, so tracing
+overhead never leaks into the timings.  Cold start is measured the same
+way in fresh interpreters.  Results can be saved as a JSON baseline and
+later runs compared against it.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .engine import BidEngine, ValidationError
+from .synthetic import write_workload
+
+PHASES = ('import', 'assign', 'export')
+
+# Phases faster than this are too noisy to flag as regressions
+MIN_SECONDS = 0.01
+
+# Module whose cold import is timed as the 'startup' phase; the CLI pulls
+# in the core engine, which is what batch workers start from
+STARTUP_MODULE = 'bid_engine.cli'
+
+_STARTUP_SCRIPT = """
+import importlib, sys, time, tracemalloc
+if sys.argv[2] == 'trace':
+    tracemalloc.start()
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(time.perf_counter() - started, tracemalloc.get_traced_memory()[1])
+"""
+
+
+class PhaseResult(NamedTuple):
+    """Timing and memory for one pipeline phase at one workload size."""
+    users: int
+    phase: str
+    seconds: float
+    peak_bytes: int
+
+
+def _phases(selections: Path, rankings: Path) -> List[Tuple[str, Callable[[BidEngine], None]]]:
+    def load(engine: BidEngine) -> None:
+        engine.import_user_selections(selections)
+        engine.import_user_rankings(rankings)
+
+    def export(engine: BidEngine) -> None:
+        with open(os.devnull, 'w', newline='') as sink:
+            engine.export_assignments(sink, 'benchmark', engine.shift_timezone)
+
+    return [('import', load), ('assign', BidEngine.assign_items), ('export', export)]
+
+
+def _time_pipeline(phases) -> Dict[str, float]:
+    engine = BidEngine()
+    timings = {}
+    for name, run in phases:
+        started = time.perf_counter()
+        run(engine)
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def _trace_pipeline(phases) -> Dict[str, int]:
+    engine = BidEngine()
+    peaks = {}
+    for name, run in phases:
+        tracemalloc.start()
+        try:
+            run(engine)
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return peaks
+
+
+def benchmark_workload(selections: Path, rankings: Path, users: int,
+                       repeat: int = 3) -> List[PhaseResult]:
+    """Benchmarks the pipeline on existing selections and rankings files."""
+    phases = _phases(selections, rankings)
+    best: Dict[str, float] = {}
+    for _ in range(max(1, repeat)):
+        for name, seconds in _time_pipeline(phases).items():
+            best[name] = min(seconds, best.get(name, seconds))
+    peaks = _trace_pipeline(phases)
+    return [PhaseResult(users, name, best[name], peaks[name]) for name in PHASES]
+
+
+def _run_startup(module: str, trace: bool) -> Tuple[float, int]:
+    env = dict(os.environ)
+    # Import this checkout rather than whatever is installed
+    root = str(Path(__file__).resolve().parents[2])
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    process = subprocess.run([sys.executable, '-c', _STARTUP_SCRIPT, module,
+                              'trace' if trace else ''],
+                             capture_output=True, text=True, env=env)
+    if process.returncode != 0:
+        raise ValidationError(f"Error importing {module}: {process.stderr.strip()}")
+    seconds, peak = process.stdout.split()
+    return float(seconds), int(peak)
+
+
+def benchmark_startup(module: str = STARTUP_MODULE, repeat: int = 3) -> PhaseResult:
+    """
+    Times a cold import of ``module``, each run in a new interpreter.
+
+    Reported as phase ``startup`` with 0 users, so it is saved in and
+    checked against baselines like any other phase.
+
+    Raises:
+        ValidationError: If the module fails to import
+    """
+    seconds = min(_run_startup(module, trace=False)[0] for _ in range(max(1, repeat)))
+    return PhaseResult(0, 'startup', seconds, _run_startup(module, trace=True)[1])
+
+
+def run_benchmarks(sizes: Iterable[int], repeat: int = 3, shifts: int = 60,
+                   seed: int = 0, directory: Optional[Path] = None) -> List[PhaseResult]:
+    """
+    Generates a workload for each size and benchmarks it.
+
+    Args:
+        sizes: User counts to benchmark
+        repeat: Timed runs per size; the fastest is reported
+        shifts: Shifts in the synthetic catalog
+        seed: Seed for the workload generator
+        directory: Where to keep the generated files (default: a temporary
+            directory removed afterwards)
+    """
+    if directory is None:
+        with tempfile.TemporaryDirectory() as scratch:
+            return run_benchmarks(sizes, repeat, shifts, seed, Path(scratch))
+
+    results = []
+    for users in sizes:
+        selections, rankings = write_workload(Path(directory) / str(users), users,
+                                              shifts=shifts, seed=seed)
+        results.extend(benchmark_workload(selections, rankings, users, repeat))
+    return results
+
+
+def load_baseline(filename: str) -> Dict[str, Dict[str, dict]]:
+    """
+    Loads a baseline saved by save_baseline.
+
+    Raises:
+        ValidationError: If the file cannot be read
+    """
+    try:
+        with open(filename) as file:
+            return json.load(file)
+    except (OSError, ValueError) as e:
+        raise ValidationError(f"Error loading baseline: {str(e)}")
+
+
+def save_baseline(results: Iterable[PhaseResult], filename: str) -> None:
+    """Saves results as ``{users: {phase: {seconds, peak_bytes}}}`` JSON."""
+    baseline: Dict[str, Dict[str, dict]] = {}
+    for result in results:
+        baseline.setdefault(str(result.users), {})[result.phase] = {
+            'seconds': result.seconds,
+            'peak_bytes': result.peak_bytes,
+        }
+    with open(filename, 'w') as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+
+
+def find_regressions(results: Iterable[PhaseResult], baseline: Dict[str, Dict[str, dict]],
+                     tolerance: float = 0.25) -> List[str]:
+    """
+    Compares results with a baseline.
+
+    A phase regresses when its time or peak memory exceeds the baseline by
+    more than ``tolerance`` (a fraction).  Sizes or phases missing from the
+    baseline are skipped.
+
+    Returns:
+        One message per regression
+    """
+    regressions = []
+    for result in results:
+        reference = baseline.get(str(result.users), {}).get(result.phase)
+        if reference is None:
+            continue
+        limit = reference['seconds'] * (1 + tolerance)
+        if result.seconds > max(limit, MIN_SECONDS):
+            regressions.append(
+                f"{result.phase} at {result.users} users took {result.seconds:.3f}s "
+                f"(baseline {reference['seconds']:.3f}s)")
+        if result.peak_bytes > reference['peak_bytes'] * (1 + tolerance):
+            regressions.append(
+                f"{result.phase} at {result.users} users peaked at {result.peak_bytes} bytes "
+                f"(baseline {reference['peak_bytes']})")
+    return regressions
@@ -0,0 +1,141 @@
+"""
+Compact storage for shift labels and user preferences.
+
+Shift labels are long strings shared by thousands of users, so each distinct
+label is interned once in a ShiftCatalog and referred to by a dense integer
+ID everywhere else.  Preference lists are kept in a PreferenceMatrix: one
+padded, row-major ``array`` of shift IDs with a separate per-row length.
+"""
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+
+class ShiftCatalog:
+    """Interns shift labels to dense integer IDs (0, 1, 2, ...)."""
+
+    def __init__(self):
+        self.labels: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def intern(self, label: str) -> int:
+        """Returns the ID for a label, adding it to the catalog if new."""
+        shift_id = self.ids.get(label)
+        if shift_id is None:
+            shift_id = len(self.labels)
+            self.labels.append(label)
+            self.ids[label] = shift_id
+        return shift_id
+
+    def get(self, label: str) -> Optional[int]:
+        """Returns the ID for a label, or None if it is not in the catalog."""
+        return self.ids.get(label)
+
+    def truncate(self, size: int) -> None:
+        """Drops every label interned after the catalog had ``size`` entries."""
+        for label in self.labels[size:]:
+            del self.ids[label]
+        del self.labels[size:]
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __contains__(self, label: object) -> bool:
+        return label in self.ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.labels)
+
+
+class PreferenceMatrix:
+    """
+    Row-major matrix of shift IDs with one padded row per user.
+
+    Row ``r`` occupies ``data[r * width:(r + 1) * width]``; only the first
+    ``lengths[r]`` entries are meaningful and the rest hold PAD.  The width
+    grows to fit the longest row, which re-pads existing rows once.
+    """
+
+    PAD = -1
+
+    def __init__(self, width: int = 0):
+        self.width = width
+        self.data = array('i')
+        self.lengths = array('i')
+        self.users: List[int] = []
+        self.rows: Dict[int, int] = {}
+
+    def set_row(self, user: int, shift_ids: Sequence[int]) -> None:
+        """Stores a user's preference list, replacing any existing row."""
+        if len(shift_ids) > self.width:
+            self._widen(len(shift_ids))
+        row = self.rows.get(user)
+        if row is None:
+            row = len(self.users)
+            self.rows[user] = row
+            self.users.append(user)
+            self.lengths.append(0)
+            self.data.extend(array('i', [self.PAD]) * self.width)
+        base = row * self.width
+        padded = array('i', shift_ids)
+        padded.extend(array('i', [self.PAD]) * (self.width - len(shift_ids)))
+        self.data[base:base + self.width] = padded
+        self.lengths[row] = len(shift_ids)
+
+    def row(self, user: int) -> array:
+        """Returns a copy of a user's shift IDs, without padding."""
+        row = self.rows[user]
+        base = row * self.width
+        return self.data[base:base + self.lengths[row]]
+
+    def update(self, other: "PreferenceMatrix") -> None:
+        """Copies every row of another matrix into this one."""
+        if not self.rows:
+            self.width, self.data, self.lengths = other.width, other.data, other.lengths
+            self.users, self.rows = other.users, other.rows
+            return
+        for user in other.users:
+            self.set_row(user, other.row(user))
+
+    def _widen(self, width: int) -> None:
+        """Re-pads every row to a new, larger width."""
+        data = array('i')
+        pad = array('i', [self.PAD]) * (width - self.width)
+        for row in range(len(self.users)):
+            base = row * self.width
+            data.extend(self.data[base:base + self.width])
+            data.extend(pad)
+        self.data = data
+        self.width = width
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    def __contains__(self, user: object) -> bool:
+        return user in self.rows
+
+
+class SelectionsView(Mapping):
+    """Read-only ``user -> [label, ...]`` view decoded from a PreferenceMatrix."""
+
+    def __init__(self, catalog: ShiftCatalog, preferences: PreferenceMatrix):
+        self._catalog = catalog
+        self._preferences = preferences
+
+    def __getitem__(self, user: int) -> List[str]:
+        labels = self._catalog.labels
+        return [labels[shift_id] for shift_id in self._preferences.row(user)]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._preferences.users)
+
+    def __len__(self) -> int:
+        return len(self._preferences)
+
+    def __contains__(self, user: object) -> bool:
+        return user in self._preferences
+
+
+def encode_selections(catalog: ShiftCatalog, selections: Iterable[str]) -> List[int]:
+    """Interns a list of labels and returns their shift IDs."""
+    return [catalog.intern(label) for label in selections]
@@ -0,0 +1,70 @@
+"""
+Staffing coverage heatmaps from assignments.
+
+Every distinct shift is turned once into a week-long mask of 15-minute
+slots; coverage is then the matrix product of per-shift headcounts with
+those masks, so the work grows with the catalog size rather than with the
+number of agents times slots.
+"""
+import csv
+from typing import IO, List, Optional, Sequence
+
+import numpy as np
+
+from .shifts import MINUTES_PER_DAY, ShiftRecord, parse_shift
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = MINUTES_PER_DAY // SLOT_MINUTES
+DAYS = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
+
+
+def shift_masks(records: Sequence[Optional[ShiftRecord]]) -> np.ndarray:
+    """
+    Builds a (shifts, 7 * 96) mask of the slots each shift covers.
+
+    A slot counts if its start time falls inside the shift.  Overnight
+    shifts carry into the next day and Saturday wraps to Sunday.
+    Unparseable shifts (None) cover nothing.
+    """
+    week = 7 * SLOTS_PER_DAY
+    masks = np.zeros((len(records), week), dtype=np.int32)
+    for shift_id, record in enumerate(records):
+        if record is None or not record.days:
+            continue
+        first = -(-record.start // SLOT_MINUTES)
+        last = -(-(record.start + record.duration) // SLOT_MINUTES)
+        days = np.flatnonzero([(record.days >> day) & 1 for day in range(7)])
+        slots = (days[:, None] * SLOTS_PER_DAY + np.arange(first, last)[None, :]) % week
+        masks[shift_id, slots.ravel()] = 1
+    return masks
+
+
+def coverage_matrix(labels: Sequence[str], shift_ids: Sequence[int]) -> np.ndarray:
+    """
+    Sums assigned shifts into a 7 x 96 headcount grid.
+
+    Args:
+        labels: Shift labels indexed by shift ID, as they should be shown
+        shift_ids: The shift ID of every assignment
+
+    Returns:
+        Integer array where [day, slot] is the number of agents on duty,
+        day 0 being Sunday and slot 0 starting at midnight
+    """
+    counts = np.bincount(np.asarray(shift_ids, dtype=np.int64), minlength=len(labels))
+    masks = shift_masks([parse_shift(label) for label in labels])
+    return (counts @ masks).reshape(7, SLOTS_PER_DAY)
+
+
+def slot_labels() -> List[str]:
+    """Returns the HH:MM start time of every slot in a day."""
+    return [f"{minutes // 60:02d}:{minutes % 60:02d}"
+            for minutes in range(0, MINUTES_PER_DAY, SLOT_MINUTES)]
+
+
+def write_coverage(coverage: np.ndarray, file: IO) -> None:
+    """Writes a coverage grid as CSV, one row per day."""
+    writer = csv.writer(file)
+    writer.writerow(['Day'] + slot_labels())
+    for day, row in zip(DAYS, coverage.tolist()):
+        writer.writerow([day] + row)
@@ -0,0 +1,464 @@
+"""
+Differences between two assignment results.
+
+Compares, for example, last quarter's export with this quarter's, or two
+re-runs of a stored session.  The earlier result is read into a hash
+table of user -> shifts and the later one is streamed past it, so each
+file is read once and only one user table is held.  Draft exports have
+one row per pick; a user's rows must be consecutive in the later file,
+as the engine writes them.  Both results must show shifts in the same
+timezone for their labels to match.
+"""
+import csv
+import io
+import json
+import os
+import re
+from codecs import BOM_UTF8
+from collections import Counter
+from contextlib import contextmanager
+from functools import partial
+from itertools import chain, groupby, islice
+from operator import itemgetter
+from typing import (IO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set,
+                    Tuple, Union)
+
+from .engine import CSVSource, ValidationError, _is_binary, open_csv_source
+
+MOVED = 'moved'
+UNCHANGED = 'unchanged'
+ASSIGNED = 'newly_assigned'
+UNASSIGNED = 'newly_unassigned'
+STATUSES = (MOVED, UNCHANGED, ASSIGNED, UNASSIGNED)
+
+CHANGES_HEADER = ["User", "Status", "Before", "After"]
+HEADCOUNT_HEADER = ["Shift", "Before", "After", "Delta"]
+
+# (user, shift or None for a ranked user without an assignment)
+AssignmentRow = Tuple[int, Optional[str]]
+
+NO_ASSIGNMENT = b'No assignment'
+# Bytes deleted to leave only each line's quotes
+_NOT_QUOTE_OR_NEWLINE = bytes(byte for byte in range(256) if byte not in b'"\n')
+# Bytes of an export read and matched at a time
+BLOCK_SIZE = 1 << 20
+# Rows of the later result joined at a time
+BATCH_ROWS = 1 << 16
+
+# Leading keys of the engine's JSONL export, matched at every line start so
+# the long selections list at the end of each record is never decoded.  A
+# line without them matches the empty alternative, leaving the user empty;
+# labels with escapes don't match and their record is decoded in full.
+_JSONL_PREFIX = re.compile(
+    rb'^(?:\{"user": (\d+), (?:"round": (?:\d+|null), )?"shift": (null|"[^"\\\n]*")|)[^\n]*\n?',
+    re.MULTILINE)
+
+
+class UserChange(NamedTuple):
+    """One user's shifts in both results; more than one only after a draft."""
+    user: int
+    status: str
+    before: Tuple[str, ...]
+    after: Tuple[str, ...]
+
+
+class ShiftDelta(NamedTuple):
+    """Headcount of one shift in both results."""
+    shift: str
+    before: int
+    after: int
+
+    @property
+    def delta(self) -> int:
+        return self.after - self.before
+
+
+class AssignmentDiff(NamedTuple):
+    """
+    Result of diff_assignments.
+
+    Attributes:
+        counts: Users per status; users unassigned in both are not counted
+        changes: Per-user changes in the order of the later result, then
+            users only the earlier one assigned; unchanged users only if
+            asked for
+        headcount: Every shift assigned in either result, by label
+    """
+    counts: Dict[str, int]
+    changes: List[UserChange]
+    headcount: List[ShiftDelta]
+
+    def to_dict(self) -> dict:
+        return {
+            'counts': self.counts,
+            'changes': [change._asdict() for change in self.changes],
+            'headcount': [dict(delta._asdict(), delta=delta.delta) for delta in self.headcount],
+        }
+
+
+def diff_assignments(before: Iterable[AssignmentRow], after: Iterable[AssignmentRow],
+                     keep_unchanged: bool = False) -> AssignmentDiff:
+    """
+    Hash-joins two assignment results on user ID.
+
+    Each user's shifts are reduced to one hashable value (None, a label,
+    or a tuple of draft picks), so the later result can be matched against
+    the earlier a batch of rows at a time: one comprehension finds the
+    users whose value differs, and only they are looked at one by one.
+
+    Args:
+        before: Rows of the earlier result
+        after: Rows of the later result, each user's rows consecutive
+        keep_unchanged: Also list users whose shifts didn't change
+
+    Returns:
+        Status counts, per-user changes and per-shift headcount deltas
+
+    Raises:
+        ValidationError: If a user's rows are split up in ``after``
+    """
+    rows = list(before)
+    held = dict(rows)
+    if len(held) != len(rows):
+        grouped: Dict[int, List[str]] = {}
+        for user, shift in rows:
+            picks = grouped.setdefault(user, [])
+            if shift is not None:
+                picks.append(shift)
+        held = {user: _picks_value(picks) for user, picks in grouped.items()}
+    del rows
+
+    counts = dict.fromkeys(STATUSES, 0)
+    changes: List[UserChange] = []
+    matched: Set[int] = set()
+    after_values: Counter = Counter()
+    old_value = held.get
+    for batch in _user_batches(after):
+        values = dict(batch)
+        if len(values) != len(batch):
+            values = _group_picks(batch)
+        if not matched.isdisjoint(values):
+            user = next(user for user in values if user in matched)
+            raise ValidationError(f"Rows for user {user} are not consecutive in the later result")
+        matched.update(values)
+        batch_values = Counter(values.values())
+        after_values.update(batch_values)
+
+        # Users whose value is equal in both are unchanged, or unassigned in both
+        changed = [user for user, new in values.items() if old_value(user) != new]
+        unassigned_both = batch_values[None]
+        for user in values if keep_unchanged else changed:
+            old, new = old_value(user), values[user]
+            if old == new:
+                if new is not None:
+                    changes.append(UserChange(user, UNCHANGED, _as_picks(old), _as_picks(new)))
+                continue
+            if old is None:
+                status = ASSIGNED
+            elif new is None:
+                status = UNASSIGNED
+                unassigned_both -= 1
+            elif sorted(_as_picks(old)) == sorted(_as_picks(new)):
+                status = UNCHANGED
+            else:
+                status = MOVED
+            counts[status] += 1
+            if status != UNCHANGED or keep_unchanged:
+                changes.append(UserChange(user, status, _as_picks(old), _as_picks(new)))
+        counts[UNCHANGED] += len(values) - len(changed) - unassigned_both
+
+    for user, old in held.items():
+        if old is not None and user not in matched:
+            counts[UNASSIGNED] += 1
+            changes.append(UserChange(user, UNASSIGNED, _as_picks(old), ()))
+
+    before_heads = _headcount(Counter(held.values()))
+    after_heads = _headcount(after_values)
+    headcount = [ShiftDelta(shift, before_heads[shift], after_heads[shift])
+                 for shift in sorted(before_heads.keys() | after_heads.keys())]
+    return AssignmentDiff(counts, changes, headcount)
+
+
+# A user's shifts as one hashable value: None, a label, or a tuple of draft picks
+PicksValue = Union[None, str, Tuple[str, ...]]
+
+
+def _picks_value(picks: List[str]) -> PicksValue:
+    if not picks:
+        return None
+    return picks[0] if len(picks) == 1 else tuple(picks)
+
+
+def _as_picks(value: PicksValue) -> Tuple[str, ...]:
+    if value is None:
+        return ()
+    return (value,) if isinstance(value, str) else value
+
+
+def _group_picks(batch: List[AssignmentRow]) -> Dict[int, PicksValue]:
+    """Groups a batch with several rows per user, which must be consecutive."""
+    values: Dict[int, PicksValue] = {}
+    for user, rows in groupby(batch, key=itemgetter(0)):
+        if user in values:
+            raise ValidationError(f"Rows for user {user} are not consecutive in the later result")
+        values[user] = _picks_value([shift for _, shift in rows if shift is not None])
+    return values
+
+
+def _user_batches(rows: Iterable[AssignmentRow]) -> Iterator[List[AssignmentRow]]:
+    """Yields about BATCH_ROWS rows at a time, never splitting a run of one user's rows."""
+    rows = iter(rows)
+    batch = list(islice(rows, BATCH_ROWS))
+    while batch:
+        following = list(islice(rows, BATCH_ROWS))
+        if following and following[0][0] == batch[-1][0]:
+            last = batch[-1][0]
+            cut = len(batch)
+            while cut and batch[cut - 1][0] == last:
+                cut -= 1
+            following[:0] = batch[cut:]
+            del batch[cut:]
+        if batch:
+            yield batch
+        batch = following
+
+
+def _headcount(values: Counter) -> Counter:
+    """Turns a count of picks values into a count of users per shift."""
+    heads = Counter()
+    for value, users in values.items():
+        for shift in _as_picks(value):
+            heads[shift] += users
+    return heads
+
+
+def iter_assignment_file(source: CSVSource) -> Iterator[AssignmentRow]:
+    """
+    Yields (user, shift or None) from an assignment export, CSV or JSONL.
+
+    The format is told from the first line.  CSV exports are read by their
+    ``User`` and ``Assigned Item`` columns, so draft exports with a
+    ``Round`` column work too; "No assignment" rows yield None.  Files are
+    read as bytes in blocks of whole lines and each block is matched with
+    one regex pass for the leading fields (CSV) or keys (JSONL) of every
+    line, so the selections that make up most of an export are never
+    decoded or split into fields; each distinct shift label is decoded
+    once.  Blocks with a line the pattern doesn't fit are parsed line by
+    line instead, with ``csv.reader`` for CSV so quoted fields spanning
+    lines are read as RFC 4180 has them.
+
+    Raises:
+        ValidationError: If the file is not an assignment export
+    """
+    context = "Error reading assignments"
+    try:
+        with _open_blocks(source) as blocks:
+            block = next((block for block in blocks if block.strip()), None)
+            if block is None:
+                return
+            block = block[len(BOM_UTF8):] if block.startswith(BOM_UTF8) else block
+            block = block.lstrip()
+            if block.startswith(b'{'):
+                yield from _jsonl_rows(chain([block], blocks))
+            else:
+                first, _, rest = block.partition(b'\n')
+                header = next(csv.reader([first.decode()]))
+                yield from _csv_rows(header, chain([rest] if rest else [], blocks))
+    except ValidationError as e:
+        raise ValidationError(f"{context}: {str(e)}", errors=e.errors)
+    except (OSError, UnicodeError, csv.Error) as e:
+        raise ValidationError(f"{context}: {str(e)}")
+
+
+@contextmanager
+def _open_blocks(source: CSVSource) -> Iterator[Iterator[bytes]]:
+    """Opens an export as blocks of whole lines of UTF-8; text sources are encoded."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as file:
+            yield _blocks(iter(partial(file.read, BLOCK_SIZE), b''))
+    elif hasattr(source, 'read') and _is_binary(source):
+        yield _blocks(iter(partial(source.read, BLOCK_SIZE), b''))
+    else:
+        with open_csv_source(source) as lines:
+            yield _blocks(_encoded_chunks(lines))
+
+
+def _encoded_chunks(lines: Iterable[str]) -> Iterator[bytes]:
+    """Encodes a text file or iterable of lines about BLOCK_SIZE characters at a time."""
+    read = getattr(lines, 'read', None)
+    if read is not None:
+        for chunk in iter(partial(read, BLOCK_SIZE), ''):
+            yield chunk.encode()
+        return
+    batch: List[str] = []
+    size = 0
+    for line in lines:
+        batch.append(line if line.endswith('\n') else line + '\n')
+        size += len(line)
+        if size >= BLOCK_SIZE:
+            yield ''.join(batch).encode()
+            batch, size = [], 0
+    if batch:
+        yield ''.join(batch).encode()
+
+
+def _blocks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Re-cuts chunks of a file at their last newline, so each block is whole lines."""
+    tail = b''
+    for chunk in chunks:
+        chunk = tail + chunk
+        cut = chunk.rfind(b'\n') + 1
+        tail = chunk[cut:]
+        if cut:
+            yield chunk[:cut]
+    if tail:
+        yield tail
+
+
+def _match_lines(pattern: 're.Pattern[bytes]', block: bytes,
+                 user_group: int) -> Optional[Tuple[Tuple[bytes, ...], ...]]:
+    """
+    Returns each captured group of every line of a block, in one regex pass.
+
+    The pattern matches each line in full, leaving the user empty if the
+    line doesn't fit, in which case None is returned.  The end is cut
+    before a final newline so the empty string after it isn't a line.
+    """
+    found = pattern.findall(block, 0, len(block) - block.endswith(b'\n'))
+    groups = tuple(zip(*found))
+    return None if b'' in groups[user_group] else groups
+
+
+class _Labels(dict):
+    """Decodes each distinct shift field once, so rows share one label object."""
+
+    def __init__(self, decode: Callable[[bytes], Optional[str]]):
+        super().__init__()
+        self.decode = decode
+
+    def __missing__(self, field: bytes) -> Optional[str]:
+        label = self[field] = self.decode(field)
+        return label
+
+
+def _jsonl_rows(blocks: Iterable[bytes]) -> Iterator[AssignmentRow]:
+    labels = _Labels(lambda shift: None if shift == b'null' else shift[1:-1].decode())
+    number = 0
+    for block in blocks:
+        groups = _match_lines(_JSONL_PREFIX, block, 0)
+        if groups is None:
+            lines = block.splitlines()
+            yield from _jsonl_lines(lines, number, labels)
+            number += len(lines)
+        else:
+            users, shifts = groups
+            yield from zip(map(int, users), map(labels.__getitem__, shifts))
+            number += len(users)
+
+
+def _jsonl_lines(lines: Iterable[bytes], number: int, labels: _Labels) -> Iterator[AssignmentRow]:
+    """Parses records one line at a time, decoding those the prefix doesn't match."""
+    for number, line in enumerate(lines, number + 1):
+        user, shift = _JSONL_PREFIX.match(line).groups()
+        if user:
+            yield int(user), labels[shift]
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            yield int(record['user']), record.get('shift')
+        except (ValueError, TypeError, KeyError):
+            raise ValidationError(
+                f"line {number}: Invalid assignment record: {line.strip().decode()!r}")
+
+
+def _leading_fields(user_col: int, item_col: int) -> 're.Pattern[bytes]':
+    """
+    Matches the fields of a CSV line up to its user and item columns.
+
+    The user is captured as digits and the item still quoted, in column
+    order; ``^`` matches at every line so a block is matched in one pass.
+    Lines that don't fit match the empty alternative with an empty user.
+    """
+    quoted = r'"[^"\n]*(?:""[^"\n]*)*"'
+    fields = []
+    for column in range(max(user_col, item_col) + 1):
+        if column == user_col:
+            fields.append(r'(\d+)')
+        elif column == item_col:
+            fields.append(rf'({quoted}|[^",\r\n]*)')
+        else:
+            fields.append(rf'(?:{quoted}|[^",\r\n]*)')
+    pattern = '^(?:' + ','.join(fields) + r'(?=,|\r?$)|)[^\n]*\n?'
+    return re.compile(pattern.encode(), re.MULTILINE)
+
+
+def _opens_quote(block: bytes) -> bool:
+    """Tells if a line of a block has an odd number of quotes, opening a field on the next."""
+    quotes = block.translate(None, _NOT_QUOTE_OR_NEWLINE)
+    # Escaped quotes in labels come in fours; dropping those first halves the pairs left
+    return b'"' in quotes.replace(b'""""', b'').replace(b'""', b'')
+
+
+def _item_label(item: bytes) -> Optional[str]:
+    if item == NO_ASSIGNMENT:
+        return None
+    return (item[1:-1].replace(b'""', b'"') if item.startswith(b'"') else item).decode()
+
+
+def _csv_rows(header: List[str], blocks: Iterable[bytes]) -> Iterator[AssignmentRow]:
+    if 'User' not in header or 'Assigned Item' not in header:
+        raise ValidationError("Missing required columns. Expected: ['User', 'Assigned Item']")
+    user_col = header.index('User')
+    item_col = header.index('Assigned Item')
+    pattern = _leading_fields(user_col, item_col)
+    labels = _Labels(_item_label)
+    number = 1
+    blocks = iter(blocks)
+    for block in blocks:
+        groups = _match_lines(pattern, block, int(item_col < user_col))
+        if groups is None or _opens_quote(block):
+            # An odd number of quotes leaves a field open at the end of the block
+            while block.count(b'"') % 2:
+                following = next(blocks, None)
+                if following is None:
+                    break
+                block += following
+            reader = csv.reader(io.StringIO(block.decode(), newline=''))
+            yield from _csv_records(reader, number, user_col, item_col)
+            number += reader.line_num
+        else:
+            users, items = groups if user_col < item_col else groups[::-1]
+            yield from zip(map(int, users), map(labels.__getitem__, items))
+            number += len(users)
+
+
+def _csv_records(reader: Iterator[List[str]], number: int, user_col: int,
+                 item_col: int) -> Iterator[AssignmentRow]:
+    """Parses rows one record at a time, reporting the first that doesn't fit."""
+    for row in reader:
+        if not any(field.strip() for field in row):
+            continue
+        if len(row) > max(user_col, item_col) and row[user_col].isdecimal():
+            item = row[item_col]
+            yield int(row[user_col]), None if item == NO_ASSIGNMENT.decode() else item
+        else:
+            raise ValidationError(f"line {number + reader.line_num}: "
+                                  f"Invalid data format in row: {','.join(row).strip()!r}")
+
+
+def write_changes(diff: AssignmentDiff, file: IO) -> None:
+    """Writes per-user changes as CSV; draft picks are joined with '; '."""
+    writer = csv.writer(file)
+    writer.writerow(CHANGES_HEADER)
+    for change in diff.changes:
+        writer.writerow([change.user, change.status, '; '.join(change.before), '; '.join(change.after)])
+
+
+def write_headcount(diff: AssignmentDiff, file: IO) -> None:
+    """Writes per-shift headcounts and deltas as CSV."""
+    writer = csv.writer(file)
+    writer.writerow(HEADCOUNT_HEADER)
+    for delta in diff.headcount:
+        writer.writerow([delta.shift, delta.before, delta.after, delta.delta])
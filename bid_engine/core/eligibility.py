@@ -0,0 +1,174 @@
+"""
+Eligibility constraints for shift bids.
+
+Users carry attributes (skills, queue licenses, roles) and an optional cap
+on weekly hours; shifts list the attributes they require.  Before a pass
+the constraints are compiled into one packed bitset over shift IDs per
+distinct (attributes, hour cap) profile, so users who share a profile share
+a bitset and the solvers skip an ineligible choice with a single bit test.
+Users who may take every shift get no bitset at all and pay nothing.
+"""
+import csv
+from typing import IO, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .catalog import PreferenceMatrix
+from .shifts import parse_shift
+
+NO_ATTRIBUTES: FrozenSet[str] = frozenset()
+# (attributes, weekly hour cap) of a user; users sharing one share a bitset
+Profile = Tuple[FrozenSet[str], Optional[float]]
+NO_PROFILE: Profile = (NO_ATTRIBUTES, None)
+REPORT_HEADER = ["User", "Choice #", "Shift", "Reason"]
+
+
+class IneligibleChoice(NamedTuple):
+    """One choice skipped because the user may not work the shift."""
+    user: int
+    choice: int
+    shift: str
+    reason: str
+
+
+def parse_attributes(text: str) -> FrozenSet[str]:
+    """Splits a ``;`` or ``,`` separated cell into a set of attribute names."""
+    return frozenset(part.strip() for part in text.replace(',', ';').split(';') if part.strip())
+
+
+def shift_hours(label: str) -> Optional[float]:
+    """Weekly hours of a shift label, or None if the label can't be parsed."""
+    record = parse_shift(label)
+    if record is None:
+        return None
+    return record.duration * bin(record.days).count('1') / 60
+
+
+def write_report(dropped: Iterable[IneligibleChoice], file: IO) -> None:
+    """Writes dropped choices as CSV to an open text stream."""
+    writer = csv.writer(file)
+    writer.writerow(REPORT_HEADER)
+    writer.writerows(dropped)
+
+
+def is_eligible(bits: Optional[bytes], shift_id: int) -> bool:
+    """Tests one shift ID against a compiled bitset (None allows every shift)."""
+    return bits is None or bool(bits[shift_id >> 3] >> (shift_id & 7) & 1)
+
+
+class Eligibility:
+    """
+    Per-user attributes and hour caps, and per-shift requirements.
+
+    A user may take a shift if they have every attribute it requires and,
+    when they have an hour cap, its weekly hours are within the cap.
+    Shifts whose labels don't parse have no known hours and are never
+    excluded by a cap.  Users with no attributes set can only take shifts
+    without requirements.  Change constraints with set_user and set_shift;
+    the dicts are read-only views for reports and storage.
+    """
+
+    def __init__(self):
+        self.user_attributes: Dict[int, FrozenSet[str]] = {}
+        self.max_hours: Dict[int, float] = {}
+        # Keyed by label so requirements can be set before the shift is interned
+        self.requirements: Dict[str, FrozenSet[str]] = {}
+        # Each user's profile, interned so compile looks profiles up by identity
+        self._profiles: Dict[int, Profile] = {}
+        self._interned: Dict[Profile, Profile] = {NO_PROFILE: NO_PROFILE}
+
+    def __bool__(self) -> bool:
+        """True if anything is restricted; attributes alone restrict nothing."""
+        return bool(self.requirements or self.max_hours)
+
+    def set_user(self, user: int, attributes: Iterable[str], max_hours: Optional[float] = None) -> None:
+        attributes = frozenset(attributes)
+        self.user_attributes[user] = attributes
+        if max_hours is None:
+            self.max_hours.pop(user, None)
+        else:
+            self.max_hours[user] = max_hours
+        profile = (attributes, max_hours)
+        self._profiles[user] = self._interned.setdefault(profile, profile)
+
+    def set_shift(self, label: str, requires: Iterable[str]) -> None:
+        requires = frozenset(requires)
+        if requires:
+            self.requirements[label] = requires
+        else:
+            self.requirements.pop(label, None)
+
+    def compile(self, labels: Sequence[str], users: Sequence[int]) -> Optional[List[Optional[bytes]]]:
+        """
+        Builds the eligibility bitset of every preference row.
+
+        Bit ``shift_id`` is set if the row's user may take that shift.  Each
+        distinct profile costs one pass over the restricted shifts; each row
+        then costs two dict lookups to reuse its profile's bitset.
+
+        Args:
+            labels: Shift catalog labels, indexed by shift ID
+            users: Users in preference-row order
+
+        Returns:
+            One bitset per row (None where every shift is allowed), or None
+            if nothing is restricted
+        """
+        if not self:
+            return None
+        required = [(shift_id, self.requirements[label]) for shift_id, label in enumerate(labels)
+                    if label in self.requirements]
+        # (weekly hours, shift ID), longest first, so a cap only walks the shifts over it
+        hours: List[Tuple[float, int]] = []
+        if self.max_hours:
+            weekly = ((shift_hours(label), shift_id) for shift_id, label in enumerate(labels))
+            hours = sorted((item for item in weekly if item[0] is not None), reverse=True)
+
+        size = (len(labels) + 7) // 8
+        masks = {id(profile): self._mask(profile, size, required, hours)
+                 for profile in self._interned.values()}
+        profile_of = self._profiles.get
+        return [masks[id(profile_of(user, NO_PROFILE))] for user in users]
+
+    @staticmethod
+    def _mask(profile: Profile, size: int,
+              required: List[Tuple[int, FrozenSet[str]]],
+              hours: List[Tuple[float, int]]) -> Optional[bytes]:
+        attributes, cap = profile
+        excluded = [shift_id for shift_id, needs in required if not needs <= attributes]
+        if cap is not None:
+            for weekly, shift_id in hours:
+                if weekly <= cap:
+                    break
+                excluded.append(shift_id)
+        if not excluded:
+            return None
+        bits = bytearray(b'\xff' * size)
+        for shift_id in excluded:
+            bits[shift_id >> 3] &= ~(1 << (shift_id & 7)) & 0xff
+        return bytes(bits)
+
+    def reason(self, user: int, label: str) -> Optional[str]:
+        """Why ``user`` may not take the shift ``label``, or None if they may."""
+        attributes = self.user_attributes.get(user, NO_ATTRIBUTES)
+        missing = self.requirements.get(label, NO_ATTRIBUTES) - attributes
+        if missing:
+            return f"requires {', '.join(sorted(missing))}"
+        cap = self.max_hours.get(user)
+        hours = shift_hours(label) if cap is not None else None
+        if hours is not None and hours > cap:
+            return f"{hours:g} hours a week is over the {cap:g} hour cap"
+        return None
+
+    def report(self, labels: Sequence[str], preferences: PreferenceMatrix) -> List[IneligibleChoice]:
+        """Lists every choice the solvers will skip, in preference-row order."""
+        rows = self.compile(labels, preferences.users)
+        if rows is None:
+            return []
+        dropped = []
+        for user, bits in zip(preferences.users, rows):
+            if bits is None:
+                continue
+            for choice, shift_id in enumerate(preferences.row(user), 1):
+                if not is_eligible(bits, shift_id):
+                    label = labels[shift_id]
+                    dropped.append(IneligibleChoice(user, choice, label, self.reason(user, label)))
+        return dropped
@@ -2,182 +2,1124 @@
 Core engine for the shift bidding system.
 """
 import csv
-from typing import Dict, List, Tuple, Set
-import pandas as pd
+import io
+import json
+import os
+from array import array
+from datetime import date
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from itertools import islice
+from typing import (Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional,
+                    Tuple, Set, Union, IO)
 from pathlib import Path
 
+from .catalog import PreferenceMatrix, SelectionsView, ShiftCatalog, encode_selections
+from .eligibility import Eligibility, IneligibleChoice, parse_attributes, write_report
+from .metrics import Profiler
+from .shifts import ShiftRecord, convert_labels, parse_shift
+from .solvers import DRAFT_ORDERS, Solver, draft, get_solver
+
+# Anything the importers can read from: a path, an open text or binary file
+# (including upload streams), or an iterable of already-decoded lines.
+CSVSource = Union[str, "os.PathLike[str]", IO, Iterable[str]]
+
+EXPORT_HEADER = ["User", "Assigned Item", "Choice #", "Rank", "All Selections"]
+DRAFT_EXPORT_HEADER = ["User", "Round", "Assigned Item", "Choice #", "Rank", "All Selections"]
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+# Row-level errors are collected so one pass reports every bad line, but the
+# message is capped to keep flash messages readable on badly broken files.
+MAX_REPORTED_ERRORS = 20
+
 
 class ValidationError(Exception):
     """Raised when input data validation fails."""
-    pass
+
+    def __init__(self, message: str, errors: Optional[List[str]] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+class ChoiceExplanation(NamedTuple):
+    """
+    Why a user did or didn't get one of their choices.
+
+    ``outcome`` is 'assigned', 'full' (every seat went to someone else),
+    'closed' (the shift has no seats), 'ineligible' (the user may not take
+    the shift, for the reason in ``constraint``) or 'open' (a seat was left,
+    which the greedy solver never does above a user's assigned choice).  For
+    full shifts, ``filled_by`` is the user who took the last seat.
+    """
+    choice: int
+    shift: str
+    outcome: str
+    seats: int
+    taken: int
+    filled_by: Optional[int] = None
+    filled_by_rank: Optional[int] = None
+    filled_by_choice: Optional[int] = None
+    constraint: Optional[str] = None
+
+    @classmethod
+    def build(cls, choice: int, shift: str, assigned: bool, seats: int, taken: int,
+              last_holder: Optional[Tuple[int, Optional[int], int]],
+              constraint: Optional[str] = None) -> "ChoiceExplanation":
+        """
+        Classifies one choice from its seat count and last (user, rank, choice)
+        holder; ``constraint`` is why the user may not take the shift, if so.
+        """
+        if assigned:
+            return cls(choice, shift, 'assigned', seats, taken)
+        if constraint is not None:
+            return cls(choice, shift, 'ineligible', seats, taken, constraint=constraint)
+        if not seats:
+            return cls(choice, shift, 'closed', seats, taken)
+        if taken < seats or last_holder is None:
+            return cls(choice, shift, 'open', seats, taken)
+        return cls(choice, shift, 'full', seats, taken, *last_holder)
+
+    def describe(self) -> str:
+        """One-line reason, e.g. "taken by rank 12 at their 2nd choice"."""
+        if self.outcome == 'assigned':
+            return f"assigned as your {BidEngine._ordinal(self.choice)} choice"
+        if self.outcome == 'closed':
+            return "no seats on this shift"
+        if self.outcome == 'ineligible':
+            return f"not eligible: {self.constraint}"
+        if self.outcome == 'open':
+            return f"{self.seats - self.taken} of {self.seats} seats still open"
+        rank = 'unranked user' if self.filled_by_rank is None else f"rank {self.filled_by_rank}"
+        reason = f"taken by {rank} at their {BidEngine._ordinal(self.filled_by_choice)} choice"
+        if self.seats > 1:
+            reason += f" (last of {self.seats} seats)"
+        return reason
+
+    def to_dict(self) -> dict:
+        return dict(self._asdict(), reason=self.describe())
+
+
+@contextmanager
+def open_csv_source(source: CSVSource) -> Iterator[Iterable[str]]:
+    """
+    Opens any supported CSV source as an iterable of text lines.
+
+    Paths are opened (and closed) here; file-like objects are wrapped but
+    left open for the caller.  Binary streams are decoded as UTF-8, with a
+    leading byte order mark from spreadsheet exports removed.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, mode='r', newline='', encoding='utf-8-sig') as file:
+            yield file
+        return
+
+    if hasattr(source, 'read') and _is_binary(source):
+        wrapper = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+        try:
+            yield wrapper
+        finally:
+            # Don't let the wrapper close a stream we don't own.
+            wrapper.detach()
+        return
+
+    yield source
+
+
+def _is_binary(stream: IO) -> bool:
+    """Returns True if a file-like object yields bytes rather than str."""
+    if isinstance(stream, io.TextIOBase):
+        return False
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+        return True
+    return 'b' in getattr(stream, 'mode', '')
+
+
+def _read_header(reader: Iterator[List[str]]) -> List[str]:
+    """Returns the stripped header row, or raises if the file is empty."""
+    header = next(reader, None)
+    if header is None:
+        raise ValidationError("CSV file is empty")
+    return [col.strip() for col in header]
+
+
+def _profiled(phase: str) -> Callable:
+    """Decorates a BidEngine method to run as one profiler phase."""
+    def decorate(method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self._phase(phase):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _raise_row_errors(context: str, errors: List[str], total: int) -> None:
+    """Raises a single ValidationError summarising collected row errors."""
+    shown = errors[:MAX_REPORTED_ERRORS]
+    message = f"{context}: {total} invalid row(s): " + "; ".join(shown)
+    if total > len(shown):
+        message += f"; ... {total - len(shown)} more"
+    raise ValidationError(message, errors=errors)
 
 
 class BidEngine:
+    DEFAULT_CAPACITY = 1
+
     def __init__(self):
-        self.user_selections: Dict[int, List[str]] = {}
+        self.catalog = ShiftCatalog()
+        self.preferences = PreferenceMatrix()
         self.user_rankings: List[Tuple[int, int]] = []
-        self.assignments: Dict[int, Tuple[str, int]] = {}
+        # user -> (shift, choice number); the choice is None for a live pick off the user's list
+        self.assignments: Dict[int, Tuple[str, Optional[int]]] = {}
+        # Seats per shift ID; shifts not listed have DEFAULT_CAPACITY seats
+        self.shift_capacity: Dict[int, int] = {}
+        self.remaining_capacity = array('i')
+        # Ranking order of the last assignment run, kept for apply_changes
+        self._order: List[int] = []
+        self._order_ranks: List[int] = []
+        self._rank_index: Dict[int, int] = {}
+        self.solver: Solver = get_solver('greedy')
+        # Timezone the shift labels are written in; exports convert from it
+        self.shift_timezone = 'UTC'
+        # Day of the bid period whose UTC offsets conversions use (today if
+        # None), so daylight saving matches the schedule, not the export date
+        self.bid_date: Optional[date] = None
+        # Optional hook timing each phase and recording row, probe and byte counts
+        self.profiler: Optional[Profiler] = None
+        # Users holding each shift ID in the order they took it; set by
+        # assign_items(audit=True) and kept up to date by apply_changes
+        self.shift_holders: Optional[List[List[int]]] = None
+        # user -> [(shift label, choice number), ...] by round, set by draft
+        # and cleared by assign_items; exports follow whichever ran last
+        self.draft_picks: Optional[Dict[int, List[Tuple[str, int]]]] = None
+        # User attributes, hour caps and shift requirements; choices a user
+        # is not eligible for are skipped by every assignment pass
+        self.eligibility = Eligibility()
+
+    def _phase(self, name: str):
+        """Times a block as phase ``name`` if a profiler is attached."""
+        return self.profiler.phase(name) if self.profiler is not None else nullcontext()
+
+    def _record(self, name: str, value: float) -> None:
+        if self.profiler is not None:
+            self.profiler.record(name, value)
+
+    @property
+    def user_selections(self) -> SelectionsView:
+        """Read-only ``user -> [shift label, ...]`` view of the preferences."""
+        return SelectionsView(self.catalog, self.preferences)
+
+    @user_selections.setter
+    def user_selections(self, selections: Dict[int, List[str]]) -> None:
+        self.preferences = PreferenceMatrix()
+        for user, user_choices in selections.items():
+            self.set_user_selections(user, user_choices)
+
+    def set_user_selections(self, user: int, selections: List[str]) -> None:
+        """Stores one user's preference list, replacing any previous one."""
+        self.preferences.set_row(user, encode_selections(self.catalog, selections))
 
     @staticmethod
-    def validate_csv_format(file_path: str, expected_columns: List[str]) -> None:
+    def validate_csv_format(source: CSVSource, expected_columns: List[str]) -> None:
         """
-        Validates CSV file format and structure.
-        
+        Validates that a CSV file's header contains the expected columns.
+
+        Only the header row is read.
+
         Args:
-            file_path: Path to the CSV file
+            source: Path, file-like object or iterable of lines
             expected_columns: List of expected column names
-            
+
         Raises:
             ValidationError: If validation fails
         """
         try:
-            df = pd.read_csv(file_path)
-            if not all(col in df.columns for col in expected_columns):
-                raise ValidationError(f"Missing required columns. Expected: {expected_columns}")
+            with open_csv_source(source) as lines:
+                header = _read_header(csv.reader(lines))
+        except ValidationError:
+            raise
         except Exception as e:
             raise ValidationError(f"Error validating CSV file: {str(e)}")
+        if not all(col in header for col in expected_columns):
+            raise ValidationError(f"Missing required columns. Expected: {expected_columns}")
 
-    def import_user_selections(self, filename: str) -> None:
+    @_profiled('import_selections')
+    def import_user_selections(self, source: CSVSource) -> None:
         """
-        Imports user selections from a CSV file.
-        
+        Imports user selections from a CSV file in a single streaming pass.
+
+        The first column must be ``user_id``; every following non-blank cell
+        is one selection, in preference order.  Blank trailing cells, as
+        left by spreadsheet exports, are ignored.  Rows with errors are
+        collected and reported together with their line numbers, and the
+        engine is only updated if the whole file is valid.
+
         Args:
-            filename: Path to the CSV file
-            
+            source: Path, file-like object or iterable of lines
+
         Raises:
             ValidationError: If file format is invalid
         """
+        context = "Error importing user selections"
+        catalog_size = len(self.catalog)
+        selections = PreferenceMatrix()
+        errors: List[str] = []
         try:
-            self.validate_csv_format(filename, ['user_id'])
-            with open(filename, mode='r') as file:
-                reader = csv.reader(file)
-                header = next(reader)
+            with open_csv_source(source) as lines:
+                reader = csv.reader(lines)
+                header = _read_header(reader)
+                if not header or header[0] != 'user_id':
+                    raise ValidationError(
+                        f"Missing required columns. Expected: ['user_id'] as the first column")
                 if len(header) < 2:
                     raise ValidationError("CSV must contain at least user_id and one selection")
-                
+                selections.width = len(header) - 1
+                intern = self.catalog.intern
+
+                for row in reader:
+                    if not row or not any(cell.strip() for cell in row):
+                        continue
+                    user_id = row[0].strip()
+                    if not user_id.isdigit():
+                        errors.append(f"line {reader.line_num}: Invalid user ID format: {row[0]!r}")
+                        continue
+                    user = int(user_id)
+                    shift_ids = [intern(item) for item in row[1:] if item.strip()]
+                    if not shift_ids:
+                        errors.append(f"line {reader.line_num}: No selections found for user {user}")
+                        continue
+                    selections.set_row(user, shift_ids)
+                rows_read = reader.line_num - 1
+        except ValidationError as e:
+            self.catalog.truncate(catalog_size)
+            raise ValidationError(f"{context}: {str(e)}", errors=e.errors)
+        except Exception as e:
+            self.catalog.truncate(catalog_size)
+            raise ValidationError(f"{context}: {str(e)}")
+
+        if errors:
+            self.catalog.truncate(catalog_size)
+            _raise_row_errors(context, errors, len(errors))
+        self.preferences.update(selections)
+        self._record('selections_rows', rows_read)
+        self._record('distinct_shifts', len(self.catalog))
+
+    @_profiled('import_rankings')
+    def import_user_rankings(self, source: CSVSource) -> None:
+        """
+        Imports user rankings from a CSV file in a single streaming pass.
+
+        The ``user_id`` and ``rank`` columns are located by name, so extra
+        columns are allowed.  Rows with errors are collected and reported
+        together with their line numbers, and the engine is only updated if
+        the whole file is valid.
+
+        Args:
+            source: Path, file-like object or iterable of lines
+
+        Raises:
+            ValidationError: If file format is invalid
+        """
+        context = "Error importing user rankings"
+        rankings: List[Tuple[int, int]] = []
+        errors: List[str] = []
+        try:
+            with open_csv_source(source) as lines:
+                reader = csv.reader(lines)
+                header = _read_header(reader)
+                expected = ['user_id', 'rank']
+                if not all(col in header for col in expected):
+                    raise ValidationError(f"Missing required columns. Expected: {expected}")
+                user_col = header.index('user_id')
+                rank_col = header.index('rank')
+                width = max(user_col, rank_col) + 1
+
+                for row in reader:
+                    if not row or not any(cell.strip() for cell in row):
+                        continue
+                    values = [val.strip() for val in row[:width]]
+                    if len(values) < width or not (values[user_col].isdigit()
+                                                   and values[rank_col].isdigit()):
+                        errors.append(f"line {reader.line_num}: Invalid data format in row: {row}")
+                        continue
+                    rankings.append((int(values[user_col]), int(values[rank_col])))
+                rows_read = reader.line_num - 1
+        except ValidationError as e:
+            raise ValidationError(f"{context}: {str(e)}", errors=e.errors)
+        except Exception as e:
+            raise ValidationError(f"{context}: {str(e)}")
+
+        if errors:
+            _raise_row_errors(context, errors, len(errors))
+        self.user_rankings.extend(rankings)
+        self._record('rankings_rows', rows_read)
+
+    def set_shift_capacity(self, capacities: Dict[str, int]) -> None:
+        """
+        Sets the number of seats for each shift label.
+
+        Shifts are added to the catalog even if nobody selected them, so
+        they appear as unfilled capacity in the report.
+
+        Args:
+            capacities: Mapping of shift label to seat count
+
+        Raises:
+            ValidationError: If a seat count is negative
+        """
+        for label, seats in capacities.items():
+            if seats < 0:
+                raise ValidationError(f"Invalid capacity for shift {label!r}: {seats}")
+        for label, seats in capacities.items():
+            self.shift_capacity[self.catalog.intern(label)] = seats
+
+    @_profiled('import_capacity')
+    def import_shift_capacity(self, source: CSVSource) -> None:
+        """
+        Imports per-shift seat counts from a CSV file.
+
+        The ``shift`` and ``capacity`` columns are located by name.  Rows
+        with errors are reported together with their line numbers, and no
+        capacities are changed if the file is invalid.
+
+        Args:
+            source: Path, file-like object or iterable of lines
+
+        Raises:
+            ValidationError: If file format is invalid
+        """
+        context = "Error importing shift capacity"
+        capacities: Dict[str, int] = {}
+        errors: List[str] = []
+        try:
+            with open_csv_source(source) as lines:
+                reader = csv.reader(lines)
+                header = _read_header(reader)
+                expected = ['shift', 'capacity']
+                if not all(col in header for col in expected):
+                    raise ValidationError(f"Missing required columns. Expected: {expected}")
+                shift_col = header.index('shift')
+                capacity_col = header.index('capacity')
+                width = max(shift_col, capacity_col) + 1
+
                 for row in reader:
-                    if not row[0].isdigit():
-                        raise ValidationError(f"Invalid user ID format: {row[0]}")
-                    user = int(row[0])
-                    selections = row[1:]
-                    if not selections:
-                        raise ValidationError(f"No selections found for user {user}")
-                    self.user_selections[user] = selections
+                    if not row or not any(cell.strip() for cell in row):
+                        continue
+                    if len(row) < width or not row[shift_col].strip() \
+                            or not row[capacity_col].strip().isdigit():
+                        errors.append(f"line {reader.line_num}: Invalid data format in row: {row}")
+                        continue
+                    capacities[row[shift_col]] = int(row[capacity_col])
+                rows_read = reader.line_num - 1
+        except ValidationError as e:
+            raise ValidationError(f"{context}: {str(e)}", errors=e.errors)
         except Exception as e:
-            raise ValidationError(f"Error importing user selections: {str(e)}")
+            raise ValidationError(f"{context}: {str(e)}")
 
-    def import_user_rankings(self, filename: str) -> None:
+        if errors:
+            _raise_row_errors(context, errors, len(errors))
+        self.set_shift_capacity(capacities)
+        self._record('capacity_rows', rows_read)
+
+    def set_user_attributes(self, user: int, attributes: Iterable[str],
+                            max_hours: Optional[float] = None) -> None:
         """
-        Imports user rankings from a CSV file.
-        
+        Sets one user's attributes and optional cap on weekly hours.
+
         Args:
-            filename: Path to the CSV file
-            
+            user: User ID
+            attributes: Attribute names, e.g. skills or queue licenses
+            max_hours: Longest shift, in hours a week, the user may take
+
+        Raises:
+            ValidationError: If the hour cap is negative
+        """
+        if max_hours is not None and max_hours < 0:
+            raise ValidationError(f"Invalid hour cap for user {user}: {max_hours}")
+        self.eligibility.set_user(user, attributes, max_hours)
+
+    def set_shift_requirements(self, requirements: Dict[str, Iterable[str]]) -> None:
+        """
+        Sets the attributes a user needs to take each shift label.
+
+        An empty set of attributes removes the shift's requirements.
+        Shifts are not added to the catalog; a requirement only applies
+        once somebody selects the shift or it is given a capacity.
+
+        Args:
+            requirements: Mapping of shift label to required attribute names
+        """
+        for label, requires in requirements.items():
+            self.eligibility.set_shift(label, requires)
+
+    @_profiled('import_attributes')
+    def import_user_attributes(self, source: CSVSource) -> None:
+        """
+        Imports user attributes from a CSV file.
+
+        The ``user_id`` and ``attributes`` columns are located by name;
+        attributes are separated by ``;`` or ``,`` within the cell.  An
+        optional ``max_hours`` column caps the weekly hours of the shifts a
+        user may take, and a blank cell means no cap.  Rows with errors are
+        reported together with their line numbers, and nothing is changed
+        if the file is invalid.
+
+        Args:
+            source: Path, file-like object or iterable of lines
+
         Raises:
             ValidationError: If file format is invalid
         """
+        context = "Error importing user attributes"
+        users: Dict[int, Tuple[frozenset, Optional[float]]] = {}
+        errors: List[str] = []
         try:
-            self.validate_csv_format(filename, ['user_id', 'rank'])
-            with open(filename, mode='r') as file:
-                reader = csv.reader(file)
-                next(reader)  # Skip header
+            with open_csv_source(source) as lines:
+                reader = csv.reader(lines)
+                header = _read_header(reader)
+                expected = ['user_id', 'attributes']
+                if not all(col in header for col in expected):
+                    raise ValidationError(f"Missing required columns. Expected: {expected}")
+                user_col = header.index('user_id')
+                attributes_col = header.index('attributes')
+                hours_col = header.index('max_hours') if 'max_hours' in header else None
+                width = max(user_col, attributes_col) + 1
+
                 for row in reader:
-                    if not all(val.isdigit() for val in row[:2]):
-                        raise ValidationError(f"Invalid data format in row: {row}")
-                    user = int(row[0])
-                    rank = int(row[1])
-                    self.user_rankings.append((user, rank))
+                    if not row or not any(cell.strip() for cell in row):
+                        continue
+                    if len(row) < width or not row[user_col].strip().isdigit():
+                        errors.append(f"line {reader.line_num}: Invalid data format in row: {row}")
+                        continue
+                    hours = ''
+                    if hours_col is not None and hours_col < len(row):
+                        hours = row[hours_col].strip()
+                    if hours and not hours.replace('.', '', 1).isdigit():
+                        errors.append(f"line {reader.line_num}: Invalid max_hours: {hours!r}")
+                        continue
+                    users[int(row[user_col])] = (parse_attributes(row[attributes_col]),
+                                                 float(hours) if hours else None)
+                rows_read = reader.line_num - 1
+        except ValidationError as e:
+            raise ValidationError(f"{context}: {str(e)}", errors=e.errors)
         except Exception as e:
-            raise ValidationError(f"Error importing user rankings: {str(e)}")
+            raise ValidationError(f"{context}: {str(e)}")
+
+        if errors:
+            _raise_row_errors(context, errors, len(errors))
+        for user, (attributes, max_hours) in users.items():
+            self.eligibility.set_user(user, attributes, max_hours)
+        self._record('attributes_rows', rows_read)
 
-    def assign_items(self) -> Dict[int, Tuple[str, int]]:
+    @_profiled('import_requirements')
+    def import_shift_requirements(self, source: CSVSource) -> None:
+        """
+        Imports the attributes each shift requires from a CSV file.
+
+        The ``shift`` and ``requires`` columns are located by name, with
+        attributes separated by ``;`` or ``,``.  Rows with errors are
+        reported together with their line numbers, and no requirements are
+        changed if the file is invalid.
+
+        Args:
+            source: Path, file-like object or iterable of lines
+
+        Raises:
+            ValidationError: If file format is invalid
+        """
+        context = "Error importing shift requirements"
+        requirements: Dict[str, frozenset] = {}
+        errors: List[str] = []
+        try:
+            with open_csv_source(source) as lines:
+                reader = csv.reader(lines)
+                header = _read_header(reader)
+                expected = ['shift', 'requires']
+                if not all(col in header for col in expected):
+                    raise ValidationError(f"Missing required columns. Expected: {expected}")
+                shift_col = header.index('shift')
+                requires_col = header.index('requires')
+                width = max(shift_col, requires_col) + 1
+
+                for row in reader:
+                    if not row or not any(cell.strip() for cell in row):
+                        continue
+                    if len(row) < width or not row[shift_col].strip():
+                        errors.append(f"line {reader.line_num}: Invalid data format in row: {row}")
+                        continue
+                    requirements[row[shift_col]] = parse_attributes(row[requires_col])
+                rows_read = reader.line_num - 1
+        except ValidationError as e:
+            raise ValidationError(f"{context}: {str(e)}", errors=e.errors)
+        except Exception as e:
+            raise ValidationError(f"{context}: {str(e)}")
+
+        if errors:
+            _raise_row_errors(context, errors, len(errors))
+        self.set_shift_requirements(requirements)
+        self._record('requirements_rows', rows_read)
+
+    def _eligible(self) -> Optional[List[Optional[bytes]]]:
+        """Compiles the eligibility bitset of each preference row for a pass."""
+        if not self.eligibility:
+            return None
+        with self._phase('eligibility'):
+            return self.eligibility.compile(self.catalog.labels, self.preferences.users)
+
+    def eligibility_report(self) -> List[IneligibleChoice]:
+        """
+        Lists the choices assignment will skip because of eligibility.
+
+        Returns:
+            One IneligibleChoice (user, choice number, shift, reason) per
+            dropped choice, in preference-row order
+        """
+        return self.eligibility.report(self.catalog.labels, self.preferences)
+
+    def _initial_capacity(self) -> array:
+        """Returns a fresh remaining-seat counter for every shift ID."""
+        remaining = array('i', [self.DEFAULT_CAPACITY]) * len(self.catalog)
+        for shift_id, seats in self.shift_capacity.items():
+            remaining[shift_id] = seats
+        return remaining
+
+    @_profiled('assign')
+    def assign_items(self, solver: Union[str, Solver, None] = None,
+                     audit: bool = False) -> Dict[int, Tuple[str, int]]:
         """
         Assigns items based on user rankings and preferences.
         Users with rankings but no selections will be skipped.
-        
+
+        The default solver is greedy serial dictatorship in rank order.
+        Pass ``solver='mincost'`` (or any Solver) to optimise the whole
+        group instead; later calls and apply_changes keep using it.
+
+        Each shift has DEFAULT_CAPACITY seats unless set with
+        set_shift_capacity or import_shift_capacity.  The pass runs on shift
+        IDs: each probe is one index into an array of remaining seats
+        rather than a string hash.
+
+        With ``audit`` the pass also records who took each shift, in
+        shift_holders, so explain can answer for any user without walking
+        the ranking again.
+
+        Args:
+            solver: Solver name ('greedy', 'mincost') or instance
+            audit: Record the holders of every shift for explain
+
         Returns:
             Dictionary mapping users to their assignments and choice numbers
-            
+
         Raises:
             ValidationError: If assignment cannot be completed
         """
-        if not self.user_selections or not self.user_rankings:
+        if not len(self.preferences) or not self.user_rankings:
             raise ValidationError("Must import both selections and rankings before assignment")
+        if solver is not None:
+            try:
+                self.solver = get_solver(solver)
+            except ValueError as e:
+                raise ValidationError(str(e))
 
         user_rankings_sorted = sorted(self.user_rankings, key=lambda x: x[1])
-        assigned_items: Set[str] = set()
+        self._order = [user for user, _ in user_rankings_sorted]
+        self._order_ranks = [rank for _, rank in user_rankings_sorted]
+        self._rank_index = self._build_rank_index()
+        self.remaining_capacity = self._initial_capacity()
         self.assignments = {}
+        self.draft_picks = None
+        self.shift_holders = [[] for _ in range(len(self.catalog))] if audit else None
+        self._assign_from(0)
+        return self.assignments
 
-        for user, _ in user_rankings_sorted:
-            if user not in self.user_selections:
-                # Skip users that have rankings but no selections
-                continue
+    def _assign_from(self, start: int) -> None:
+        """Runs the solver over the ranking order from position ``start``."""
+        labels = self.catalog.labels
+        order = self._order if start == 0 else self._order[start:]
+        holders = self.shift_holders
+        made = 0
+        for user, shift_id, choice in self.solver.solve(order, self.preferences,
+                                                        self.remaining_capacity, self._eligible()):
+            self.assignments[user] = (labels[shift_id], choice)
+            if holders is not None:
+                holders[shift_id].append(user)
+            made += 1
+        if self.profiler is not None:
+            self._record_probes(order, made)
 
-            assignment_made = False
-            for index, item in enumerate(self.user_selections[user]):
-                if item not in assigned_items:
-                    self.assignments[user] = (item, index + 1)
-                    assigned_items.add(item)
-                    assignment_made = True
-                    break
+    def _record_probes(self, order: List[int], made: int) -> None:
+        """
+        Records the users a pass saw and the preference entries it read per user.
 
-            if not assignment_made:
-                # If no assignment could be made, skip this user
+        A greedy pass reads an assigned user's list up to their choice and
+        an unassigned user's whole list, and stops once the last seat is
+        filled, so the count is worked out here instead of in the kernel.
+        Probes are only recorded for incremental (greedy) solvers.
+        """
+        preferences = self.preferences
+        exhausted = not any(self.remaining_capacity)
+        users = probes = 0
+        for user in order:
+            if exhausted and not made:
+                break
+            if user not in preferences:
                 continue
+            users += 1
+            assignment = self.assignments.get(user)
+            if assignment is not None:
+                probes += assignment[1]
+                made -= 1
+            else:
+                probes += preferences.lengths[preferences.rows[user]]
+        self._record('assign_users', users)
+        if self.solver.incremental and users:
+            self._record('probes_per_user', probes / users)
 
-        return self.assignments
+    @_profiled('draft')
+    def draft(self, rounds: int = 2, order: str = 'snake') -> Dict[int, List[Tuple[str, int]]]:
+        """
+        Assigns up to ``rounds`` items per user in a multi-round draft.
+
+        Each round gives every user still in the draft their best open
+        shift (or shift block) they haven't picked yet.  Rounds run in rank
+        order, or with ``order='snake'`` alternate between rank order and
+        reverse rank order.  Users whose preference list runs out leave the
+        draft, and it ends early once every seat is taken.  Each user's
+        list is scanned once across all rounds, so a draft costs about the
+        same as a single assignment pass.
+
+        The draft replaces any earlier assignment; apply_changes and
+        explain need assign_items.
+
+        Args:
+            rounds: Maximum items per user
+            order: 'straight' or 'snake'
 
-    def export_assignments(self, filename: str, queue_group: str, timezone: str) -> None:
+        Returns:
+            Dictionary mapping users to their picks, one (item, choice
+            number) per round
+
+        Raises:
+            ValidationError: If inputs are missing or the options are invalid
+        """
+        if not len(self.preferences) or not self.user_rankings:
+            raise ValidationError("Must import both selections and rankings before assignment")
+        if rounds < 1:
+            raise ValidationError(f"Draft needs at least one round, got {rounds}")
+        if order not in DRAFT_ORDERS:
+            raise ValidationError(f"Unknown draft order {order!r}. Expected one of {DRAFT_ORDERS}")
+
+        ranked = sorted(self.user_rankings, key=lambda x: x[1])
+        preferences = self.preferences
+        labels = self.catalog.labels
+        self._order, self._order_ranks, self._rank_index = [], [], {}
+        self.remaining_capacity = self._initial_capacity()
+        self.assignments = {}
+        self.shift_holders = None
+        self.draft_picks = {}
+        picks = 0
+        for _, user, shift_id, choice in draft(
+                [user for user, _ in ranked], preferences.rows, preferences.data,
+                preferences.lengths, preferences.width, self.remaining_capacity,
+                rounds, snake=order == 'snake', eligible=self._eligible()):
+            self.draft_picks.setdefault(user, []).append((labels[shift_id], choice))
+            picks += 1
+        self._record('draft_picks', picks)
+        return self.draft_picks
+
+    @_profiled('reassign')
+    def apply_changes(self, selections: Optional[Dict[int, List[str]]] = None,
+                      rankings: Optional[Iterable[Tuple[int, int]]] = None,
+                      removed_users: Optional[Iterable[int]] = None) -> Set[int]:
         """
-        Exports assignments to a CSV file.
-        
+        Applies late corrections and re-assigns only the affected users.
+
+        Serial dictatorship is decided in rank order, so nobody ranked
+        ahead of the first changed position can be affected.  Seats taken
+        from that position onward are released and only that suffix of the
+        ranking is assigned again.  Solvers that optimise the whole group
+        are not incremental and re-run from the first position.  Eligibility
+        changes made since the last run only reach the re-assigned users.
+
         Args:
-            filename: Output file path
+            selections: New preference lists for existing or new users
+            rankings: (user, rank) pairs for newly ranked or re-ranked users
+            removed_users: Users to drop from the ranking
+
+        Returns:
+            Set of users whose assignment changed
+
+        Raises:
+            ValidationError: If assignment has not been run yet
+        """
+        if not self._order:
+            raise ValidationError("Must run assignment before applying changes")
+        selections = selections or {}
+        rankings = list(rankings or [])
+        removed = set(removed_users or ())
+        order, order_ranks = self._order, self._order_ranks
+
+        start = len(order)
+        for user in list(selections) + list(removed) + [user for user, _ in rankings]:
+            if user in self._rank_index:
+                start = min(start, self._position(user))
+        for _, rank in rankings:
+            start = min(start, bisect_right(order_ranks, rank))
+        if not self.solver.incremental:
+            start = 0
+
+        # Release every seat taken from the first affected position onward
+        previous: Dict[int, Tuple[str, int]] = {}
+        for user in islice(order, start, None):
+            assignment = self.assignments.pop(user, None)
+            if assignment is not None:
+                previous[user] = assignment
+                shift_id = self.catalog.ids[assignment[0]]
+                self.remaining_capacity[shift_id] += 1
+                if self.shift_holders is not None:
+                    self.shift_holders[shift_id].remove(user)
+
+        for user, user_choices in selections.items():
+            self.set_user_selections(user, user_choices)
+        catalog_size = len(self.remaining_capacity)
+        if len(self.catalog) > catalog_size:
+            self.remaining_capacity.extend(self._initial_capacity()[catalog_size:])
+            if self.shift_holders is not None:
+                self.shift_holders.extend([] for _ in range(len(self.catalog) - catalog_size))
+
+        dropped = removed | {user for user, _ in rankings}
+        suffix = [(user, rank) for user, rank in zip(order[start:], order_ranks[start:])
+                  if user not in dropped]
+        suffix.extend(rankings)
+        suffix.sort(key=lambda x: x[1])
+        del order[start:], order_ranks[start:]
+        order.extend(user for user, _ in suffix)
+        order_ranks.extend(rank for _, rank in suffix)
+
+        for user in removed:
+            self._rank_index.pop(user, None)
+        for user, rank in rankings:
+            self._rank_index[user] = rank
+        self.user_rankings = list(zip(order, order_ranks))
+
+        self._assign_from(start)
+        affected = set(previous) | set(order[start:])
+        return {user for user in affected if previous.get(user) != self.assignments.get(user)}
+
+    def explain(self, user: int) -> List[ChoiceExplanation]:
+        """
+        Explains each of a user's choices down to the one they got.
+
+        Every answer is looked up in the audit index kept by
+        assign_items(audit=True): the shift's seat count, how many holders
+        it has and who took the last seat.  Unassigned users get every
+        choice explained.
+
+        Raises:
+            ValidationError: If assignment was not run with audit, or the
+                user has no selections
+        """
+        if self.shift_holders is None:
+            raise ValidationError("Must run assign_items(audit=True) before explaining assignments")
+        if user not in self.preferences:
+            raise ValidationError(f"User {user} has no selections")
+        assignment = self.assignments.get(user)
+        labels = self.catalog.labels
+        eligibility = self.eligibility
+        explanations = []
+        for choice, shift_id in enumerate(self.preferences.row(user), 1):
+            holders = self.shift_holders[shift_id]
+            last_holder = None
+            if holders:
+                last = holders[-1]
+                last_holder = (last, self._rank_index.get(last), self.assignments[last][1])
+            assigned = assignment is not None and assignment[1] == choice
+            explanations.append(ChoiceExplanation.build(
+                choice, labels[shift_id], assigned,
+                self.shift_capacity.get(shift_id, self.DEFAULT_CAPACITY), len(holders), last_holder,
+                eligibility.reason(user, labels[shift_id]) if eligibility else None))
+            if assigned:
+                break
+        return explanations
+
+    def _position(self, user: int) -> int:
+        """Returns a ranked user's position in the last assignment order."""
+        position = bisect_left(self._order_ranks, self._rank_index[user])
+        while self._order[position] != user:
+            position += 1
+        return position
+
+    def capacity_report(self) -> List[Tuple[str, int, int, int]]:
+        """
+        Reports filled and unfilled seats for every shift in the catalog.
+
+        Returns:
+            List of (shift, capacity, filled, unfilled) tuples in catalog order
+
+        Raises:
+            ValidationError: If assignment has not been run
+        """
+        if len(self.remaining_capacity) != len(self.catalog):
+            raise ValidationError("Must run assignment before reporting capacity")
+        capacity = self._initial_capacity()
+        return [
+            (label, capacity[shift_id], capacity[shift_id] - self.remaining_capacity[shift_id],
+             self.remaining_capacity[shift_id])
+            for shift_id, label in enumerate(self.catalog.labels)
+        ]
+
+    def shift_records(self) -> List[Optional[ShiftRecord]]:
+        """Returns the decoded shift for every catalog ID (None if unparseable)."""
+        return [parse_shift(label) for label in self.catalog.labels]
+
+    def display_labels(self, timezone: Optional[str] = None) -> List[str]:
+        """
+        Returns every catalog label as shown in a timezone, indexed by shift ID.
+
+        The whole catalog is converted in one batch from shift_timezone,
+        with the offsets in effect on bid_date.
+
+        Raises:
+            ValidationError: If a timezone is unknown
+        """
+        if timezone is None or timezone == self.shift_timezone:
+            return self.catalog.labels
+        try:
+            return convert_labels(self.catalog.labels, self.shift_timezone, timezone,
+                                  on=self.bid_date)
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+    def iter_assignment_rows(self, timezone: Optional[str] = None) -> Iterator[List]:
+        """
+        Yields one export row per ranked user, without the header.
+
+        Assigned users come first in assignment order, followed by ranked
+        users without an assignment in ranking-file order.  Ranks are looked
+        up in an index built once, so the whole export is linear.  Shifts
+        are shown in ``timezone`` if given.  After a draft there is one row
+        per pick, with the round appended.
+
+        Yields:
+            [user, assigned item or None, choice number or None, rank, selections]
+            (+ [round or None] after a draft)
+
+        Raises:
+            ValidationError: If the timezone is unknown
+        """
+        return self._assignment_rows(self.display_labels(timezone))
+
+    def _assignment_rows(self, labels: List[str]) -> Iterator[List]:
+        if self.draft_picks is not None:
+            yield from self._draft_rows(labels)
+            return
+        rank_index = self._build_rank_index()
+        shift_ids = self.catalog.ids
+        preferences = self.preferences
+        for user, (item, choice_num) in self.assignments.items():
+            # A live bid lets ranked users without selections pick too
+            selections = ([labels[shift_id] for shift_id in preferences.row(user)]
+                          if user in preferences else None)
+            yield [user, labels[shift_ids[item]], choice_num, rank_index.get(user), selections]
+
+        for user, rank in rank_index.items():
+            if user not in self.assignments:
+                selections = ([labels[shift_id] for shift_id in preferences.row(user)]
+                              if user in preferences else None)
+                yield [user, None, None, rank, selections]
+
+    def _draft_rows(self, labels: List[str]) -> Iterator[List]:
+        """Rows for a draft: one per pick, round by round for each user, then users without picks."""
+        rank_index = self._build_rank_index()
+        shift_ids = self.catalog.ids
+        preferences = self.preferences
+        for user, picks in self.draft_picks.items():
+            selections = [labels[shift_id] for shift_id in preferences.row(user)]
+            # A user who misses a round leaves the draft, so pick n is round n
+            for round_number, (item, choice_num) in enumerate(picks, 1):
+                yield [user, labels[shift_ids[item]], choice_num, rank_index.get(user), selections,
+                       round_number]
+
+        for user, rank in rank_index.items():
+            if user not in self.draft_picks:
+                selections = ([labels[shift_id] for shift_id in preferences.row(user)]
+                              if user in preferences else None)
+                yield [user, None, None, rank, selections, None]
+
+    def iter_export_lines(self, output_format: str = 'csv',
+                          timezone: Optional[str] = None) -> Iterator[str]:
+        """
+        Yields the export as text lines, ready to write or stream.
+
+        Args:
+            output_format: 'csv' for the human-readable sheet, 'jsonl' for
+                one JSON object per user (per pick after a draft)
+            timezone: Timezone to show shifts in (default: shift_timezone)
+
+        Raises:
+            ValidationError: If the format or timezone is not supported
+        """
+        if output_format not in EXPORT_FORMATS:
+            raise ValidationError(
+                f"Unsupported export format: {output_format}. Expected one of {EXPORT_FORMATS}")
+        lines = self._export_lines(output_format, self.iter_assignment_rows(timezone),
+                                   rounds=self.draft_picks is not None)
+        if self.profiler is not None:
+            return self._profiled_export(lines)
+        return lines
+
+    def _profiled_export(self, lines: Iterator[str]) -> Iterator[str]:
+        """Times the export until the last line is taken and records its size."""
+        written = 0
+        with self._phase('export'):
+            for line in lines:
+                written += len(line.encode('utf-8'))
+                yield line
+        self._record('export_bytes', written)
+
+    def _export_lines(self, output_format: str, rows: Iterator[List],
+                      rounds: bool = False) -> Iterator[str]:
+        if output_format == 'jsonl':
+            for user, item, choice_num, rank, selections, *round_number in rows:
+                record = {'user': user}
+                if rounds:
+                    record['round'] = round_number[0]
+                record.update({
+                    'shift': item,
+                    'choice': choice_num,
+                    'rank': rank,
+                    'selections': selections or [],
+                })
+                yield json.dumps(record) + '\n'
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(DRAFT_EXPORT_HEADER if rounds else EXPORT_HEADER)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        for user, item, choice_num, rank, selections, *round_number in rows:
+            if item is None:
+                row = [user, "No assignment", "N/A", rank,
+                       ', '.join(selections or ['No selections'])]
+            elif choice_num is None:
+                row = [user, item, "Not listed", rank, ', '.join(selections or ['No selections'])]
+            else:
+                row = [user, item, f"{choice_num} ({self._ordinal(choice_num)})", rank,
+                       ', '.join(selections)]
+            if rounds:
+                row.insert(1, round_number[0] if round_number[0] is not None else "N/A")
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    def export_assignments(self, filename: Union[str, IO], queue_group: str, timezone: str,
+                           output_format: str = 'csv') -> None:
+        """
+        Exports assignments to a file.
+
+        Args:
+            filename: Output file path or open text stream
             queue_group: Queue group identifier
-            timezone: Timezone identifier
-            
+            timezone: Timezone to show shifts in, converted from shift_timezone
+            output_format: 'csv' (default) or 'jsonl'
+
         Raises:
             ValidationError: If export fails
         """
         try:
+            lines = self.iter_export_lines(output_format, timezone)
+            if hasattr(filename, 'write'):
+                filename.writelines(lines)
+                return
+
             output_path = Path(filename)
             if not output_path.parent.exists():
                 output_path.parent.mkdir(parents=True)
 
             with open(output_path, mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(["User", "Assigned Item", "Choice #", "Rank", "All Selections"])
-                
-                for user, (item, choice_num) in self.assignments.items():
-                    rank = next((rank for u, rank in self.user_rankings if u == user), None)
-                    selections = ', '.join(self.user_selections[user])
-                    writer.writerow([
-                        user,
-                        item,
-                        f"{choice_num} ({self._ordinal(choice_num)})",
-                        rank,
-                        selections
-                    ])
-
-                # Add unassigned users to the output
-                assigned_users = set(self.assignments.keys())
-                ranked_users = set(u for u, _ in self.user_rankings)
-                unassigned_users = ranked_users - assigned_users
-                
-                for user in unassigned_users:
-                    rank = next((rank for u, rank in self.user_rankings if u == user), None)
-                    selections = ', '.join(self.user_selections.get(user, ['No selections']))
-                    writer.writerow([
-                        user,
-                        "No assignment",
-                        "N/A",
-                        rank,
-                        selections
-                    ])
+                file.writelines(lines)
 
         except Exception as e:
             raise ValidationError(f"Error exporting assignments: {str(e)}")
 
+    def coverage_matrix(self, timezone: Optional[str] = None):
+        """
+        Returns a 7 x 96 NumPy grid of agents on duty per 15-minute slot.
+
+        Rows are days starting on Sunday and columns are slots starting at
+        midnight, in ``timezone`` if given.  Shifts that can't be parsed
+        are left out.
+
+        Raises:
+            ValidationError: If the timezone is unknown
+        """
+        from .coverage import coverage_matrix
+
+        shift_ids = self.catalog.ids
+        if self.draft_picks is not None:
+            items = [item for picks in self.draft_picks.values() for item, _ in picks]
+        else:
+            items = [item for item, _ in self.assignments.values()]
+        return coverage_matrix(self.display_labels(timezone), [shift_ids[item] for item in items])
+
+    def export_coverage(self, filename: Union[str, IO], timezone: Optional[str] = None) -> None:
+        """
+        Exports the coverage grid as CSV, one row per day.
+
+        Args:
+            filename: Output file path or open text stream
+            timezone: Timezone to show slots in (default: shift_timezone)
+
+        Raises:
+            ValidationError: If export fails
+        """
+        from .coverage import write_coverage
+
+        try:
+            coverage = self.coverage_matrix(timezone)
+            if hasattr(filename, 'write'):
+                write_coverage(coverage, filename)
+                return
+            with open(filename, mode='w', newline='') as file:
+                write_coverage(coverage, file)
+        except Exception as e:
+            raise ValidationError(f"Error exporting coverage: {str(e)}")
+
+    def export_eligibility_report(self, filename: Union[str, IO]) -> int:
+        """
+        Exports the choices dropped for eligibility as CSV.
+
+        Args:
+            filename: Output file path or open text stream
+
+        Returns:
+            Number of dropped choices written
+
+        Raises:
+            ValidationError: If export fails
+        """
+        try:
+            dropped = self.eligibility_report()
+            if hasattr(filename, 'write'):
+                write_report(dropped, filename)
+            else:
+                with open(filename, mode='w', newline='') as file:
+                    write_report(dropped, file)
+        except Exception as e:
+            raise ValidationError(f"Error exporting eligibility report: {str(e)}")
+        return len(dropped)
+
+    def _build_rank_index(self) -> Dict[int, int]:
+        """Maps each ranked user to their first rank in the rankings list."""
+        rank_index: Dict[int, int] = {}
+        for user, rank in self.user_rankings:
+            rank_index.setdefault(user, rank)
+        return rank_index
+
     @staticmethod
     def _ordinal(n: int) -> str:
         """Returns the ordinal string representation of an integer."""
@@ -0,0 +1,266 @@
+"""
+Live, turn-by-turn bidding.
+
+Instead of assigning from uploaded preference lists in one pass, a LiveBid
+lets ranked users pick shifts themselves, one at a time in rank order.
+Seats left per shift ID are kept in the engine's remaining-capacity array,
+so a pick is an O(1) decrement, and every pick is published to a Broker
+that fans events out to subscribers (the web app turns them into
+Server-Sent Events).  Uploaded preference lists, if any, act as proxy bids
+for users who miss their turn.
+"""
+import queue
+import threading
+import time
+from typing import Iterator, List, Optional, Set
+
+from .eligibility import is_eligible
+from .engine import BidEngine, ValidationError
+
+
+class TurnError(ValidationError):
+    """Raised when a user picks out of turn or outside the bidding window."""
+    pass
+
+
+class Broker:
+    """
+    In-process publish/subscribe for live bid events.
+
+    Each subscriber gets a bounded queue.  A subscriber that falls
+    ``max_queued`` events behind is dropped rather than slowing down the
+    bid; its listener ends once it has drained what it has.
+    """
+
+    def __init__(self, max_queued: int = 1000):
+        self.max_queued = max_queued
+        self._subscribers: Set[queue.Queue] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> queue.Queue:
+        """Registers a new subscriber; events published from now on are queued for it."""
+        subscriber: queue.Queue = queue.Queue(self.max_queued)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def close(self) -> None:
+        """Drops every subscriber; their listeners end at the next heartbeat."""
+        with self._lock:
+            self._subscribers.clear()
+
+    def publish(self, event: dict) -> None:
+        """Queues an event for every subscriber without blocking."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                self.unsubscribe(subscriber)
+
+    def listen(self, subscriber: queue.Queue, heartbeat: float = 15.0) -> Iterator[Optional[dict]]:
+        """
+        Yields a subscriber's events as they arrive, unsubscribing when closed.
+
+        None is yielded every ``heartbeat`` seconds without an event, so
+        callers can keep idle connections alive.
+        """
+        try:
+            while True:
+                try:
+                    yield subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    with self._lock:
+                        if subscriber not in self._subscribers:
+                            return
+                    yield None
+        finally:
+            self.unsubscribe(subscriber)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+class LiveBid:
+    """
+    A bid where ranked users pick shifts in turn.
+
+    The engine supplies the shift catalog, capacities, rankings,
+    eligibility constraints and (optionally) preference lists.  Its assignments and remaining capacity
+    are reset and then filled pick by pick, so the engine's export and
+    capacity report work on a live bid as they do after assign_items.
+
+    Args:
+        engine: Engine with rankings and at least one shift in its catalog
+        queue_group: Queue group the bid is for, used to name exports
+        opens_at: Epoch seconds before which picks are refused
+        closes_at: Epoch seconds after which picks are refused
+        broker: Where events are published (default: a new Broker)
+    """
+
+    def __init__(self, engine: BidEngine, queue_group: str = '', opens_at: Optional[float] = None,
+                 closes_at: Optional[float] = None, broker: Optional[Broker] = None):
+        if not engine.user_rankings:
+            raise ValidationError("Must import rankings before starting a live bid")
+        if not len(engine.catalog):
+            raise ValidationError("A live bid needs at least one shift; import selections or capacity")
+        self.engine = engine
+        self.queue_group = queue_group
+        self.opens_at = opens_at
+        self.closes_at = closes_at
+        self.broker = broker or Broker()
+        ranked = sorted(engine.user_rankings, key=lambda x: x[1])
+        self.order: List[int] = list(dict.fromkeys(user for user, _ in ranked))
+        self.turn = 0
+        engine.assignments = {}
+        engine.remaining_capacity = engine._initial_capacity()
+        # Eligibility bitset per preference row, for proxy picks
+        self._eligible = engine._eligible()
+        self.open_seats = sum(engine.remaining_capacity)
+        # Epoch seconds of the last pick or skip (or the start), and of the end
+        self.active_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def current_user(self) -> Optional[int]:
+        """User whose turn it is, or None once everyone has picked or every seat is taken."""
+        if self.turn >= len(self.order) or not self.open_seats:
+            return None
+        return self.order[self.turn]
+
+    @property
+    def finished(self) -> bool:
+        return self.current_user is None
+
+    def ended_at(self, now: Optional[float] = None) -> Optional[float]:
+        """When picking ended, by finishing or by closing, or None while it is still possible."""
+        if self.finished:
+            return self.finished_at or self.active_at
+        now = time.time() if now is None else now
+        if self.closes_at is not None and now >= self.closes_at:
+            return self.closes_at
+        return None
+
+    def pick(self, user: int, label: str, now: Optional[float] = None) -> dict:
+        """
+        Gives ``user`` a seat on shift ``label`` and passes the turn on.
+
+        Returns:
+            The published pick event
+
+        Raises:
+            TurnError: If bidding is not open or it is not the user's turn
+            ValidationError: If the shift is unknown or full, or the user is
+                not eligible for it
+        """
+        with self._lock:
+            self._check_turn(user, now)
+            shift_id = self.engine.catalog.get(label)
+            if shift_id is None:
+                raise ValidationError(f"Unknown shift: {label!r}")
+            reason = self.engine.eligibility.reason(user, label)
+            if reason is not None:
+                raise ValidationError(f"User {user} may not take {label!r}: {reason}")
+            if not self.engine.remaining_capacity[shift_id]:
+                raise ValidationError(f"Shift {label!r} is full")
+            return self._take(user, shift_id)
+
+    def auto_pick(self, now: Optional[float] = None) -> dict:
+        """
+        Picks for the current user from their uploaded preference list.
+
+        Used when a user misses their turn: they get their best open shift
+        they are eligible for, or are skipped if there is none.
+
+        Returns:
+            The published pick or skip event
+
+        Raises:
+            TurnError: If bidding is not open or already finished
+        """
+        with self._lock:
+            user = self.current_user
+            self._check_turn(user, now)
+            preferences = self.engine.preferences
+            remaining = self.engine.remaining_capacity
+            if user in preferences:
+                bits = None if self._eligible is None else self._eligible[preferences.rows[user]]
+                for shift_id in preferences.row(user):
+                    if remaining[shift_id] and is_eligible(bits, shift_id):
+                        return self._take(user, shift_id)
+            self.turn += 1
+            return self._publish({'type': 'skip', 'user': user})
+
+    def _check_turn(self, user: Optional[int], now: Optional[float]) -> None:
+        now = time.time() if now is None else now
+        if self.opens_at is not None and now < self.opens_at:
+            raise TurnError("Bidding has not opened yet")
+        if self.closes_at is not None and now >= self.closes_at:
+            raise TurnError("Bidding has closed")
+        current = self.current_user
+        if current is None:
+            raise TurnError("Bidding is finished")
+        if user != current:
+            raise TurnError(f"It is user {current}'s turn, not user {user}'s")
+
+    def _take(self, user: int, shift_id: int) -> dict:
+        """Fills one seat and advances the turn; the caller holds the lock."""
+        engine = self.engine
+        engine.remaining_capacity[shift_id] -= 1
+        self.open_seats -= 1
+        label = engine.catalog.labels[shift_id]
+        engine.assignments[user] = (label, self._choice_number(user, shift_id))
+        self.turn += 1
+        return self._publish({
+            'type': 'pick',
+            'user': user,
+            'shift': label,
+            'remaining': engine.remaining_capacity[shift_id],
+        })
+
+    def _choice_number(self, user: int, shift_id: int) -> Optional[int]:
+        """Position of the shift in the user's uploaded list, or None if it isn't on it."""
+        preferences = self.engine.preferences
+        if user in preferences:
+            row = preferences.row(user)
+            if shift_id in row:
+                return row.index(shift_id) + 1
+        return None
+
+    def _publish(self, event: dict) -> dict:
+        event['next_user'] = self.current_user
+        event['open_seats'] = self.open_seats
+        self.active_at = time.time()
+        self.broker.publish(event)
+        if self.finished:
+            self.finished_at = self.active_at
+            self.broker.publish({'type': 'finished'})
+        return event
+
+    def export_lines(self, output_format: str = 'csv', timezone: Optional[str] = None) -> List[str]:
+        """Renders the picks made so far, holding off new picks while it runs."""
+        with self._lock:
+            return list(self.engine.iter_export_lines(output_format, timezone))
+
+    def snapshot(self) -> dict:
+        """Current turn and seats left on every shift, for newly connected clients."""
+        with self._lock:
+            remaining = self.engine.remaining_capacity
+            return {
+                'current_user': self.current_user,
+                'turn': self.turn,
+                'ranked': len(self.order),
+                'open_seats': self.open_seats,
+                'opens_at': self.opens_at,
+                'closes_at': self.closes_at,
+                'finished': self.finished,
+                'shifts': [{'shift': label, 'remaining': remaining[shift_id]}
+                           for shift_id, label in enumerate(self.engine.catalog.labels)],
+            }
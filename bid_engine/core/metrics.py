@@ -0,0 +1,133 @@
+"""
+Profiling hooks and metrics for the shift bidding engine.
+
+BidEngine reports to an optional Profiler: ``phase`` wraps each stage of a
+bid (imports, assignment, export) and ``record`` reports a measured value
+such as rows read or bytes written.  The base class does nothing;
+MetricsRegistry aggregates across bids and renders the Prometheus text
+format for the web app's ``/metrics`` endpoint.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence
+
+PREFIX = 'shiftbid'
+
+# Upper bounds of the phase duration histogram buckets, in seconds
+PHASE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Profiler:
+    """Hook interface for engine instrumentation; every call is a no-op here."""
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Times the enclosed block as one run of phase ``name``."""
+        yield
+
+    def record(self, name: str, value: float) -> None:
+        """Reports one measurement of ``name`` (rows read, bytes written, ...)."""
+        pass
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry(Profiler):
+    """
+    Thread-safe Profiler aggregating every bid it sees.
+
+    Phase durations go into a histogram per phase; recorded values are
+    kept as a running sum and count (a Prometheus summary), with the last
+    value exposed as a gauge.
+    """
+
+    def __init__(self, buckets: Sequence[float] = PHASE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._phases: Dict[str, _Histogram] = {}
+        self._sums: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._last: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_phase(name, time.perf_counter() - started)
+
+    def observe_phase(self, name: str, seconds: float) -> None:
+        """Adds one phase duration to its histogram."""
+        with self._lock:
+            histogram = self._phases.get(name)
+            if histogram is None:
+                histogram = self._phases[name] = _Histogram(self.buckets)
+            histogram.counts[bisect_left(self.buckets, seconds)] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+
+    def record(self, name: str, value: float) -> None:
+        with self._lock:
+            self._sums[name] = self._sums.get(name, 0) + value
+            self._counts[name] = self._counts.get(name, 0) + 1
+            self._last[name] = value
+
+    def snapshot(self) -> dict:
+        """Returns ``{'phases': {name: {sum, count}}, 'values': {name: {sum, count, last}}}``."""
+        with self._lock:
+            return {
+                'phases': {name: {'sum': h.sum, 'count': h.count}
+                           for name, h in self._phases.items()},
+                'values': {name: {'sum': self._sums[name], 'count': self._counts[name],
+                                  'last': self._last[name]} for name in self._sums},
+            }
+
+    def render(self, gauges: Optional[Mapping[str, float]] = None,
+               counters: Optional[Mapping[str, float]] = None) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Args:
+            gauges: Extra point-in-time values to expose (e.g. queue depth)
+            counters: Extra totals that only ever grow (e.g. cache hits),
+                named with their ``_total`` suffix
+        """
+        lines: List[str] = []
+        with self._lock:
+            if self._phases:
+                metric = f"{PREFIX}_phase_seconds"
+                lines.append(f"# HELP {metric} Time spent in each engine phase.")
+                lines.append(f"# TYPE {metric} histogram")
+                for name in sorted(self._phases):
+                    histogram = self._phases[name]
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{phase="{name}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{phase="{name}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{metric}_sum{{phase="{name}"}} {histogram.sum}')
+                    lines.append(f'{metric}_count{{phase="{name}"}} {histogram.count}')
+
+            for name in sorted(self._sums):
+                metric = f"{PREFIX}_{name}"
+                lines.append(f"# TYPE {metric} summary")
+                lines.append(f"{metric}_sum {self._sums[name]}")
+                lines.append(f"{metric}_count {self._counts[name]}")
+                lines.append(f"# TYPE {metric}_last gauge")
+                lines.append(f"{metric}_last {self._last[name]}")
+
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {value}")
+        for name, value in sorted((counters or {}).items()):
+            lines.append(f"# TYPE {PREFIX}_{name} counter")
+            lines.append(f"{PREFIX}_{name} {value}")
+        return '\n'.join(lines) + '\n'
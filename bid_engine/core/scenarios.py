@@ -0,0 +1,174 @@
+"""
+What-if scenario runner for the shift bidding engine.
+
+Selections are loaded and encoded once; every scenario then re-runs the
+greedy assignment over the same preference matrix with a different rank
+order, closed shifts, capacity tweaks or excluded users.  With more than one
+process the encoded arrays are placed in shared memory, so workers attach to
+them instead of receiving a pickled copy per scenario.
+"""
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .engine import BidEngine, ValidationError
+from .solvers import serial_dictatorship
+
+
+class Scenario(NamedTuple):
+    """One variant of the bid to evaluate."""
+    name: str
+    order: Optional[List[int]] = None
+    removed_shifts: Sequence[str] = ()
+    capacity: Optional[Dict[str, int]] = None
+    excluded_users: Sequence[int] = ()
+
+
+class ScenarioResult(NamedTuple):
+    """Summary statistics for one scenario run."""
+    name: str
+    ranked: int
+    assigned: int
+    unassigned: int
+    first_choice_rate: float
+    mean_choice: float
+
+
+# (name, order or None, {shift ID: seats}, excluded users) as sent to workers
+_Task = Tuple[str, Optional[List[int]], Dict[int, int], frozenset]
+
+# Per-process state set up by _init_worker
+_worker_state: dict = {}
+
+
+def run_scenarios(engine: BidEngine, scenarios: Iterable[Scenario],
+                  processes: Optional[int] = None) -> List[ScenarioResult]:
+    """
+    Runs every scenario against an engine's imported data.
+
+    Args:
+        engine: Engine with selections and rankings imported
+        scenarios: Scenarios to evaluate
+        processes: Worker processes; 1 runs in this process, None uses all cores
+
+    Returns:
+        One ScenarioResult per scenario, in input order
+
+    Raises:
+        ValidationError: If data is missing or a scenario names an unknown shift
+    """
+    if not len(engine.preferences) or not engine.user_rankings:
+        raise ValidationError("Must import both selections and rankings before assignment")
+
+    base_order = [user for user, _ in sorted(engine.user_rankings, key=lambda x: x[1])]
+    capacity = engine._initial_capacity()
+    tasks = [_encode(engine, scenario) for scenario in scenarios]
+    preferences = engine.preferences
+    eligible = engine.eligibility.compile(engine.catalog.labels, preferences.users)
+
+    if processes == 1 or len(tasks) <= 1:
+        state = _make_state(preferences.data, preferences.lengths, preferences.users,
+                            preferences.width, base_order, capacity, eligible)
+        return [_run_task(state, task) for task in tasks]
+
+    blocks = [_share(preferences.data), _share(preferences.lengths), _share(array('q', preferences.users))]
+    try:
+        handles = [(block.name, typecode, length) for block, typecode, length in zip(
+            blocks, 'iiq', (len(preferences.data), len(preferences.lengths), len(preferences.users)))]
+        workers = processes or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(handles, preferences.width, base_order, capacity,
+                                           eligible)) as pool:
+            chunksize = max(1, len(tasks) // (4 * workers))
+            return list(pool.map(_run_in_worker, tasks, chunksize=chunksize))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def _encode(engine: BidEngine, scenario: Scenario) -> _Task:
+    """Resolves a scenario's shift labels to catalog IDs."""
+    seats: Dict[int, int] = {}
+    for label, count in (scenario.capacity or {}).items():
+        seats[_shift_id(engine, scenario, label)] = count
+    for label in scenario.removed_shifts:
+        seats[_shift_id(engine, scenario, label)] = 0
+    return scenario.name, scenario.order, seats, frozenset(scenario.excluded_users)
+
+
+def _shift_id(engine: BidEngine, scenario: Scenario, label: str) -> int:
+    shift_id = engine.catalog.get(label)
+    if shift_id is None:
+        raise ValidationError(f"Scenario {scenario.name!r}: unknown shift {label!r}")
+    return shift_id
+
+
+def _share(values: array) -> shared_memory.SharedMemory:
+    """Copies an array into a new shared memory block."""
+    payload = values.tobytes()
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(payload)))
+    block.buf[:len(payload)] = payload
+    return block
+
+
+def _make_state(data, lengths, users, width, base_order, capacity, eligible) -> dict:
+    return {
+        'data': data,
+        'lengths': lengths,
+        'rows': {user: row for row, user in enumerate(users)},
+        'width': width,
+        'order': base_order,
+        'capacity': capacity,
+        # Rows sharing a profile share one bitset object, which pickles once
+        'eligible': eligible,
+    }
+
+
+def _init_worker(handles, width, base_order, capacity, eligible) -> None:
+    """Attaches a worker process to the shared preference arrays."""
+    views = []
+    blocks = []
+    for name, typecode, length in handles:
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        views.append(block.buf.cast(typecode)[:length])
+    data, lengths, users = views
+    _worker_state.update(_make_state(data, lengths, users, width, base_order, capacity, eligible))
+    # Keep the blocks referenced for the lifetime of the worker
+    _worker_state['blocks'] = blocks
+
+
+def _run_in_worker(task: _Task) -> ScenarioResult:
+    return _run_task(_worker_state, task)
+
+
+def _run_task(state: dict, task: _Task) -> ScenarioResult:
+    """Runs the greedy pass for one encoded scenario and summarises it."""
+    name, order, seats, excluded = task
+    order = state['order'] if order is None else order
+    if excluded:
+        order = [user for user in order if user not in excluded]
+    remaining = array('i', state['capacity'])
+    for shift_id, count in seats.items():
+        remaining[shift_id] = count
+
+    assigned = first_choices = choice_total = 0
+    for _, _, choice in serial_dictatorship(order, state['rows'], state['data'],
+                                            state['lengths'], state['width'], remaining,
+                                            state['eligible']):
+        assigned += 1
+        choice_total += choice
+        first_choices += choice == 1
+
+    ranked = len(order)
+    return ScenarioResult(
+        name=name,
+        ranked=ranked,
+        assigned=assigned,
+        unassigned=ranked - assigned,
+        first_choice_rate=first_choices / ranked if ranked else 0.0,
+        mean_choice=choice_total / assigned if assigned else 0.0,
+    )
@@ -0,0 +1,172 @@
+"""
+Structured parsing of shift labels.
+
+Labels look like ``IRLC&D INT[4x10] 09:00AM - 08:00PM, SMTW===, Sun``: an
+optional queue prefix, an optional ``[4x10]`` marker, the start and end
+times, a seven-letter day pattern (Sun to Sat, ``=`` for a day off) and the
+weekend type.  Thousands of users share a few dozen labels, so parsing is
+memoized per distinct label, and timezone conversion works on the catalog
+of distinct labels rather than on export rows.
+"""
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Sequence
+
+DAY_LETTERS = 'SMTWRFY'
+MINUTES_PER_DAY = 24 * 60
+ALL_DAYS = (1 << 7) - 1
+SUNDAY = 1 << 0
+SATURDAY = 1 << 6
+
+_SHIFT_PATTERN = re.compile(
+    r'^(?P<prefix>.*?)(?P<four_by_ten>\[4x10\]\s*)?'
+    r'(?P<start>\d{1,2}:\d{2}\s*[AP]M)\s*-\s*(?P<end>\d{1,2}:\d{2}\s*[AP]M),\s*'
+    r'(?P<days>[=SMTWRFY]{7}),\s*(?P<weekend>\w+)\s*$',
+    re.IGNORECASE,
+)
+
+
+class ShiftRecord(NamedTuple):
+    """A decoded shift label."""
+    prefix: str
+    start: int           # minutes after midnight
+    end: int             # minutes after midnight; less than start if overnight
+    days: int            # bit i set if the shift starts on day i (0 = Sunday)
+    four_by_ten: bool
+    weekend: str         # 'Weekday', 'Sat', 'Sun' or 'Both'
+
+    @property
+    def duration(self) -> int:
+        """Length of one shift in minutes."""
+        return (self.end - self.start) % MINUTES_PER_DAY or MINUTES_PER_DAY
+
+    @property
+    def day_pattern(self) -> str:
+        """The seven-letter day pattern, e.g. ``=MTWRF=``."""
+        return ''.join(letter if self.days & (1 << index) else '='
+                       for index, letter in enumerate(DAY_LETTERS))
+
+
+@lru_cache(maxsize=4096)
+def parse_shift(label: str) -> Optional[ShiftRecord]:
+    """
+    Decodes a shift label, or returns None if it doesn't follow the format.
+
+    Results are cached, so repeated labels are only parsed once.
+    """
+    match = _SHIFT_PATTERN.match(label)
+    if match is None:
+        return None
+    days = 0
+    for index, letter in enumerate(match.group('days').upper()):
+        if letter != '=':
+            if letter != DAY_LETTERS[index]:
+                return None
+            days |= 1 << index
+    return ShiftRecord(
+        prefix=match.group('prefix'),
+        start=_parse_clock(match.group('start')),
+        end=_parse_clock(match.group('end')),
+        days=days,
+        four_by_ten=bool(match.group('four_by_ten')),
+        weekend=match.group('weekend'),
+    )
+
+
+def format_shift(record: ShiftRecord) -> str:
+    """Renders a record back into the label format parse_shift reads."""
+    four_by_ten = '[4x10] ' if record.four_by_ten else ''
+    return (f"{record.prefix}{four_by_ten}{_format_clock(record.start)} - "
+            f"{_format_clock(record.end)}, {record.day_pattern}, {record.weekend}")
+
+
+def shift_by_minutes(record: ShiftRecord, minutes: int) -> ShiftRecord:
+    """
+    Moves a shift by a number of minutes.
+
+    If the start crosses midnight the day pattern is rotated with it and
+    the weekend type is re-derived from the new days.
+    """
+    if not minutes:
+        return record
+    start = record.start + minutes
+    day_shift, start = divmod(start, MINUTES_PER_DAY)
+    end = (record.end + minutes) % MINUTES_PER_DAY
+    days = _rotate_days(record.days, day_shift)
+    weekend = record.weekend if days == record.days else weekend_type(days)
+    return record._replace(start=start, end=end, days=days, weekend=weekend)
+
+
+def weekend_type(days: int) -> str:
+    """Derives the weekend type label from a day bitmask."""
+    saturday = bool(days & SATURDAY)
+    sunday = bool(days & SUNDAY)
+    if saturday and sunday:
+        return 'Both'
+    if saturday:
+        return 'Sat'
+    if sunday:
+        return 'Sun'
+    return 'Weekday'
+
+
+def utc_offset_minutes(timezone: str, on: Optional[date] = None) -> int:
+    """
+    Returns a timezone's UTC offset in minutes at noon on a given date.
+
+    Raises:
+        ValueError: If the timezone is unknown
+    """
+    import pytz
+
+    try:
+        zone = pytz.timezone(timezone)
+    except pytz.UnknownTimeZoneError:
+        raise ValueError(f"Unknown timezone: {timezone}")
+    moment = zone.localize(datetime.combine(on or date.today(), time(12)))
+    return int(moment.utcoffset() // timedelta(minutes=1))
+
+
+def convert_labels(labels: Sequence[str], source_timezone: str, target_timezone: str,
+                   on: Optional[date] = None) -> List[str]:
+    """
+    Converts a catalog of labels from one timezone to another in one batch.
+
+    The offset between the two zones is computed once (at noon on ``on``,
+    default today, so daylight saving is applied for that date) and every
+    parseable label is moved by it.  Labels that can't be parsed are
+    returned unchanged.
+
+    Returns:
+        Converted labels, in the same order as ``labels``
+    """
+    if source_timezone == target_timezone:
+        return list(labels)
+    minutes = utc_offset_minutes(target_timezone, on) - utc_offset_minutes(source_timezone, on)
+    converted = []
+    for label in labels:
+        record = parse_shift(label)
+        converted.append(label if record is None else format_shift(shift_by_minutes(record, minutes)))
+    return converted
+
+
+def _rotate_days(days: int, offset: int) -> int:
+    offset %= 7
+    return ((days << offset) | (days >> (7 - offset))) & ALL_DAYS
+
+
+def _parse_clock(text: str) -> int:
+    clock = text.replace(' ', '').upper()
+    hours, minutes = int(clock[:-5]), int(clock[-4:-2])
+    if clock.endswith('PM') and hours != 12:
+        hours += 12
+    elif clock.endswith('AM') and hours == 12:
+        hours = 0
+    return hours * 60 + minutes
+
+
+def _format_clock(minutes: int) -> str:
+    hours, minutes = divmod(minutes, 60)
+    suffix = 'AM' if hours < 12 else 'PM'
+    return f"{(hours % 12) or 12:02d}:{minutes:02d}{suffix}"
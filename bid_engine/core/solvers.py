@@ -0,0 +1,302 @@
+"""
+Assignment solvers for the shift bidding engine.
+
+A solver takes users in ranking order, the encoded preference matrix and an
+array of remaining seats per shift ID, and yields the assignments it makes
+while decrementing the seats it fills.  GreedySolver is the original serial
+dictatorship; MinCostSolver finds an assignment with the lowest total
+seniority-weighted cost over the whole group.
+"""
+from heapq import heappop, heappush
+from typing import (Callable, Dict, Iterable, Iterator, List, MutableSequence, Optional, Sequence,
+                    Set, Tuple)
+
+from .catalog import PreferenceMatrix
+
+
+def serial_dictatorship(order: Iterable[int], rows: Dict[int, int], data: Sequence[int],
+                        lengths: Sequence[int], width: int, remaining: MutableSequence[int],
+                        eligible: Optional[Sequence[Optional[bytes]]] = None,
+                        ) -> Iterator[Tuple[int, int, int]]:
+    """
+    Greedy assignment kernel shared by the engine and scenario workers.
+
+    Walks users in ``order`` and gives each the first shift in their
+    preference row that still has a seat in ``remaining``, which is
+    decremented in place.  Users without a row are skipped, and the walk
+    stops early once every seat is taken.  With ``eligible``, a row's
+    choices whose bit is clear in its bitset are passed over (see
+    ``Eligibility.compile``).
+
+    Yields:
+        (user, shift ID, 1-based choice number) for every assignment made
+    """
+    open_seats = sum(remaining)
+    for user in order:
+        if not open_seats:
+            break
+        row = rows.get(user)
+        if row is None:
+            # Skip users that have rankings but no selections
+            continue
+
+        base = row * width
+        bits = eligible[row] if eligible is not None else None
+        for index in range(lengths[row]):
+            shift_id = data[base + index]
+            if remaining[shift_id] and (bits is None or bits[shift_id >> 3] >> (shift_id & 7) & 1):
+                remaining[shift_id] -= 1
+                open_seats -= 1
+                yield user, shift_id, index + 1
+                break
+
+
+DRAFT_ORDERS = ('straight', 'snake')
+
+
+def draft(order: Iterable[int], rows: Dict[int, int], data: Sequence[int],
+          lengths: Sequence[int], width: int, remaining: MutableSequence[int],
+          rounds: int, snake: bool = False,
+          eligible: Optional[Sequence[Optional[bytes]]] = None) -> Iterator[Tuple[int, int, int, int]]:
+    """
+    Multi-round draft kernel: ``rounds`` serial dictatorship passes.
+
+    Each user keeps a cursor into their preference row and every round
+    resumes from it.  Entries behind the cursor were either full when
+    scanned (seats never come back during a draft) or already picked, so
+    they are never read again.  Users whose list runs out leave the draft.
+    The whole draft reads each preference entry at most once, plus one
+    step per active user per round.  With ``snake`` the even rounds run in
+    reverse rank order.  A shift listed twice is only picked once, and
+    choices ineligible under ``eligible`` are stepped over like full shifts.
+
+    Yields:
+        (round, user, shift ID, choice number), rounds and choices 1-based
+    """
+    active = [user for user in dict.fromkeys(order) if user in rows]
+    cursors = dict.fromkeys(active, 0)
+    picked: Dict[int, Set[int]] = {}
+    open_seats = sum(remaining)
+    for round_number in range(1, rounds + 1):
+        reverse = snake and round_number % 2 == 0
+        still_active = []
+        for user in (reversed(active) if reverse else active):
+            if not open_seats:
+                return
+            row = rows[user]
+            base = row * width
+            length = lengths[row]
+            held = picked.get(user, ())
+            bits = eligible[row] if eligible is not None else None
+            index = cursors[user]
+            while index < length:
+                shift_id = data[base + index]
+                if (remaining[shift_id] and shift_id not in held
+                        and (bits is None or bits[shift_id >> 3] >> (shift_id & 7) & 1)):
+                    break
+                index += 1
+            if index == length:
+                continue
+            shift_id = data[base + index]
+            remaining[shift_id] -= 1
+            open_seats -= 1
+            picked.setdefault(user, set()).add(shift_id)
+            cursors[user] = index + 1
+            still_active.append(user)
+            yield round_number, user, shift_id, index + 1
+        if reverse:
+            still_active.reverse()
+        active = still_active
+        if not active:
+            return
+
+
+class Solver:
+    """Base class for assignment solvers."""
+
+    name = ''
+    # Whether a suffix of the ranking can be re-solved on its own
+    incremental = False
+
+    def solve(self, order: Sequence[int], preferences: PreferenceMatrix,
+              remaining: MutableSequence[int],
+              eligible: Optional[Sequence[Optional[bytes]]] = None) -> Iterator[Tuple[int, int, int]]:
+        """
+        Assigns shifts to users.
+
+        Args:
+            order: Ranked users, most senior first
+            preferences: Encoded preference lists
+            remaining: Seats left per shift ID, decremented in place
+            eligible: Eligibility bitset per preference row, None if unrestricted
+
+        Yields:
+            (user, shift ID, 1-based choice number) for every assignment made
+        """
+        raise NotImplementedError
+
+
+class GreedySolver(Solver):
+    """Serial dictatorship: each user in rank order takes their best open shift."""
+
+    name = 'greedy'
+    incremental = True
+
+    def solve(self, order, preferences, remaining, eligible=None):
+        return serial_dictatorship(order, preferences.rows, preferences.data,
+                                   preferences.lengths, preferences.width, remaining, eligible)
+
+
+def seniority_cost(position: int, choice: int, total: int) -> int:
+    """
+    Default MinCostSolver cost: choices past the first, weighted by seniority.
+
+    The most senior of ``total`` users weighs ``total``, the most junior 1.
+    """
+    return (total - position) * (choice - 1)
+
+
+class MinCostSolver(Solver):
+    """
+    Minimum-cost assignment by successive shortest augmenting paths.
+
+    Users are added one at a time, most senior first.  Each addition runs
+    Dijkstra over the residual graph (user -> preferred shift, shift ->
+    current holder) with node potentials keeping reduced costs
+    non-negative, and stops as soon as an open seat is reached.  Only the
+    preference edges are ever touched, so work follows the size of the
+    sparse preference graph rather than users x shifts.
+
+    Leaving a user unassigned costs ``cost(position, width + 1, total)``,
+    one step worse than the longest preference list allows.
+    """
+
+    name = 'mincost'
+
+    def __init__(self, cost: Optional[Callable[[int, int, int], int]] = None):
+        self.cost = cost or seniority_cost
+
+    def solve(self, order, preferences, remaining, eligible=None):
+        users = [user for user in dict.fromkeys(order) if user in preferences.rows]
+        total = len(users)
+        shift_count = len(remaining)
+        unassigned = shift_count               # shift index for "no assignment"
+        sink = total + shift_count + 1         # node index of the flow sink
+
+        # Node i < total is users[i]; node total + j is shift j (j may be unassigned)
+        potential = [0] * (sink + 1)
+        seats = list(remaining) + [total]
+        held = [-1] * total                    # shift index currently held
+        held_cost = [0] * total
+        held_choice = [0] * total
+        holders: Dict[int, Set[int]] = {}
+        # (shift index, cost, choice number) per preference edge of a user
+        edge_cache: Dict[int, List[Tuple[int, int, int]]] = {}
+
+        def edges_of(index: int) -> List[Tuple[int, int, int]]:
+            edges = edge_cache.get(index)
+            if edges is None:
+                row = preferences.rows[users[index]]
+                base = row * preferences.width
+                length = preferences.lengths[row]
+                bits = eligible[row] if eligible is not None else None
+                edges = []
+                for k in range(length):
+                    shift_id = preferences.data[base + k]
+                    # Ineligible choices get no edge; the rest keep their choice numbers
+                    if bits is None or bits[shift_id >> 3] >> (shift_id & 7) & 1:
+                        edges.append((shift_id, self.cost(index, k + 1, total), k + 1))
+                edges.append((unassigned, self.cost(index, preferences.width + 1, total), 0))
+                edge_cache[index] = edges
+            return edges
+
+        for source in range(total):
+            potential[source] = max(potential[total + j] - c for j, c, _ in edges_of(source))
+
+            dist = {source: 0}
+            parent: Dict[int, Tuple[int, int]] = {}
+            settled: List[int] = []
+            heap = [(0, source)]
+            while heap:
+                d, node = heappop(heap)
+                if d > dist[node]:
+                    continue
+                if node == sink:
+                    break
+                settled.append(node)
+                if node < total:
+                    base = potential[node] + d
+                    current = held[node]
+                    for edge, (j, c, _) in enumerate(edges_of(node)):
+                        if j == current:
+                            continue
+                        target = total + j
+                        nd = base + c - potential[target]
+                        if nd < dist.get(target, nd + 1):
+                            dist[target] = nd
+                            parent[target] = (node, edge)
+                            heappush(heap, (nd, target))
+                else:
+                    j = node - total
+                    base = potential[node] + d
+                    if seats[j] > 0:
+                        nd = base - potential[sink]
+                        if nd < dist.get(sink, nd + 1):
+                            dist[sink] = nd
+                            parent[sink] = (node, 0)
+                            heappush(heap, (nd, sink))
+                    if j == unassigned:
+                        # Users left unassigned pay their full penalty, so
+                        # moving one of them into a seat can never beat
+                        # ending the path here; their back edges are skipped.
+                        continue
+                    for holder in holders.get(j, ()):
+                        nd = base - held_cost[holder] - potential[holder]
+                        if nd < dist.get(holder, nd + 1):
+                            dist[holder] = nd
+                            parent[holder] = (node, 0)
+                            heappush(heap, (nd, holder))
+
+            # Move every user on the path into the next shift along it
+            node = parent[sink][0]
+            seats[node - total] -= 1
+            while True:
+                user, edge = parent[node]
+                j = node - total
+                previous = held[user]
+                if previous >= 0:
+                    holders[previous].discard(user)
+                holders.setdefault(j, set()).add(user)
+                held[user] = j
+                _, held_cost[user], held_choice[user] = edges_of(user)[edge]
+                if user == source:
+                    break
+                node = total + previous
+
+            final = dist[sink]
+            for node in settled:
+                potential[node] += dist[node] - final
+
+        for index, user in enumerate(users):
+            j = held[index]
+            if j != unassigned:
+                remaining[j] -= 1
+                yield user, j, held_choice[index]
+
+
+SOLVERS = {
+    GreedySolver.name: GreedySolver,
+    MinCostSolver.name: MinCostSolver,
+}
+
+
+def get_solver(solver) -> Solver:
+    """Returns a Solver instance from an instance, a class or a registered name."""
+    if isinstance(solver, Solver):
+        return solver
+    if isinstance(solver, type) and issubclass(solver, Solver):
+        return solver()
+    try:
+        return SOLVERS[solver]()
+    except KeyError:
+        raise ValueError(f"Unknown solver {solver!r}. Available: {sorted(SOLVERS)}")
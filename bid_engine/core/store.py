@@ -0,0 +1,501 @@
+"""
+Persistent store of bid sessions in SQLite.
+
+A session is one bid's shift catalog, selections, rankings, capacities,
+eligibility constraints and assignments.  Each is written in a single transaction with executemany, and
+every table is keyed or indexed on (session, user), (session, shift) or
+(session, rank), so looking up one user or one shift is an index seek
+rather than a scan of the bid.  A stored session can be loaded back into a
+BidEngine and assigned again without the original files.
+"""
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .catalog import PreferenceMatrix
+from .eligibility import Eligibility, parse_attributes
+from .engine import BidEngine, ChoiceExplanation, ValidationError
+from .solvers import get_solver
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    queue_group TEXT NOT NULL,
+    shift_timezone TEXT NOT NULL,
+    solver TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    assigned_at REAL,
+    saved_at REAL
+);
+CREATE TABLE IF NOT EXISTS shifts (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    shift_id INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    capacity INTEGER,
+    PRIMARY KEY (session_id, shift_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS shifts_label ON shifts (session_id, label);
+CREATE TABLE IF NOT EXISTS selections (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    row INTEGER NOT NULL,
+    choice INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    shift_id INTEGER NOT NULL,
+    PRIMARY KEY (session_id, row, choice)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS selections_user ON selections (session_id, user_id);
+CREATE INDEX IF NOT EXISTS selections_shift ON selections (session_id, shift_id);
+CREATE TABLE IF NOT EXISTS rankings (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    PRIMARY KEY (session_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rankings_user ON rankings (session_id, user_id);
+CREATE INDEX IF NOT EXISTS rankings_rank ON rankings (session_id, rank);
+CREATE TABLE IF NOT EXISTS assignments (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    shift_id INTEGER NOT NULL,
+    choice INTEGER NOT NULL,
+    round INTEGER,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS assignments_user ON assignments (session_id, user_id);
+CREATE INDEX IF NOT EXISTS assignments_shift ON assignments (session_id, shift_id);
+CREATE TABLE IF NOT EXISTS user_attributes (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL,
+    attributes TEXT NOT NULL,
+    max_hours REAL,
+    PRIMARY KEY (session_id, user_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS shift_requirements (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    label TEXT NOT NULL,
+    requires TEXT NOT NULL,
+    PRIMARY KEY (session_id, label)
+) WITHOUT ROWID;
+"""
+
+
+class SessionInfo(NamedTuple):
+    """Summary of a stored session."""
+    id: int
+    name: str
+    queue_group: str
+    shift_timezone: str
+    solver: str
+    created_at: float
+    assigned_at: Optional[float]
+    # None while a reserved session is still being written
+    saved_at: Optional[float]
+
+
+class UserRecord(NamedTuple):
+    """What one user asked for and got in a session; a drafted user's first pick is ``assigned``."""
+    user: int
+    rank: Optional[int]
+    selections: List[str]
+    assigned: Optional[str]
+    choice: Optional[int]
+    # (shift, choice) per round of a draft, empty for a one-item assignment
+    picks: List[Tuple[str, int]]
+
+
+class SessionStore:
+    """
+    SQLite-backed store of bid sessions.
+
+    A connection is opened per call, so one store can be shared by web
+    request threads and job workers.
+
+    Args:
+        path: Database file, created with its schema if missing
+        max_sessions: Sessions kept; older ones are pruned after each save
+        max_age: Seconds a session is kept, also pruned after each save
+    """
+
+    def __init__(self, path: Union[str, Path], max_sessions: Optional[int] = None,
+                 max_age: Optional[float] = None):
+        self.path = Path(path)
+        self.max_sessions = max_sessions
+        self.max_age = max_age
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as db:
+            db.executescript(SCHEMA)
+            columns = {column[1] for column in db.execute("PRAGMA table_info(assignments)")}
+            if 'round' not in columns:
+                # Databases created before draft picks were stored
+                db.execute("ALTER TABLE assignments ADD COLUMN round INTEGER")
+            columns = {column[1] for column in db.execute("PRAGMA table_info(sessions)")}
+            if 'saved_at' not in columns:
+                # Databases created before sessions could be reserved were written in one go
+                db.execute("ALTER TABLE sessions ADD COLUMN saved_at REAL")
+                db.execute("UPDATE sessions SET saved_at = created_at")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with closing(sqlite3.connect(str(self.path), timeout=30)) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA foreign_keys=ON")
+            with db:
+                yield db
+
+    def reserve(self, engine: BidEngine, name: str = '', queue_group: str = '') -> int:
+        """
+        Creates an empty session for save to fill in later, e.g. from a background thread.
+
+        Until then the session is listed with saved_at None, and load
+        raises ValidationError.
+
+        Returns:
+            The new session ID
+        """
+        with self._transaction() as db:
+            return self._insert_session(db, engine, name, queue_group, saved_at=None)
+
+    def save(self, engine: BidEngine, name: str = '', queue_group: str = '',
+             session_id: Optional[int] = None) -> int:
+        """
+        Stores an engine's inputs and current assignments (or draft picks) as a new session.
+
+        Sessions past max_sessions or max_age are pruned afterwards.
+
+        Args:
+            engine: Engine to store
+            name: Name to list the session under, e.g. the selections file
+            queue_group: Queue group the bid was run for
+            session_id: A session from reserve to fill in instead of a new
+                one; its name and queue group are kept
+
+        Returns:
+            The session ID
+
+        Raises:
+            ValidationError: If session_id is not a reserved session, e.g.
+                because it was deleted meanwhile
+        """
+        with self._transaction() as db:
+            if session_id is None:
+                session_id = self._insert_session(db, engine, name, queue_group,
+                                                  saved_at=time.time())
+            elif not db.execute("UPDATE sessions SET saved_at = ? WHERE id = ? AND saved_at IS NULL",
+                                (time.time(), session_id)).rowcount:
+                raise ValidationError(f"Unknown reserved session: {session_id}")
+            capacity = engine.shift_capacity
+            db.executemany(
+                "INSERT INTO shifts VALUES (?, ?, ?, ?)",
+                ((session_id, shift_id, label, capacity.get(shift_id))
+                 for shift_id, label in enumerate(engine.catalog.labels)))
+            preferences = engine.preferences
+            db.executemany(
+                "INSERT INTO selections VALUES (?, ?, ?, ?, ?)",
+                ((session_id, row, choice, user, shift_id)
+                 for row, user in enumerate(preferences.users)
+                 for choice, shift_id in enumerate(preferences.row(user), 1)))
+            db.executemany(
+                "INSERT INTO rankings VALUES (?, ?, ?, ?)",
+                ((session_id, position, user, rank)
+                 for position, (user, rank) in enumerate(engine.user_rankings)))
+            eligibility = engine.eligibility
+            db.executemany(
+                "INSERT INTO user_attributes VALUES (?, ?, ?, ?)",
+                ((session_id, user, ';'.join(sorted(attributes)), eligibility.max_hours.get(user))
+                 for user, attributes in eligibility.user_attributes.items()))
+            db.executemany(
+                "INSERT INTO shift_requirements VALUES (?, ?, ?)",
+                ((session_id, label, ';'.join(sorted(requires)))
+                 for label, requires in eligibility.requirements.items()))
+            self._insert_assignments(db, session_id, engine)
+        if self.max_sessions is not None or self.max_age is not None:
+            self.prune(self.max_age, self.max_sessions)
+        return session_id
+
+    @staticmethod
+    def _insert_session(db: sqlite3.Connection, engine: BidEngine, name: str, queue_group: str,
+                        saved_at: Optional[float]) -> int:
+        now = time.time()
+        return db.execute(
+            "INSERT INTO sessions (name, queue_group, shift_timezone, solver, created_at, "
+            "assigned_at, saved_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (name, queue_group, engine.shift_timezone, engine.solver.name, now,
+             now if engine.assignments or engine.draft_picks else None, saved_at),
+        ).lastrowid
+
+    def save_assignments(self, session_id: int, engine: BidEngine) -> None:
+        """
+        Replaces a session's assignments with the engine's current ones (or draft picks).
+
+        The engine must have been loaded from this session, so its shift IDs
+        match the stored catalog.  Shifts added since and capacity changes
+        are saved along with the assignments.
+
+        Raises:
+            ValidationError: If the session does not exist
+        """
+        with self._transaction() as db:
+            updated = db.execute("UPDATE sessions SET solver = ?, assigned_at = ? WHERE id = ?",
+                                 (engine.solver.name, time.time(), session_id)).rowcount
+            if not updated:
+                raise ValidationError(f"Unknown session: {session_id}")
+            capacity = engine.shift_capacity
+            db.executemany(
+                "INSERT OR REPLACE INTO shifts VALUES (?, ?, ?, ?)",
+                ((session_id, shift_id, label, capacity.get(shift_id))
+                 for shift_id, label in enumerate(engine.catalog.labels)))
+            db.execute("DELETE FROM assignments WHERE session_id = ?", (session_id,))
+            self._insert_assignments(db, session_id, engine)
+
+    @staticmethod
+    def _insert_assignments(db: sqlite3.Connection, session_id: int, engine: BidEngine) -> None:
+        """Writes one row per assignment, or per draft pick with its round number."""
+        shift_ids = engine.catalog.ids
+        if engine.draft_picks is not None:
+            # A user who misses a round leaves the draft, so pick n is round n
+            rows = ((user, label, choice, round_number)
+                    for user, picks in engine.draft_picks.items()
+                    for round_number, (label, choice) in enumerate(picks, 1))
+        else:
+            rows = ((user, label, choice, None)
+                    for user, (label, choice) in engine.assignments.items())
+        db.executemany(
+            "INSERT INTO assignments VALUES (?, ?, ?, ?, ?, ?)",
+            ((session_id, seq, user, shift_ids[label], choice, round_number)
+             for seq, (user, label, choice, round_number) in enumerate(rows)))
+
+    def sessions(self) -> List[SessionInfo]:
+        """Lists every stored session, newest first."""
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT id, name, queue_group, shift_timezone, solver, created_at, assigned_at, "
+                "saved_at FROM sessions ORDER BY id DESC").fetchall()
+        return [SessionInfo(*row) for row in rows]
+
+    def info(self, session_id: int) -> SessionInfo:
+        """
+        Returns one session's summary.
+
+        Raises:
+            ValidationError: If the session does not exist
+        """
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT id, name, queue_group, shift_timezone, solver, created_at, assigned_at, "
+                "saved_at FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            raise ValidationError(f"Unknown session: {session_id}")
+        return SessionInfo(*row)
+
+    def _saved_info(self, session_id: int) -> SessionInfo:
+        info = self.info(session_id)
+        if info.saved_at is None:
+            raise ValidationError(f"Session {session_id} is still being saved")
+        return info
+
+    def load(self, session_id: int) -> BidEngine:
+        """
+        Rebuilds an engine from a stored session.
+
+        Stored assignments or draft picks are restored for export; call
+        assign_items to run the bid again, e.g. with another solver.
+
+        Raises:
+            ValidationError: If the session does not exist or is still being saved
+        """
+        info = self._saved_info(session_id)
+        engine = BidEngine()
+        engine.shift_timezone = info.shift_timezone
+        engine.solver = get_solver(info.solver)
+        with self._transaction() as db:
+            for shift_id, label, capacity in db.execute(
+                    "SELECT shift_id, label, capacity FROM shifts WHERE session_id = ? "
+                    "ORDER BY shift_id", (session_id,)):
+                engine.catalog.intern(label)
+                if capacity is not None:
+                    engine.shift_capacity[shift_id] = capacity
+
+            preferences = PreferenceMatrix()
+            rows: Dict[int, List[int]] = {}
+            for user, shift_id in db.execute(
+                    "SELECT user_id, shift_id FROM selections WHERE session_id = ? "
+                    "ORDER BY row, choice", (session_id,)):
+                rows.setdefault(user, []).append(shift_id)
+            preferences.width = max(map(len, rows.values()), default=0)
+            for user, shift_ids in rows.items():
+                preferences.set_row(user, shift_ids)
+            engine.preferences = preferences
+
+            engine.user_rankings = db.execute(
+                "SELECT user_id, rank FROM rankings WHERE session_id = ? ORDER BY position",
+                (session_id,)).fetchall()
+            engine.eligibility = self._eligibility(db, session_id)
+            labels = engine.catalog.labels
+            rows = db.execute(
+                "SELECT user_id, shift_id, choice, round FROM assignments WHERE session_id = ? "
+                "ORDER BY seq", (session_id,)).fetchall()
+        if any(round_number is not None for *_, round_number in rows):
+            engine.draft_picks = {}
+            for user, shift_id, choice, _ in rows:
+                engine.draft_picks.setdefault(user, []).append((labels[shift_id], choice))
+        else:
+            engine.assignments = {user: (labels[shift_id], choice) for user, shift_id, choice, _ in rows}
+        return engine
+
+    def assignment_rows(self, session_id: int) -> List[Tuple[int, str]]:
+        """
+        Returns a session's (user, shift label) assignments in assignment order.
+
+        Raises:
+            ValidationError: If the session does not exist or is still being saved
+        """
+        self._saved_info(session_id)
+        with self._transaction() as db:
+            return db.execute(
+                "SELECT a.user_id, s.label FROM assignments a JOIN shifts s "
+                "ON s.session_id = a.session_id AND s.shift_id = a.shift_id "
+                "WHERE a.session_id = ? ORDER BY a.seq", (session_id,)).fetchall()
+
+    def user(self, session_id: int, user: int) -> Optional[UserRecord]:
+        """Returns a user's rank, selections and assignment, or None if absent."""
+        with self._transaction() as db:
+            selections = [label for label, in db.execute(
+                "SELECT s.label FROM selections p JOIN shifts s "
+                "ON s.session_id = p.session_id AND s.shift_id = p.shift_id "
+                "WHERE p.session_id = ? AND p.user_id = ? ORDER BY p.choice",
+                (session_id, user))]
+            rank = db.execute(
+                "SELECT rank FROM rankings WHERE session_id = ? AND user_id = ? "
+                "ORDER BY position LIMIT 1", (session_id, user)).fetchone()
+            assignments = db.execute(
+                "SELECT s.label, a.choice, a.round FROM assignments a JOIN shifts s "
+                "ON s.session_id = a.session_id AND s.shift_id = a.shift_id "
+                "WHERE a.session_id = ? AND a.user_id = ? ORDER BY a.seq",
+                (session_id, user)).fetchall()
+        if not selections and rank is None and not assignments:
+            return None
+        assigned, choice, _ = assignments[0] if assignments else (None, None, None)
+        picks = [(label, pick) for label, pick, round_number in assignments if round_number is not None]
+        return UserRecord(user, rank[0] if rank else None, selections, assigned, choice, picks)
+
+    def shift(self, session_id: int, label: str) -> Optional[dict]:
+        """
+        Reports who asked for and who got one shift.
+
+        Returns:
+            ``{'shift', 'capacity', 'assigned': [(user, choice)],
+            'requested': [(user, choice)]}`` or None if the shift is unknown
+        """
+        with self._transaction() as db:
+            row = db.execute("SELECT shift_id, capacity FROM shifts "
+                             "WHERE session_id = ? AND label = ?", (session_id, label)).fetchone()
+            if row is None:
+                return None
+            shift_id, capacity = row
+            assigned = db.execute(
+                "SELECT user_id, choice FROM assignments WHERE session_id = ? AND shift_id = ? "
+                "ORDER BY seq", (session_id, shift_id)).fetchall()
+            requested = db.execute(
+                "SELECT user_id, choice FROM selections WHERE session_id = ? AND shift_id = ? "
+                "ORDER BY row", (session_id, shift_id)).fetchall()
+        return {
+            'shift': label,
+            'capacity': BidEngine.DEFAULT_CAPACITY if capacity is None else capacity,
+            'assigned': assigned,
+            'requested': requested,
+        }
+
+    def explain(self, session_id: int, user: int) -> Optional[List[ChoiceExplanation]]:
+        """
+        Explains a stored user's choices down to the one they got.
+
+        Each choice costs a few index seeks on the shift: its seat count,
+        how many users hold it and who took it last.
+
+        Returns:
+            One ChoiceExplanation per choice, or None if the user has no selections
+        """
+        with self._transaction() as db:
+            choices = db.execute(
+                "SELECT p.choice, p.shift_id, s.label, s.capacity FROM selections p JOIN shifts s "
+                "ON s.session_id = p.session_id AND s.shift_id = p.shift_id "
+                "WHERE p.session_id = ? AND p.user_id = ? ORDER BY p.choice",
+                (session_id, user)).fetchall()
+            if not choices:
+                return None
+            assigned = db.execute("SELECT choice FROM assignments WHERE session_id = ? AND user_id = ?",
+                                  (session_id, user)).fetchone()
+            eligibility = self._eligibility(db, session_id, user, [row[2] for row in choices])
+            explanations = []
+            for choice, shift_id, label, capacity in choices:
+                taken, = db.execute("SELECT COUNT(*) FROM assignments "
+                                    "WHERE session_id = ? AND shift_id = ?",
+                                    (session_id, shift_id)).fetchone()
+                last_holder = db.execute(
+                    "SELECT a.user_id, (SELECT r.rank FROM rankings r WHERE r.session_id = a.session_id "
+                    "AND r.user_id = a.user_id ORDER BY r.position LIMIT 1), a.choice "
+                    "FROM assignments a WHERE a.session_id = ? AND a.shift_id = ? "
+                    "ORDER BY a.seq DESC LIMIT 1", (session_id, shift_id)).fetchone()
+                is_assigned = assigned is not None and assigned[0] == choice
+                explanations.append(ChoiceExplanation.build(
+                    choice, label, is_assigned,
+                    BidEngine.DEFAULT_CAPACITY if capacity is None else capacity, taken, last_holder,
+                    eligibility.reason(user, label) if eligibility else None))
+                if is_assigned:
+                    break
+        return explanations
+
+    @staticmethod
+    def _eligibility(db: sqlite3.Connection, session_id: int, user: Optional[int] = None,
+                     labels: Optional[List[str]] = None) -> Eligibility:
+        """Reads a session's eligibility constraints, or just those of one user's shifts."""
+        eligibility = Eligibility()
+        query = "SELECT user_id, attributes, max_hours FROM user_attributes WHERE session_id = ?"
+        params: tuple = (session_id,)
+        if user is not None:
+            query += " AND user_id = ?"
+            params += (user,)
+        for user_id, attributes, max_hours in db.execute(query, params):
+            eligibility.set_user(user_id, parse_attributes(attributes), max_hours)
+        if labels is None:
+            rows = db.execute("SELECT label, requires FROM shift_requirements WHERE session_id = ?",
+                              (session_id,))
+        else:
+            rows = (row for label in labels for row in db.execute(
+                "SELECT label, requires FROM shift_requirements WHERE session_id = ? AND label = ?",
+                (session_id, label)))
+        for label, requires in rows:
+            eligibility.set_shift(label, parse_attributes(requires))
+        return eligibility
+
+    def delete(self, session_id: int) -> None:
+        """Removes a session and everything stored with it."""
+        with self._transaction() as db:
+            db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def prune(self, max_age: Optional[float] = None, max_count: Optional[int] = None) -> List[int]:
+        """
+        Deletes sessions older than ``max_age`` seconds and all but the newest ``max_count``.
+
+        Reserved sessions still being saved only go once they are too old.
+        Each session is removed with delete, in its own transaction, so
+        readers aren't blocked for the whole prune.
+
+        Returns:
+            The IDs of the deleted sessions
+        """
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT id, created_at, saved_at FROM sessions ORDER BY id DESC").fetchall()
+        cutoff = None if max_age is None else time.time() - max_age
+        expired = [session_id for position, (session_id, created_at, saved_at) in enumerate(rows)
+                   if (max_count is not None and position >= max_count and saved_at is not None)
+                   or (cutoff is not None and created_at < cutoff)]
+        for session_id in expired:
+            self.delete(session_id)
+        return expired
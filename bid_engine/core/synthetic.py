@@ -0,0 +1,137 @@
+"""
+Synthetic selections and rankings files for load testing.
+
+The files mimic real uploads: a few dozen shift labels in the usual
+format, popularity skewed so most users chase the same handful of shifts
+(Zipf weights), preference lists of varying length padded with blank
+trailing columns, and six-digit user IDs that may start with zeros.
+Output is fully determined by the seed.
+"""
+import csv
+import random
+from itertools import accumulate
+from pathlib import Path
+from typing import IO, Iterator, List, Sequence, Tuple
+
+from .shifts import ShiftRecord, format_shift, weekend_type
+
+DEFAULT_PREFIX = 'IRLC&D INT'
+
+# (day bitmask, 4x10) for the work patterns seen in real catalogs, Sunday = bit 0
+_PATTERNS = [
+    (0b0111110, False),   # =MTWRF=
+    (0b1111100, False),   # ==TWRFY
+    (0b0011111, False),   # SMTWR==
+    (0b1110011, False),   # SM==RFY
+    (0b0001111, True),    # SMTW===
+    (0b1111000, True),    # ===WRFY
+]
+# 15-minute start times in a day, after which labels would repeat
+_STARTS_PER_DAY = 24 * 4
+
+
+def shift_labels(count: int, prefix: str = DEFAULT_PREFIX) -> List[str]:
+    """
+    Builds ``count`` distinct shift labels.
+
+    Start times run from 06:00 in 15-minute steps across the work
+    patterns; 5-day shifts last 9 hours and 4x10 shifts 11.  Once every
+    start time of the day is used, the prefix gains a numbered suffix
+    (``-2``, ``-3``, ...) so the labels stay distinct.
+    """
+    labels = []
+    step = 0
+    while len(labels) < count:
+        days, four_by_ten = _PATTERNS[step % len(_PATTERNS)]
+        cycle, slot = divmod(step // len(_PATTERNS), _STARTS_PER_DAY)
+        start = 6 * 60 + 15 * slot
+        length = 11 * 60 if four_by_ten else 9 * 60
+        labels.append(format_shift(ShiftRecord(
+            prefix=f"{prefix}-{cycle + 1} " if cycle else prefix,
+            start=start % (24 * 60),
+            end=(start + length) % (24 * 60),
+            days=days,
+            four_by_ten=four_by_ten,
+            weekend=weekend_type(days),
+        )))
+        step += 1
+    return labels
+
+
+def user_ids(count: int, seed: int = 0) -> List[str]:
+    """Draws ``count`` distinct zero-padded IDs, at least six digits long."""
+    rng = random.Random(seed)
+    space = max(10 ** 6, 2 * count)
+    width = len(str(space - 1))
+    return [f"{user:0{width}d}" for user in rng.sample(range(1, space), count)]
+
+
+def generate_selections(users: Sequence[str], labels: Sequence[str], min_choices: int = 1,
+                        max_choices: int = 21, skew: float = 1.1,
+                        seed: int = 0) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Yields (user ID, preference list) for every user.
+
+    Shift popularity follows Zipf weights ``1 / rank ** skew`` over a
+    shuffled catalog.  List lengths follow a triangular distribution
+    peaking halfway between the bounds, and no list repeats a shift, so
+    no list is longer than the number of distinct labels.
+    """
+    rng = random.Random(seed)
+    popular = list(dict.fromkeys(labels))
+    max_choices = min(max_choices, len(popular))
+    min_choices = min(min_choices, max_choices)
+    rng.shuffle(popular)
+    cumulative = list(accumulate(1 / rank ** skew for rank in range(1, len(popular) + 1)))
+    mode = (min_choices + max_choices) / 2
+
+    for user in users:
+        wanted = round(rng.triangular(min_choices, max_choices, mode))
+        chosen = dict.fromkeys(rng.choices(popular, cum_weights=cumulative, k=wanted))
+        while len(chosen) < wanted:
+            # Rejection sampling without replacement; the tail is rarely needed
+            for label in rng.choices(popular, cum_weights=cumulative, k=wanted - len(chosen)):
+                chosen.setdefault(label)
+        yield user, list(chosen)
+
+
+def write_selections(file: IO, rows: Iterator[Tuple[str, List[str]]], max_choices: int) -> None:
+    """Writes selections with ``max_choices`` columns, blank-padding short lists."""
+    writer = csv.writer(file)
+    writer.writerow(['user_id'] + [f"selection_{index}" for index in range(1, max_choices + 1)])
+    for user, choices in rows:
+        writer.writerow([user] + choices + [''] * (max_choices - len(choices)))
+
+
+def write_rankings(file: IO, users: Sequence[str], seed: int = 0) -> None:
+    """Writes a random seniority order over ``users``."""
+    order = list(users)
+    random.Random(seed).shuffle(order)
+    writer = csv.writer(file)
+    writer.writerow(['user_id', 'rank'])
+    writer.writerows((user, rank) for rank, user in enumerate(order, 1))
+
+
+def write_workload(directory: Path, users: int, shifts: int = 60, min_choices: int = 1,
+                   max_choices: int = 21, skew: float = 1.1,
+                   seed: int = 0) -> Tuple[Path, Path]:
+    """
+    Writes ``selections.csv`` and ``rankings.csv`` for a synthetic group.
+
+    Returns:
+        Paths of the selections and rankings files
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    ids = user_ids(users, seed)
+    max_choices = min(max_choices, shifts)
+
+    selections_path = directory / 'selections.csv'
+    with open(selections_path, 'w', newline='') as file:
+        rows = generate_selections(ids, shift_labels(shifts), min_choices, max_choices, skew, seed)
+        write_selections(file, rows, max_choices)
+
+    rankings_path = directory / 'rankings.csv'
+    with open(rankings_path, 'w', newline='') as file:
+        write_rankings(file, ids, seed + 1)
+    return selections_path, rankings_path
@@ -0,0 +1,30 @@
+"""
+Shared fixtures for the test suite.
+"""
+import csv
+
+import pytest
+
+
+@pytest.fixture
+def temp_csv_files(tmp_path):
+    """Creates temporary CSV files for testing."""
+    # Create selections CSV
+    selections_file = tmp_path / "selections.csv"
+    with open(selections_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['user_id', 'selection_1', 'selection_2', 'selection_3'])
+        writer.writerow(['1', 'Shift A', 'Shift B', 'Shift C'])
+        writer.writerow(['2', 'Shift B', 'Shift A', 'Shift D'])
+        writer.writerow(['3', 'Shift C', 'Shift D', 'Shift A'])
+
+    # Create rankings CSV
+    rankings_file = tmp_path / "rankings.csv"
+    with open(rankings_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['user_id', 'rank'])
+        writer.writerow(['1', '2'])
+        writer.writerow(['2', '1'])
+        writer.writerow(['3', '3'])
+
+    return selections_file, rankings_file
@@ -0,0 +1,77 @@
+"""
+Tests for the JSON and NDJSON bid API bodies.
+"""
+import io
+import json
+
+import pytest
+
+from bid_engine.core.engine import BidEngine
+from bid_engine.web.api import BidRequestError, read_bid_request
+
+RECORDS = [
+    {'type': 'options', 'queue_group': 'acuity', 'solver': 'greedy'},
+    {'type': 'selection', 'user_id': 1, 'selections': ['Shift A', 'Shift B']},
+    {'type': 'selection', 'user_id': 2, 'selections': ['Shift A', 'Shift B']},
+    {'type': 'ranking', 'user_id': 1, 'rank': 2},
+    {'type': 'ranking', 'user_id': 2, 'rank': 1},
+    {'type': 'capacity', 'shift': 'Shift B', 'capacity': 3},
+    {'type': 'attributes', 'user_id': 2, 'attributes': ['spanish'], 'max_hours': 40},
+    {'type': 'requirement', 'shift': 'Shift A', 'requires': ['spanish']},
+]
+
+
+def _ndjson(records):
+    return io.BytesIO(b''.join(json.dumps(record).encode() + b'\n' for record in records))
+
+
+def test_ndjson_and_json_bodies_fill_the_engine_alike():
+    """Test that both body shapes import the same bid."""
+    ndjson = read_bid_request(_ndjson(RECORDS), 'application/x-ndjson', BidEngine())
+    lists = {'selection': 'selections', 'ranking': 'rankings', 'capacity': 'capacity',
+             'attributes': 'attributes', 'requirement': 'requirements'}
+    body = {key: value for key, value in RECORDS[0].items() if key != 'type'}
+    for record in RECORDS[1:]:
+        body.setdefault(lists[record['type']], []).append(record)
+    whole = read_bid_request(io.BytesIO(json.dumps(body).encode()), 'application/json', BidEngine())
+
+    for bid in (ndjson, whole):
+        engine = bid.engine
+        assert bid.options['queue_group'] == 'acuity'
+        assert dict(engine.user_selections) == {1: ['Shift A', 'Shift B'], 2: ['Shift A', 'Shift B']}
+        assert engine.user_rankings == [(1, 2), (2, 1)]
+        assert engine.eligibility.max_hours == {2: 40}
+        assert engine.assign_items() == {2: ('Shift A', 1), 1: ('Shift B', 2)}
+
+
+def test_bad_records_are_reported_together():
+    """Test that every bad line is reported with its location."""
+    body = _ndjson(RECORDS + [
+        {'type': 'ranking', 'user_id': 'three', 'rank': 3},
+        {'type': 'shift', 'shift': 'Shift C'},
+        {'type': 'options', 'rounds': 0},
+    ])
+    body = io.BytesIO(body.getvalue() + b'{not json\n')
+    with pytest.raises(BidRequestError) as excinfo:
+        read_bid_request(body, 'application/x-ndjson', BidEngine())
+
+    details = excinfo.value.details
+    assert [item['location'] for item in details] == ['line 9', 'line 10', 'line 11', 'line 12']
+    assert details[0]['message'] == 'user_id must be a non-negative integer'
+    assert 'unknown record type' in details[1]['message']
+    assert details[3]['message'].startswith('invalid JSON')
+    assert excinfo.value.to_dict()['total'] == 4
+
+
+def test_missing_inputs_and_bad_body():
+    """Test that a bid without rankings or queue group, or a non-object body, is rejected."""
+    with pytest.raises(BidRequestError) as excinfo:
+        read_bid_request(_ndjson(RECORDS[1:3]), 'application/x-ndjson', BidEngine())
+    assert [item['message'] for item in excinfo.value.details] == [
+        'no ranking records', 'queue_group is required']
+
+    with pytest.raises(BidRequestError, match='1 problem'):
+        read_bid_request(io.BytesIO(b'[]'), 'application/json', BidEngine())
+    with pytest.raises(BidRequestError) as excinfo:
+        read_bid_request(io.BytesIO(b'{"selections": {}}'), 'application/json', BidEngine())
+    assert excinfo.value.details[0] == {'location': 'selections', 'message': 'expected a list of records'}
@@ -0,0 +1,85 @@
+"""
+Tests for the multi-queue-group batch runner.
+"""
+import csv
+import json
+
+import pytest
+
+from bid_engine.cli import main
+from bid_engine.core.batch import QueueGroup, discover_groups, load_manifest, run_batch
+from bid_engine.core.engine import ValidationError
+from bid_engine.core.synthetic import write_workload
+
+
+def test_manifest_runs_every_group(temp_csv_files, tmp_path):
+    """Test that each group is exported and a broken group is reported, not fatal."""
+    selections_file, rankings_file = temp_csv_files
+    (tmp_path / 'empty.csv').write_text('user_id,rank\n')
+    (tmp_path / 'requirements.csv').write_text('shift,requires\nShift B,billing\n')
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps([
+        {'queue_group': 'acuity', 'selections': 'selections.csv', 'rankings': 'rankings.csv'},
+        {'queue_group': 'billing', 'selections': 'selections.csv', 'rankings': 'rankings.csv',
+         'format': 'jsonl', 'requirements': 'requirements.csv'},
+        {'queue_group': 'broken', 'selections': 'selections.csv', 'rankings': 'empty.csv'},
+        {'queue_group': 'overtime', 'selections': 'selections.csv', 'rankings': 'rankings.csv',
+         'rounds': 2, 'draft_order': 'snake'},
+    ]))
+
+    groups = load_manifest(str(manifest))
+    assert groups[0].selections == selections_file
+    results = run_batch(groups, str(tmp_path / 'out'), processes=2)
+
+    assert [result.queue_group for result in results] == ['acuity', 'billing', 'broken', 'overtime']
+    acuity, billing, broken, overtime = results
+    assert acuity.status == 'done' and acuity.assigned == 3 and acuity.first_choice_rate == 1.0
+    assert (tmp_path / 'out' / 'user_item_assignments_acuity_UTC.csv').exists()
+    assert billing.output.endswith('user_item_assignments_billing_UTC.jsonl')
+    assert (acuity.dropped_choices, billing.dropped_choices) == (0, 2)
+    with open(tmp_path / 'out' / 'ineligible_choices_billing_UTC_jsonl.csv', newline='') as f:
+        assert [row[:2] for row in csv.reader(f)][1:] == [['1', '2'], ['2', '1']]
+    assert broken.status == 'failed'
+    assert 'before assignment' in broken.error
+    assert overtime.assigned == 3 and overtime.mean_choice == 1.25
+    with open(overtime.output, newline='') as f:
+        assert next(csv.reader(f))[1] == 'Round'
+
+
+def test_manifest_validation(tmp_path):
+    """Test that bad manifests are rejected before anything runs."""
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps([{'queue_group': '../x', 'selections': 'a', 'rankings': 'b'}]))
+    with pytest.raises(ValidationError, match="Invalid queue group"):
+        load_manifest(str(manifest))
+
+    manifest.write_text(json.dumps([{'queue_group': 'a', 'selections': 'a', 'rankings': 'b'}] * 2))
+    with pytest.raises(ValidationError, match="listed twice"):
+        load_manifest(str(manifest))
+
+    manifest.write_text(json.dumps([{'queue_group': 'a', 'selections': 'a', 'rankings': 'b',
+                                     'rounds': 0}]))
+    with pytest.raises(ValidationError, match="rounds >= 1"):
+        load_manifest(str(manifest))
+
+    with pytest.raises(ValidationError, match="No queue groups"):
+        discover_groups(str(tmp_path))
+
+
+def test_batch_cli_over_directory(tmp_path, capsys):
+    """Test discovering groups from sub-directories and writing the combined summary."""
+    for name, users in (('acuity', 30), ('billing', 50)):
+        write_workload(tmp_path / 'groups' / name, users, shifts=20, seed=users)
+
+    assert discover_groups(str(tmp_path / 'groups'))[0] == QueueGroup(
+        'acuity', tmp_path / 'groups' / 'acuity' / 'selections.csv',
+        tmp_path / 'groups' / 'acuity' / 'rankings.csv')
+    assert main(['batch', str(tmp_path / 'groups'), '--output-dir', str(tmp_path / 'out'),
+                 '--processes', '1']) == 0
+
+    with open(tmp_path / 'out' / 'summary.csv', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['queue_group'] for row in rows] == ['acuity', 'billing']
+    assert [row['ranked'] for row in rows] == ['30', '50']
+    assert all(row['assigned'] == '20' for row in rows)
+    assert capsys.readouterr().out.startswith('queue_group,status,')
@@ -0,0 +1,103 @@
+"""
+Tests for the synthetic workload generator and benchmark harness.
+"""
+import csv
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from bid_engine.cli import main
+from bid_engine.core.benchmark import (PHASES, PhaseResult, benchmark_startup, find_regressions,
+                                       run_benchmarks)
+from bid_engine.core.engine import BidEngine
+from bid_engine.core.shifts import parse_shift
+from bid_engine.core.synthetic import generate_selections, shift_labels, user_ids, write_workload
+
+
+def test_workload_looks_like_an_upload(tmp_path):
+    """Test that generated files import and match the real upload layout."""
+    selections_file, rankings_file = write_workload(tmp_path, 200, shifts=30, max_choices=10, seed=7)
+
+    with open(selections_file, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['user_id'] + [f"selection_{i}" for i in range(1, 11)]
+    assert all(len(row) == 11 for row in rows)
+    assert any(row[-1] == '' for row in rows[1:])
+
+    engine = BidEngine()
+    engine.import_user_selections(selections_file)
+    engine.import_user_rankings(rankings_file)
+    assert len(engine.user_selections) == 200
+    assert len(engine.assign_items()) == 30
+    assert all(len(set(choices)) == len(choices) for choices in engine.user_selections.values())
+
+    # Same seed, same files
+    write_workload(tmp_path / 'again', 200, shifts=30, max_choices=10, seed=7)
+    assert (tmp_path / 'again' / 'selections.csv').read_text() == selections_file.read_text()
+
+
+def test_labels_and_ids():
+    """Test that shift labels parse and user IDs are distinct six-digit strings."""
+    labels = shift_labels(50)
+    assert len(set(labels)) == 50
+    assert all(parse_shift(label) is not None for label in labels)
+
+    labels = shift_labels(1200)
+    assert len(set(labels)) == 1200
+    assert parse_shift(labels[-1]).prefix == 'IRLC&D INT-3 '
+    rows = generate_selections(['1', '2'], labels[:3] * 2, min_choices=5, max_choices=600)
+    assert all(len(choices) == 3 for _, choices in rows)
+
+    ids = user_ids(500, seed=3)
+    assert len(set(ids)) == 500
+    assert all(len(user) == 6 and user.isdigit() for user in ids)
+
+
+def test_benchmark_and_regressions(tmp_path):
+    """Test that every phase is measured and regressions are flagged."""
+    results = run_benchmarks([50], repeat=1, shifts=10, directory=tmp_path)
+    assert [result.phase for result in results] == list(PHASES)
+    assert all(result.seconds >= 0 and result.peak_bytes > 0 for result in results)
+
+    baseline = {'50': {'assign': {'seconds': 1.0, 'peak_bytes': 1000}}}
+    slow = [PhaseResult(50, 'assign', 2.0, 1000), PhaseResult(50, 'export', 9.0, 10 ** 9)]
+    assert find_regressions(slow, baseline) == [
+        "assign at 50 users took 2.000s (baseline 1.000s)"]
+    assert find_regressions([PhaseResult(50, 'assign', 1.1, 1200)], baseline) == []
+
+
+def test_bench_cli(tmp_path, capsys):
+    """Test saving a baseline and failing against a stricter one."""
+    baseline_file = tmp_path / 'baseline.json'
+    assert main(['bench', '--users', '40', '--repeat', '1', '--shifts', '8',
+                 '--save-baseline', str(baseline_file)]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == 'users,phase,seconds,peak_bytes'
+    assert lines[1].startswith('0,startup,')
+    assert len(lines) == 2 + len(PHASES)
+
+    baseline = json.loads(baseline_file.read_text())
+    for phase in baseline['40'].values():
+        phase['peak_bytes'] = 1
+    baseline_file.write_text(json.dumps(baseline))
+    assert main(['bench', '--users', '40', '--repeat', '1', '--shifts', '8',
+                 '--baseline', str(baseline_file)]) == 1
+    assert 'Regression: import at 40 users peaked' in capsys.readouterr().err
+
+
+def test_startup_benchmark():
+    """Test that a cold import is timed in a fresh interpreter."""
+    result = benchmark_startup(repeat=1)
+    assert result.users == 0 and result.phase == 'startup'
+    assert result.seconds > 0 and result.peak_bytes > 0
+
+
+def test_core_import_path_stays_light():
+    """Test that importing the engine or CLI loads no optional or heavy dependency."""
+    heavy = {'numpy', 'pandas', 'pytz', 'flask', 'werkzeug', 'sqlite3', 'multiprocessing',
+             'concurrent.futures', 'tracemalloc', 'subprocess'}
+    code = "import sys, bid_engine.core.engine, bid_engine.cli; print(' '.join(sys.modules))"
+    loaded = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            check=True, cwd=Path(__file__).resolve().parents[2]).stdout.split()
+    assert heavy.isdisjoint(loaded)
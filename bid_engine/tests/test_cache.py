@@ -0,0 +1,101 @@
+"""
+Tests for the result cache.
+"""
+import os
+import time
+
+from bid_engine.web.cache import TEMP_GRACE, ResultCache, cache_key
+
+
+def _store(cache, key, text):
+    return b''.join(chunk for chunk in cache.tee(key, [text.encode()]))
+
+
+def _read(cache, key):
+    file = cache.open(key)
+    if file is None:
+        return None
+    with file:
+        return file.read().decode()
+
+
+def test_cache_key_separates_parts():
+    """Test that keys depend on every part and on where parts split."""
+    assert cache_key(b'ab', 'c') == cache_key(b'ab', 'c')
+    assert cache_key(b'ab', 'c') != cache_key(b'a', 'bc')
+    assert cache_key(None) != cache_key(b'')
+
+
+def test_tee_stores_after_completion(tmp_path):
+    """Test that an entry only appears once the stream is exhausted."""
+    cache = ResultCache(tmp_path)
+    stream = cache.tee('k', ['a\n', 'b\n'])
+    assert next(stream) == 'a\n'
+    assert cache.open('k') is None
+    stream.close()
+    assert cache.open('k') is None
+    assert os.listdir(tmp_path) == []
+
+    _store(cache, 'k', 'a\nb\n')
+    assert _read(cache, 'k') == 'a\nb\n'
+
+
+def test_evicts_least_recently_used(tmp_path):
+    """Test that the oldest unused entry goes first once over max_bytes."""
+    cache = ResultCache(tmp_path, max_bytes=10)
+    _store(cache, 'a', '1234')
+    _store(cache, 'b', '1234')
+    _read(cache, 'a')
+    _store(cache, 'c', '1234')
+
+    assert cache.open('b') is None
+    assert _read(cache, 'a') == '1234' and _read(cache, 'c') == '1234'
+    assert cache.stats()['bytes'] == 8
+
+
+def test_open_entry_survives_eviction(tmp_path):
+    """Test that a result opened before another thread evicts it can still be read."""
+    cache = ResultCache(tmp_path, max_bytes=4)
+    _store(cache, 'a', '1234')
+    with cache.open('a') as file:
+        _store(cache, 'b', '5678')
+        assert not (tmp_path / 'a').exists()
+        assert file.read() == b'1234'
+
+    (tmp_path / 'b').unlink()
+    assert cache.open('b') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_expires_and_reloads_entries(tmp_path):
+    """Test age expiry and indexing entries left on disk."""
+    _store(ResultCache(tmp_path), 'a', 'x')
+    (tmp_path / 'b.123.tmp').write_text('partial')
+    (tmp_path / 'c.456.tmp').write_text('in progress')
+    stale = time.time() - TEMP_GRACE - 1
+    os.utime(tmp_path / 'b.123.tmp', (stale, stale))
+
+    cache = ResultCache(tmp_path)
+    assert _read(cache, 'a') == 'x'
+    assert not (tmp_path / 'b.123.tmp').exists()
+    assert (tmp_path / 'c.456.tmp').exists()
+    assert cache.stats()['entries'] == 1
+
+    cache.max_age = -1
+    assert cache.open('a') is None
+    assert not (tmp_path / 'a').exists()
+
+
+def test_run_reuses_cached_result(tmp_path):
+    """Test that run only calls the work function on a miss."""
+    cache = ResultCache(tmp_path / 'cache')
+    calls = []
+
+    def work(path):
+        calls.append(path)
+        path.write_text('result')
+
+    cache.run('k', work, tmp_path / 'first')
+    cache.run('k', work, tmp_path / 'second')
+    assert len(calls) == 1
+    assert (tmp_path / 'second').read_text() == 'result'
@@ -0,0 +1,58 @@
+"""
+Tests for the shift catalog and preference matrix.
+"""
+from bid_engine.core.catalog import PreferenceMatrix, SelectionsView, ShiftCatalog
+from bid_engine.core.engine import BidEngine
+
+
+def test_catalog_interns_each_label_once():
+    """Test that repeated labels share one ID."""
+    catalog = ShiftCatalog()
+    first = catalog.intern("08:00AM - 05:00PM, =MTWRF=, Weekday")
+    second = catalog.intern("07:30AM - 04:30PM, ==TWRFY, Sat")
+
+    assert catalog.intern("08:00AM - 05:00PM, =MTWRF=, Weekday") == first
+    assert (first, second) == (0, 1)
+    assert len(catalog) == 2
+
+    catalog.truncate(1)
+    assert "07:30AM - 04:30PM, ==TWRFY, Sat" not in catalog
+    assert catalog.intern("07:30AM - 04:30PM, ==TWRFY, Sat") == 1
+
+
+def test_preference_matrix_widens_and_replaces_rows():
+    """Test that rows keep their contents when the matrix is re-padded."""
+    matrix = PreferenceMatrix(width=2)
+    matrix.set_row(10, [0, 1])
+    matrix.set_row(20, [2, 0, 1])
+    matrix.set_row(10, [1])
+
+    assert matrix.width == 3
+    assert list(matrix.row(10)) == [1]
+    assert list(matrix.row(20)) == [2, 0, 1]
+    assert list(matrix.data) == [1, -1, -1, 2, 0, 1]
+
+
+def test_selections_view_decodes_labels():
+    """Test the user -> labels view used by export."""
+    catalog = ShiftCatalog()
+    matrix = PreferenceMatrix()
+    matrix.set_row(1, [catalog.intern("Shift A"), catalog.intern("Shift B")])
+    view = SelectionsView(catalog, matrix)
+
+    assert view[1] == ["Shift A", "Shift B"]
+    assert view.get(2, ["No selections"]) == ["No selections"]
+    assert dict(view) == {1: ["Shift A", "Shift B"]}
+
+
+def test_engine_shares_labels_across_users():
+    """Test that the engine stores each distinct shift once."""
+    engine = BidEngine()
+    engine.user_selections = {
+        1: ["Shift A", "Shift B"],
+        2: ["Shift B", "Shift A"],
+    }
+    engine.user_rankings = [(1, 1), (2, 2)]
+
+    assert engine.catalog.labels == ["Shift A", "Shift B"]
+    assert engine.assign_items() == {1: ("Shift A", 1), 2: ("Shift B", 1)}
@@ -0,0 +1,51 @@
+"""
+Tests for the coverage heatmap.
+"""
+import io
+
+from bid_engine.core.coverage import SLOTS_PER_DAY, coverage_matrix, shift_masks
+from bid_engine.core.engine import BidEngine
+from bid_engine.core.shifts import parse_shift
+
+
+def test_masks_cover_day_shift_slots():
+    """Test that a weekday shift covers its slots on each working day."""
+    mask = shift_masks([parse_shift("08:00AM - 05:00PM, =MTWRF=, Weekday"), None])
+    grid = mask[0].reshape(7, SLOTS_PER_DAY)
+
+    assert grid[0].sum() == 0 and grid[6].sum() == 0
+    assert list(grid[1].nonzero()[0]) == list(range(32, 68))
+    assert mask[1].sum() == 0
+
+
+def test_overnight_shift_wraps_into_next_day():
+    """Test that a Saturday night shift carries into Sunday morning."""
+    mask = shift_masks([parse_shift("10:00PM - 06:00AM, =====FY, Sat")])
+    grid = mask[0].reshape(7, SLOTS_PER_DAY)
+
+    assert grid[5, 88:].all() and grid[6, :24].all()
+    assert grid[0, :24].all() and not grid[0, 24:].any()
+
+
+def test_engine_coverage_counts_assignments():
+    """Test that coverage sums every assigned agent."""
+    engine = BidEngine()
+    weekday = "08:00AM - 05:00PM, =MTWRF=, Weekday"
+    saturday = "09:00AM - 06:00PM, ==TWRFY, Sat"
+    engine.user_selections = {1: [weekday], 2: [weekday], 3: [saturday], 4: ["Shift A"]}
+    engine.user_rankings = [(1, 1), (2, 2), (3, 3), (4, 4)]
+    engine.set_shift_capacity({weekday: 2})
+    engine.assign_items()
+
+    grid = engine.coverage_matrix()
+    assert grid.shape == (7, SLOTS_PER_DAY)
+    assert grid[1, 32] == 2          # Monday 08:00
+    assert grid[2, 40] == 3          # Tuesday 10:00
+    assert grid[6, 40] == 1          # Saturday 10:00
+    assert grid[1, 28] == 0          # Monday 07:00
+
+    output = io.StringIO()
+    engine.export_coverage(output)
+    assert output.getvalue().splitlines()[3].split(',')[41] == '3'
+
+    assert (coverage_matrix(engine.catalog.labels, []) == 0).all()
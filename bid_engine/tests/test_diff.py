@@ -0,0 +1,140 @@
+"""
+Tests for comparing assignment results.
+"""
+import csv
+import io
+
+import pytest
+
+from bid_engine.cli import main
+from bid_engine.core.diff import (ASSIGNED, MOVED, UNASSIGNED, UNCHANGED, ShiftDelta, UserChange,
+                                  diff_assignments, iter_assignment_file)
+from bid_engine.core.engine import BidEngine, ValidationError
+
+SHIFT_A = "08:00AM - 05:00PM, =MTWRF=, Days"
+SHIFT_B = "02:00PM - 11:00PM, =MTWRF=, Evenings"
+
+
+def _engine(capacity):
+    engine = BidEngine()
+    engine.user_selections = {1: [SHIFT_A, SHIFT_B], 2: [SHIFT_A, SHIFT_B],
+                              3: [SHIFT_B], 4: ['Say "Nights"']}
+    engine.import_user_rankings(["user_id,rank", "1,1", "2,2", "3,3", "4,4"])
+    engine.set_shift_capacity(capacity)
+    return engine
+
+
+def _export(engine, output_format):
+    output = io.StringIO()
+    engine.export_assignments(output, 'acuity', 'UTC', output_format=output_format)
+    return io.StringIO(output.getvalue())
+
+
+def test_diff_statuses_and_headcount():
+    """Test every status, the unchanged filter and per-shift deltas."""
+    before = [(1, SHIFT_A), (2, SHIFT_B), (3, None), (4, 'Nights'), (5, SHIFT_B)]
+    after = [(1, SHIFT_A), (2, SHIFT_A), (3, SHIFT_B), (4, None)]
+    diff = diff_assignments(before, after)
+
+    assert diff.counts == {MOVED: 1, UNCHANGED: 1, ASSIGNED: 1, UNASSIGNED: 2}
+    assert diff.changes == [
+        UserChange(2, MOVED, (SHIFT_B,), (SHIFT_A,)),
+        UserChange(3, ASSIGNED, (), (SHIFT_B,)),
+        UserChange(4, UNASSIGNED, ('Nights',), ()),
+        UserChange(5, UNASSIGNED, (SHIFT_B,), ()),
+    ]
+    assert diff.headcount == [ShiftDelta(SHIFT_B, 2, 1), ShiftDelta(SHIFT_A, 1, 2),
+                              ShiftDelta('Nights', 1, 0)]
+    assert [delta.delta for delta in diff.headcount] == [-1, 1, -1]
+    assert diff_assignments(before, after, keep_unchanged=True).changes[0].status == UNCHANGED
+    assert diff.to_dict()['headcount'][1] == {'shift': SHIFT_A, 'before': 1, 'after': 2, 'delta': 1}
+
+
+def test_draft_picks_compare_as_sets():
+    """Test that draft rows are grouped per user and pick order is ignored."""
+    before = [(1, SHIFT_A), (1, SHIFT_B), (2, SHIFT_A)]
+    after = [(1, SHIFT_B), (1, SHIFT_A), (2, SHIFT_A), (2, SHIFT_B)]
+    diff = diff_assignments(before, after)
+    assert diff.counts[UNCHANGED] == 1
+    assert diff.changes == [UserChange(2, MOVED, (SHIFT_A,), (SHIFT_A, SHIFT_B))]
+
+    with pytest.raises(ValidationError, match='user 1 are not consecutive'):
+        diff_assignments(before, [(1, SHIFT_A), (2, SHIFT_A), (1, SHIFT_B)])
+
+
+@pytest.mark.parametrize('output_format', ['csv', 'jsonl'])
+def test_exports_read_back(output_format):
+    """Test reading assignment and draft exports, including quoted and unassigned rows."""
+    engine = _engine({SHIFT_A: 1, SHIFT_B: 1, 'Say "Nights"': 1})
+    engine.assign_items()
+    assert list(iter_assignment_file(_export(engine, output_format))) == [
+        (1, SHIFT_A), (2, SHIFT_B), (4, 'Say "Nights"'), (3, None)]
+
+    engine.draft(rounds=2, order='straight')
+    assert sorted(iter_assignment_file(_export(engine, output_format))) == [
+        (1, SHIFT_A), (2, SHIFT_B), (3, None), (4, 'Say "Nights"')]
+
+    engine.set_shift_capacity({SHIFT_A: 2, SHIFT_B: 2})
+    engine.draft(rounds=2, order='straight')
+    rows = list(iter_assignment_file(_export(engine, output_format)))
+    assert rows[:2] == [(1, SHIFT_A), (1, SHIFT_B)]
+
+
+def test_binary_and_reordered_exports():
+    """Test byte order marks, CRLF, blank lines and an item column before the user column."""
+    data = '\ufeffAssigned Item,Round,User\r\n"Say ""Nights""",1,4\r\n\r\nNo assignment,,3\r\nDays,2,é'
+    with pytest.raises(ValidationError, match='line 5'):
+        list(iter_assignment_file(io.BytesIO(data.encode())))
+    data = data.replace('é', '5')
+    expected = [(4, 'Say "Nights"'), (3, None), (5, 'Days')]
+    assert list(iter_assignment_file(io.BytesIO(data.encode()))) == expected
+    assert list(iter_assignment_file(data.lstrip('\ufeff').splitlines())) == expected
+
+
+def test_quoted_fields_spanning_lines(monkeypatch):
+    """Test that quoted newlines are read as RFC 4180 has them, across blocks too."""
+    assert list(iter_assignment_file(io.StringIO('User,Assigned Item\n5,"multi\nline"\n'))) == [
+        (5, 'multi\nline')]
+
+    data = ('User,Assigned Item,All Selections\n1,Days,"Days\n2,Nights,x"\n'
+            '3,"Say ""Nights""",Nights\n4,No assignment,"a\n\nb"\n5,Days,\n')
+    expected = [(1, 'Days'), (3, 'Say "Nights"'), (4, None), (5, 'Days')]
+    assert list(iter_assignment_file(io.BytesIO(data.encode()))) == expected
+    monkeypatch.setattr('bid_engine.core.diff.BLOCK_SIZE', 8)
+    assert list(iter_assignment_file(io.BytesIO(data.encode()))) == expected
+    with pytest.raises(ValidationError, match='line 9'):
+        list(iter_assignment_file(io.BytesIO(data.encode() + b'x,Days\n')))
+
+
+def test_unreadable_exports_are_rejected():
+    """Test that files that aren't assignment exports raise ValidationError."""
+    with pytest.raises(ValidationError, match='Missing required columns'):
+        list(iter_assignment_file(io.StringIO("user_id,rank\n1,1\n")))
+    with pytest.raises(ValidationError, match='line 3'):
+        list(iter_assignment_file(io.StringIO("User,Assigned Item\n1,Days\nx,Days\n")))
+    with pytest.raises(ValidationError, match='line 2'):
+        list(iter_assignment_file(io.StringIO('{"user": 1, "shift": null}\n{"shift": "Days"}\n')))
+    assert list(iter_assignment_file(io.StringIO(""))) == []
+
+
+def test_diff_cli(tmp_path, capsys):
+    """Test writing the changes and headcount CSVs from two exports."""
+    engine = _engine({SHIFT_A: 1, SHIFT_B: 2})
+    engine.assign_items()
+    engine.export_assignments(str(tmp_path / 'before.csv'), 'acuity', 'UTC')
+    engine.set_shift_capacity({SHIFT_A: 2, SHIFT_B: 0})
+    engine.assign_items()
+    engine.export_assignments(str(tmp_path / 'after.jsonl'), 'acuity', 'UTC', output_format='jsonl')
+
+    assert main(['diff', str(tmp_path / 'before.csv'), str(tmp_path / 'after.jsonl'),
+                 '--headcount', str(tmp_path / 'headcount.csv')]) == 0
+    out, err = capsys.readouterr()
+    assert list(csv.reader(io.StringIO(out))) == [
+        ['User', 'Status', 'Before', 'After'],
+        ['2', MOVED, SHIFT_B, SHIFT_A],
+        ['3', UNASSIGNED, SHIFT_B, ''],
+    ]
+    assert err.strip() == 'moved 1, unchanged 2, newly_assigned 0, newly_unassigned 1'
+    with open(tmp_path / 'headcount.csv', newline='') as f:
+        assert list(csv.reader(f))[1:] == [
+            [SHIFT_B, '2', '0', '-2'], [SHIFT_A, '1', '2', '1'], ['Say "Nights"', '1', '1', '0']]
@@ -0,0 +1,136 @@
+"""
+Tests for eligibility constraints.
+"""
+import io
+import random
+from array import array
+
+import pytest
+
+from bid_engine.core.catalog import PreferenceMatrix
+from bid_engine.core.eligibility import Eligibility, IneligibleChoice, is_eligible, parse_attributes
+from bid_engine.core.engine import BidEngine, ValidationError
+from bid_engine.core.scenarios import Scenario, run_scenarios
+from bid_engine.core.solvers import MinCostSolver, draft, serial_dictatorship
+
+WEEKDAY = "08:00AM - 05:00PM, =MTWRF=, Weekday"     # 45 hours a week
+WEEKEND = "08:00AM - 05:00PM, S=====S, Weekend"     # 18 hours a week
+
+
+def _engine():
+    engine = BidEngine()
+    engine.user_selections = {
+        1: ['Spanish', WEEKDAY, WEEKEND],
+        2: ['Spanish', WEEKDAY, WEEKEND],
+        3: [WEEKDAY, 'Spanish', WEEKEND],
+    }
+    engine.import_user_rankings(["user_id,rank", "1,1", "2,2", "3,3"])
+    engine.set_shift_capacity({'Spanish': 2, WEEKDAY: 2, WEEKEND: 2})
+    return engine
+
+
+def test_compile_shares_one_bitset_per_profile():
+    """Test that users with the same attributes and cap share a bitset."""
+    eligibility = Eligibility()
+    labels = ['Spanish', WEEKDAY, WEEKEND, 'Billing']
+    assert eligibility.compile(labels, [1, 2]) is None
+
+    eligibility.set_shift('Spanish', ['spanish'])
+    eligibility.set_user(1, ['spanish'])
+    eligibility.set_user(2, ['billing'], max_hours=40)
+    eligibility.set_user(3, ['billing'], max_hours=40)
+    rows = eligibility.compile(labels, [1, 2, 3, 4])
+
+    assert rows[0] is None
+    assert rows[1] is rows[2]
+    assert [is_eligible(rows[1], shift_id) for shift_id in range(4)] == [False, False, True, True]
+    assert [is_eligible(rows[3], shift_id) for shift_id in range(4)] == [False, True, True, True]
+    assert parse_attributes(' spanish; billing,,') == {'spanish', 'billing'}
+
+
+def test_kernels_skip_ineligible_choices():
+    """Test that the greedy, draft and min-cost solvers only assign eligible shifts."""
+    rng = random.Random(5)
+    for _ in range(50):
+        shifts = rng.randint(1, 5)
+        preferences = PreferenceMatrix()
+        for user in range(rng.randint(1, 6)):
+            preferences.set_row(user, rng.sample(range(shifts), rng.randint(1, shifts)))
+        eligibility = Eligibility()
+        labels = [str(shift_id) for shift_id in range(shifts)]
+        for label in rng.sample(labels, rng.randint(0, shifts)):
+            eligibility.set_shift(label, ['x'])
+        for user in preferences.users:
+            eligibility.set_user(user, rng.choice([[], ['x']]))
+        eligible = eligibility.compile(labels, preferences.users)
+        allowed = {(user, shift_id) for row, user in enumerate(preferences.users)
+                   for shift_id in range(shifts)
+                   if eligible is None or is_eligible(eligible[row], shift_id)}
+        capacity = [rng.randint(0, 2) for _ in range(shifts)]
+        order = rng.sample(preferences.users, len(preferences))
+        args = (preferences.rows, preferences.data, preferences.lengths, preferences.width)
+
+        greedy = list(serial_dictatorship(order, *args, array('i', capacity), eligible))
+        drafted = [pick[1:] for pick in draft(order, *args, array('i', capacity), 3, True, eligible)]
+        mincost = list(MinCostSolver().solve(order, preferences, array('i', capacity), eligible))
+        for user, shift_id, choice in greedy + drafted + mincost:
+            assert (user, shift_id) in allowed
+            assert preferences.row(user)[choice - 1] == shift_id
+
+
+def test_assignment_report_and_explain():
+    """Test that ineligible choices are skipped, reported and explained."""
+    engine = _engine()
+    engine.import_shift_requirements(io.StringIO("shift,requires\nSpanish,spanish\n"))
+    engine.import_user_attributes(io.StringIO(
+        "user_id,attributes,max_hours\n1,spanish;billing,\n2,billing,40\n3,spanish,\n"))
+
+    assert engine.assign_items(audit=True) == {
+        1: ('Spanish', 1), 2: (WEEKEND, 3), 3: (WEEKDAY, 1)}
+    assert engine.eligibility_report() == [
+        IneligibleChoice(2, 1, 'Spanish', 'requires spanish'),
+        IneligibleChoice(2, 2, WEEKDAY, '45 hours a week is over the 40 hour cap'),
+    ]
+    outcomes = [(item.outcome, item.describe()) for item in engine.explain(2)]
+    assert outcomes[0] == ('ineligible', 'not eligible: requires spanish')
+    assert outcomes[2][0] == 'assigned'
+
+    output = io.StringIO()
+    assert engine.export_eligibility_report(output) == 2
+    assert output.getvalue().splitlines()[0] == 'User,Choice #,Shift,Reason'
+
+    # Scenario workers see the same constraints
+    result, = run_scenarios(engine, [Scenario('base')], processes=1)
+    assert result.assigned == 3 and result.mean_choice == 5 / 3
+
+
+def test_draft_and_apply_changes_respect_eligibility():
+    """Test that drafts and late corrections skip ineligible choices too."""
+    engine = _engine()
+    engine.set_shift_requirements({'Spanish': ['spanish']})
+    engine.set_user_attributes(3, ['spanish'])
+
+    picks = engine.draft(rounds=2, order='straight')
+    assert picks == {1: [(WEEKDAY, 2), (WEEKEND, 3)], 2: [(WEEKDAY, 2), (WEEKEND, 3)],
+                     3: [('Spanish', 2)]}
+
+    engine.assign_items()
+    engine.set_user_attributes(4, [])
+    changed = engine.apply_changes(selections={4: ['Spanish', WEEKEND]}, rankings=[(4, 0)])
+    assert changed == {4} and engine.assignments[4] == (WEEKEND, 2)
+
+
+def test_import_rejects_bad_rows():
+    """Test that bad attribute rows are reported and nothing is applied."""
+    engine = BidEngine()
+    with pytest.raises(ValidationError) as excinfo:
+        engine.import_user_attributes(io.StringIO(
+            "user_id,attributes,max_hours\nx,spanish,\n2,billing,lots\n3,billing,20\n"))
+    assert len(excinfo.value.errors) == 2
+    assert 'line 3' in excinfo.value.errors[1]
+    assert not engine.eligibility.user_attributes
+
+    with pytest.raises(ValidationError, match='Missing required columns'):
+        engine.import_shift_requirements(io.StringIO("shift,skills\nSpanish,spanish\n"))
+    with pytest.raises(ValidationError, match='Invalid hour cap'):
+        engine.set_user_attributes(1, [], max_hours=-1)
@@ -1,36 +1,15 @@
 """
 Tests for the core bidding engine functionality.
 """
+import io
+import json
+import random
 import pytest
 from pathlib import Path
 import csv
 from bid_engine.core.engine import BidEngine, ValidationError
 
 
-@pytest.fixture
-def temp_csv_files(tmp_path):
-    """Creates temporary CSV files for testing."""
-    # Create selections CSV
-    selections_file = tmp_path / "selections.csv"
-    with open(selections_file, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['user_id', 'selection_1', 'selection_2', 'selection_3'])
-        writer.writerow(['1', 'Shift A', 'Shift B', 'Shift C'])
-        writer.writerow(['2', 'Shift B', 'Shift A', 'Shift D'])
-        writer.writerow(['3', 'Shift C', 'Shift D', 'Shift A'])
-
-    # Create rankings CSV
-    rankings_file = tmp_path / "rankings.csv"
-    with open(rankings_file, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['user_id', 'rank'])
-        writer.writerow(['1', '2'])
-        writer.writerow(['2', '1'])
-        writer.writerow(['3', '3'])
-
-    return selections_file, rankings_file
-
-
 def test_import_user_selections(temp_csv_files):
     """Test importing user selections from CSV."""
     selections_file, _ = temp_csv_files
@@ -94,4 +73,217 @@ def test_export_assignments(temp_csv_files, tmp_path):
         content = f.read()
         assert "User" in content
         assert "Assigned Item" in content
-        assert "Choice #" in content 
\ No newline at end of file
+        assert "Choice #" in content 
+
+def test_import_from_file_like_objects():
+    """Test importing from text and binary streams instead of paths."""
+    engine = BidEngine()
+    engine.import_user_selections(io.StringIO(
+        "user_id,selection_1,selection_2,selection_3\n"
+        "1,Shift A,Shift B,\n"
+        "2,Shift B,,\n"
+    ))
+    engine.import_user_rankings(io.BytesIO(b"\xef\xbb\xbfuser_id,rank\r\n1,2\r\n2,1\r\n"))
+
+    # Blank trailing cells from spreadsheet exports are not selections
+    assert engine.user_selections[1] == ['Shift A', 'Shift B']
+    assert engine.user_selections[2] == ['Shift B']
+    assert engine.user_rankings == [(1, 2), (2, 1)]
+
+
+def test_import_reports_row_errors_with_line_numbers():
+    """Test that every invalid row is reported with its line number."""
+    engine = BidEngine()
+    with pytest.raises(ValidationError) as excinfo:
+        engine.import_user_selections(io.StringIO(
+            "user_id,selection_1\n"
+            "1,Shift A\n"
+            "abc,Shift B\n"
+            "3,\n"
+        ))
+
+    assert excinfo.value.errors == [
+        "line 3: Invalid user ID format: 'abc'",
+        "line 4: No selections found for user 3",
+    ]
+    # Nothing is imported from a file with errors
+    assert engine.user_selections == {}
+
+
+def test_import_rejects_missing_columns():
+    """Test that the header is checked before any rows are read."""
+    engine = BidEngine()
+    with pytest.raises(ValidationError, match="Missing required columns"):
+        engine.import_user_rankings(io.StringIO("EID,Rank\n000316,1\n"))
+
+
+def test_capacity_aware_assignment(temp_csv_files):
+    """Test that shifts with several seats are shared without duplicate names."""
+    selections_file, rankings_file = temp_csv_files
+    engine = BidEngine()
+    engine.import_user_selections(str(selections_file))
+    engine.import_user_rankings(str(rankings_file))
+    engine.import_shift_capacity(io.StringIO("shift,capacity\nShift B,2\nShift E,3\n"))
+
+    assignments = engine.assign_items()
+
+    assert assignments[2] == ('Shift B', 1)
+    assert assignments[1] == ('Shift A', 1)
+    assert assignments[3] == ('Shift C', 1)
+
+    # With Shift A closed, users 2 and 1 share Shift B's two seats
+    engine.set_shift_capacity({'Shift A': 0})
+    assignments = engine.assign_items()
+    assert assignments[1] == ('Shift B', 2)
+
+    report = {row[0]: row[1:] for row in engine.capacity_report()}
+    assert report['Shift B'] == (2, 2, 0)
+    assert report['Shift A'] == (0, 0, 0)
+    assert report['Shift E'] == (3, 0, 3)
+
+
+def test_capacity_import_rejects_bad_counts():
+    """Test that invalid seat counts are reported by line."""
+    engine = BidEngine()
+    with pytest.raises(ValidationError) as excinfo:
+        engine.import_shift_capacity(io.StringIO("shift,capacity\nShift A,two\n"))
+    assert excinfo.value.errors[0].startswith("line 2:")
+    assert engine.shift_capacity == {}
+
+
+def test_apply_changes_matches_full_rerun():
+    """Test that incremental re-assignment equals re-running from scratch."""
+    rng = random.Random(7)
+    shifts = [f"Shift {i}" for i in range(15)]
+    selections = {user: rng.sample(shifts, rng.randint(1, 6)) for user in range(40)}
+    rankings = [(user, rank) for rank, user in enumerate(rng.sample(range(40), 35), 1)]
+
+    engine = BidEngine()
+    engine.user_selections = selections
+    engine.user_rankings = list(rankings)
+    engine.set_shift_capacity({'Shift 0': 3})
+    engine.assign_items()
+    before = dict(engine.assignments)
+
+    new_selections = {5: ['Shift 0', 'Shift 14'], 39: ['Shift 1']}
+    new_rankings = [(39, 3), (rankings[10][0], 36)]
+    removed = [rankings[20][0]]
+    changed = engine.apply_changes(new_selections, new_rankings, removed)
+
+    fresh = BidEngine()
+    fresh.user_selections = {**selections, **new_selections}
+    moved = dict(new_rankings)
+    fresh.user_rankings = [(u, moved.get(u, r)) for u, r in rankings if u not in removed]
+    fresh.user_rankings += [(39, 3)]
+    fresh.set_shift_capacity({'Shift 0': 3})
+    fresh.assign_items()
+
+    assert engine.assignments == fresh.assignments
+    users = set(before) | set(fresh.assignments)
+    assert changed == {u for u in users if before.get(u) != fresh.assignments.get(u)}
+
+
+def test_apply_changes_only_touches_suffix(temp_csv_files):
+    """Test that a change for the last-ranked user affects nobody else."""
+    selections_file, rankings_file = temp_csv_files
+    engine = BidEngine()
+    engine.import_user_selections(str(selections_file))
+    engine.import_user_rankings(str(rankings_file))
+    engine.assign_items()
+
+    # User 3 (rank 3) switches to a new shift; users ahead keep theirs
+    assert engine.apply_changes(selections={3: ['Shift E']}) == {3}
+    assert engine.assignments[3] == ('Shift E', 1)
+    assert engine.apply_changes(selections={3: ['Shift E']}) == set()
+
+    with pytest.raises(ValidationError):
+        BidEngine().apply_changes(removed_users=[1])
+
+
+def test_explain_from_audit_index():
+    """Test why-not answers recorded during assignment and kept by apply_changes."""
+    engine = BidEngine()
+    engine.user_selections = {1: ['A', 'B'], 2: ['A', 'C'], 3: ['A', 'B', 'C'], 4: ['D']}
+    engine.user_rankings = [(1, 2), (2, 1), (3, 12), (4, 4)]
+    engine.set_shift_capacity({'B': 2, 'D': 0})
+
+    engine.assign_items()
+    with pytest.raises(ValidationError, match="audit"):
+        engine.explain(3)
+    engine.assign_items(audit=True)
+
+    reasons = [e.describe() for e in engine.explain(3)]
+    assert reasons == ["taken by rank 1 at their 1st choice", "assigned as your 2nd choice"]
+    assert engine.explain(4)[0].outcome == 'closed'
+    assert engine.shift_holders[engine.catalog.ids['B']] == [1, 3]
+
+    # User 2 leaves: 1 takes A, and 3 is now blocked by rank 2
+    engine.apply_changes(removed_users=[2])
+    assert engine.shift_holders[engine.catalog.ids['A']] == [1]
+    first = engine.explain(3)[0]
+    assert (first.filled_by, first.filled_by_rank, first.filled_by_choice) == (1, 2, 1)
+    assert engine.explain(3)[1].describe() == "assigned as your 2nd choice"
+
+    with pytest.raises(ValidationError, match="no selections"):
+        engine.explain(99)
+
+
+def test_export_rows_and_jsonl():
+    """Test the streaming export rows and the JSON lines format."""
+    engine = BidEngine()
+    engine.user_selections = {1: ['Shift A'], 2: ['Shift A'], 4: ['Shift B']}
+    engine.user_rankings = [(1, 1), (2, 2), (3, 3), (4, 4)]
+    engine.assign_items()
+
+    rows = list(engine.iter_assignment_rows())
+    assert rows == [
+        [1, 'Shift A', 1, 1, ['Shift A']],
+        [4, 'Shift B', 1, 4, ['Shift B']],
+        [2, None, None, 2, ['Shift A']],
+        [3, None, None, 3, None],
+    ]
+
+    output = io.StringIO()
+    engine.export_assignments(output, "TestGroup", "UTC", output_format='jsonl')
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert records[0] == {'user': 1, 'shift': 'Shift A', 'choice': 1, 'rank': 1,
+                          'selections': ['Shift A']}
+    assert records[3] == {'user': 3, 'shift': None, 'choice': None, 'rank': 3, 'selections': []}
+
+    csv_lines = list(engine.iter_export_lines())
+    assert csv_lines[0] == "User,Assigned Item,Choice #,Rank,All Selections\r\n"
+    assert csv_lines[-1] == "3,No assignment,N/A,3,No selections\r\n"
+
+    with pytest.raises(ValidationError, match="Unsupported export format"):
+        engine.iter_export_lines('parquet')
+
+
+def test_draft_rounds_and_export(temp_csv_files):
+    """Test a snake draft, its per-pick export and switching back to one item per user."""
+    selections_file, rankings_file = temp_csv_files
+    engine = BidEngine()
+    engine.import_user_selections(selections_file)
+    engine.import_user_rankings(rankings_file)
+    engine.user_rankings.append((4, 4))
+
+    picks = engine.draft(rounds=2, order='snake')
+    assert picks == {2: [('Shift B', 1)], 1: [('Shift A', 1)],
+                     3: [('Shift C', 1), ('Shift D', 2)]}
+    assert not any(engine.remaining_capacity)
+
+    lines = list(engine.iter_export_lines())
+    assert lines[0] == "User,Round,Assigned Item,Choice #,Rank,All Selections\r\n"
+    assert lines[4] == '3,2,Shift D,2 (2nd),3,"Shift C, Shift D, Shift A"\r\n'
+    assert lines[5] == "4,N/A,No assignment,N/A,4,No selections\r\n"
+    records = [json.loads(line) for line in engine.iter_export_lines('jsonl')]
+    assert records[3]['round'] == 2 and records[3]['shift'] == 'Shift D'
+    assert int(engine.coverage_matrix().sum()) == 0   # labels aren't parseable shifts
+
+    with pytest.raises(ValidationError, match="Must run assignment"):
+        engine.apply_changes(removed_users=[1])
+    with pytest.raises(ValidationError, match="Unknown draft order"):
+        engine.draft(rounds=2, order='random')
+
+    engine.assign_items()
+    assert engine.draft_picks is None
+    assert list(engine.iter_export_lines())[0].startswith("User,Assigned Item,")
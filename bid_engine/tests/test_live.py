@@ -0,0 +1,108 @@
+"""
+Tests for live, turn-by-turn bidding.
+"""
+import pytest
+
+from bid_engine.core.engine import BidEngine, ValidationError
+from bid_engine.core.live import Broker, LiveBid, TurnError
+
+
+@pytest.fixture
+def engine():
+    engine = BidEngine()
+    engine.user_selections = {
+        1: ['Shift A', 'Shift B'],
+        2: ['Shift A', 'Shift C'],
+        3: ['Shift A'],
+    }
+    engine.user_rankings = [(1, 2), (2, 1), (3, 3)]
+    engine.set_shift_capacity({'Shift A': 2})
+    return engine
+
+
+def test_picks_follow_rank_order(engine):
+    """Test turn order, seat counts and the pushed events."""
+    live = LiveBid(engine, queue_group='acuity')
+    subscriber = live.broker.subscribe()
+    assert live.current_user == 2
+
+    with pytest.raises(TurnError, match="user 2's turn"):
+        live.pick(1, 'Shift A')
+    with pytest.raises(ValidationError, match="Unknown shift"):
+        live.pick(2, 'Shift Z')
+
+    event = live.pick(2, 'Shift C')
+    assert event == {'type': 'pick', 'user': 2, 'shift': 'Shift C', 'remaining': 0,
+                     'next_user': 1, 'open_seats': 3}
+    assert subscriber.get_nowait() == event
+    with pytest.raises(ValidationError, match="is full"):
+        live.pick(1, 'Shift C')
+
+    live.pick(1, 'Shift A')
+    live.pick(3, 'Shift A')
+    assert live.finished
+    assert [subscriber.get_nowait()['type'] for _ in range(3)] == ['pick', 'pick', 'finished']
+
+    assert engine.assignments == {2: ('Shift C', 2), 1: ('Shift A', 1), 3: ('Shift A', 1)}
+    assert {shift: left for shift, _, _, left in engine.capacity_report()} == \
+        {'Shift A': 0, 'Shift B': 1, 'Shift C': 0}
+    assert live.export_lines()[1].startswith('2,Shift C,2 (2nd),1')
+
+
+def test_auto_pick_and_window(engine):
+    """Test proxy picks from uploaded lists and the bidding window."""
+    live = LiveBid(engine, opens_at=100, closes_at=200)
+    with pytest.raises(TurnError, match="not opened"):
+        live.auto_pick(now=50)
+
+    assert live.auto_pick(now=150)['shift'] == 'Shift A'
+    assert live.auto_pick(now=150)['shift'] == 'Shift A'
+    assert live.auto_pick(now=150) == {'type': 'skip', 'user': 3, 'next_user': None,
+                                       'open_seats': 2}
+    with pytest.raises(TurnError, match="finished"):
+        live.auto_pick(now=150)
+    with pytest.raises(TurnError, match="closed"):
+        live.pick(3, 'Shift B', now=250)
+
+
+def test_broker_drops_slow_subscribers():
+    """Test that a full subscriber is dropped instead of blocking publishers."""
+    broker = Broker(max_queued=1)
+    fast, slow = broker.subscribe(), broker.subscribe()
+    broker.publish({'n': 1})
+    assert fast.get_nowait() == {'n': 1}
+    broker.publish({'n': 2})
+    assert len(broker) == 1
+
+    # The dropped subscriber still drains what it had, then its listener ends
+    assert list(broker.listen(slow, heartbeat=0.01)) == [{'n': 1}]
+
+
+def test_picks_respect_eligibility(engine):
+    """Test that picks and proxy picks only give users shifts they may work."""
+    engine.set_shift_requirements({'Shift A': ['spanish']})
+    engine.set_user_attributes(1, ['spanish'])
+    live = LiveBid(engine)
+
+    with pytest.raises(ValidationError, match="may not take 'Shift A': requires spanish"):
+        live.pick(2, 'Shift A')
+    assert live.auto_pick()['shift'] == 'Shift C'
+    assert live.pick(1, 'Shift A')['shift'] == 'Shift A'
+    assert live.auto_pick() == {'type': 'skip', 'user': 3, 'next_user': None, 'open_seats': 2}
+    assert engine.assignments == {2: ('Shift C', 2), 1: ('Shift A', 1)}
+
+
+def test_picks_off_the_list_have_no_choice_number(engine):
+    """Test that a shift the user didn't list, or a user without a list, isn't a 1st choice."""
+    engine.user_rankings.append((4, 4))
+    live = LiveBid(engine)
+    live.pick(2, 'Shift B')
+    live.pick(1, 'Shift A')
+    live.pick(3, 'Shift A')
+    live.pick(4, 'Shift C')
+    assert engine.assignments[2] == ('Shift B', None)
+
+    lines = live.export_lines()
+    assert lines[1].startswith('2,Shift B,Not listed,1,')
+    assert lines[4] == '4,Shift C,Not listed,4,No selections\r\n'
+    assert '"choice": null' in live.export_lines('jsonl')[0]
@@ -0,0 +1,73 @@
+"""
+Tests for engine profiling hooks and the metrics registry.
+"""
+from bid_engine.core.engine import BidEngine
+from bid_engine.core.metrics import MetricsRegistry
+
+
+def test_engine_reports_every_phase(temp_csv_files):
+    """Test that imports, assignment and export are timed and counted."""
+    selections_file, rankings_file = temp_csv_files
+    metrics = MetricsRegistry()
+    engine = BidEngine()
+    engine.profiler = metrics
+
+    engine.import_user_selections(selections_file)
+    engine.import_user_rankings(rankings_file)
+    engine.assign_items()
+    exported = ''.join(engine.iter_export_lines())
+
+    snapshot = metrics.snapshot()
+    assert set(snapshot['phases']) == {'import_selections', 'import_rankings', 'assign', 'export'}
+    values = {name: value['last'] for name, value in snapshot['values'].items()}
+    assert values['selections_rows'] == 3
+    assert values['rankings_rows'] == 3
+    assert values['distinct_shifts'] == 4
+    assert values['assign_users'] == 3
+    # Every user got their first choice, so one probe each
+    assert values['probes_per_user'] == 1
+    assert values['export_bytes'] == len(exported.encode('utf-8'))
+
+
+def test_probes_stop_when_seats_run_out():
+    """Test that users after the last filled seat are not counted as probed."""
+    metrics = MetricsRegistry()
+    engine = BidEngine()
+    engine.profiler = metrics
+    engine.user_selections = {1: ['A', 'B'], 2: ['A', 'B', 'C'], 3: ['B'], 4: ['A', 'C']}
+    engine.user_rankings = [(1, 1), (2, 2), (3, 3), (4, 4)]
+    engine.assign_items()
+
+    values = metrics.snapshot()['values']
+    # 1 takes A (1 probe), 2 takes B (2), 3 finds nothing (1), 4 takes C (2)
+    assert values['assign_users']['last'] == 4
+    assert values['probes_per_user']['last'] == 6 / 4
+
+    # Only 3 and 4 are re-run; 3 now takes C, the last seat, so 4 is never probed
+    engine.apply_changes(selections={3: ['C']})
+    snapshot = metrics.snapshot()
+    assert snapshot['phases']['reassign']['count'] == 1
+    assert snapshot['values']['assign_users']['last'] == 1
+    assert snapshot['values']['probes_per_user']['last'] == 1
+
+
+def test_prometheus_text():
+    """Test the exposition format of histograms, summaries and gauges."""
+    metrics = MetricsRegistry(buckets=(0.1, 1.0))
+    metrics.observe_phase('assign', 0.05)
+    metrics.observe_phase('assign', 0.5)
+    metrics.record('export_bytes', 100)
+    metrics.record('export_bytes', 50)
+
+    lines = metrics.render({'jobs_queued': 2}, {'cache_hits_total': 3}).splitlines()
+    assert '# TYPE shiftbid_phase_seconds histogram' in lines
+    assert 'shiftbid_phase_seconds_bucket{phase="assign",le="0.1"} 1' in lines
+    assert 'shiftbid_phase_seconds_bucket{phase="assign",le="1.0"} 2' in lines
+    assert 'shiftbid_phase_seconds_bucket{phase="assign",le="+Inf"} 2' in lines
+    assert 'shiftbid_phase_seconds_count{phase="assign"} 2' in lines
+    assert 'shiftbid_export_bytes_sum 150' in lines
+    assert 'shiftbid_export_bytes_count 2' in lines
+    assert 'shiftbid_export_bytes_last 50' in lines
+    assert 'shiftbid_jobs_queued 2' in lines
+    assert '# TYPE shiftbid_cache_hits_total counter' in lines
+    assert 'shiftbid_cache_hits_total 3' in lines
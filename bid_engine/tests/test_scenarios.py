@@ -0,0 +1,81 @@
+"""
+Tests for the what-if scenario runner.
+"""
+import json
+
+import pytest
+
+from bid_engine.cli import load_scenarios, main
+from bid_engine.core.engine import BidEngine, ValidationError
+from bid_engine.core.scenarios import Scenario, run_scenarios
+
+
+@pytest.fixture
+def engine():
+    engine = BidEngine()
+    engine.user_selections = {
+        1: ['Shift A', 'Shift B', 'Shift C'],
+        2: ['Shift B', 'Shift A', 'Shift D'],
+        3: ['Shift C', 'Shift D', 'Shift A'],
+    }
+    engine.user_rankings = [(1, 2), (2, 1), (3, 3)]
+    return engine
+
+
+def test_scenarios_match_engine(engine):
+    """Test that the baseline scenario summarises assign_items."""
+    baseline, = run_scenarios(engine, [Scenario('baseline')], processes=1)
+
+    assert baseline.assigned == len(engine.assign_items()) == 3
+    assert baseline.unassigned == 0
+    assert baseline.first_choice_rate == 1.0
+    assert baseline.mean_choice == 1.0
+
+
+def test_scenario_variants(engine):
+    """Test rank order, closed shift, capacity and exclusion variants."""
+    scenarios = [
+        Scenario('reversed', order=[3, 1, 2]),
+        Scenario('closed', removed_shifts=['Shift B', 'Shift D']),
+        Scenario('shared', capacity={'Shift C': 2}, removed_shifts=['Shift A', 'Shift B']),
+        Scenario('excluded', excluded_users=[2]),
+    ]
+    results = {result.name: result for result in run_scenarios(engine, scenarios, processes=2)}
+
+    assert results['reversed'].first_choice_rate == 1.0
+    assert results['closed'].assigned == 2
+    assert results['closed'].unassigned == 1
+    assert results['shared'].assigned == 3
+    assert results['excluded'].ranked == 2
+
+    with pytest.raises(ValidationError, match="unknown shift"):
+        run_scenarios(engine, [Scenario('typo', removed_shifts=['Shift Z'])])
+
+
+def test_scenarios_cli(temp_csv_files, tmp_path, capsys):
+    """Test the scenarios command end to end."""
+    selections_file, rankings_file = temp_csv_files
+    scenarios_file = tmp_path / "scenarios.json"
+    scenarios_file.write_text(json.dumps([
+        {"name": "baseline"},
+        {"name": "no_b", "removed_shifts": ["Shift B"]},
+    ]))
+
+    assert main(['scenarios', str(selections_file), str(rankings_file),
+                 str(scenarios_file), '--processes', '1']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == 'name,ranked,assigned,unassigned,first_choice_rate,mean_choice'
+    assert lines[1] == 'baseline,3,3,0,1.0000,1.0000'
+    assert lines[2].startswith('no_b,3,3,0,')
+
+
+@pytest.mark.parametrize('field, value', [
+    ('order', [1, 'x']), ('excluded_users', ['1.5']), ('capacity', {'Shift A': 'two'}),
+    ('capacity', ['Shift A']),
+])
+def test_invalid_scenario_numbers(tmp_path, field, value):
+    """Test that non-integer values are reported with the entry they're in."""
+    scenarios_file = tmp_path / "scenarios.json"
+    scenarios_file.write_text(json.dumps([{"name": "baseline"}, {"name": "bad", field: value}]))
+    with pytest.raises(ValidationError, match=r'entry 2 \(bad\)'):
+        load_scenarios(str(scenarios_file))
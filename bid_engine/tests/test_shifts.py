@@ -0,0 +1,76 @@
+"""
+Tests for shift label parsing and timezone conversion.
+"""
+from datetime import date
+
+import pytest
+
+from bid_engine.core.engine import BidEngine, ValidationError
+from bid_engine.core.shifts import convert_labels, format_shift, parse_shift, shift_by_minutes
+
+
+def test_parse_shift_labels():
+    """Test decoding the label formats found in real uploads."""
+    record = parse_shift("IRLC&D INT[4x10] 09:00AM - 08:00PM, SMTW===, Sun")
+
+    assert record.prefix == "IRLC&D INT"
+    assert record.four_by_ten
+    assert (record.start, record.end, record.duration) == (540, 1200, 660)
+    assert record.day_pattern == "SMTW==="
+    assert record.days == 0b0001111
+    assert record.weekend == "Sun"
+
+    plain = parse_shift("08:00AM - 05:00PM, =MTWRF=, Weekday")
+    assert plain.prefix == "" and not plain.four_by_ten
+    assert parse_shift("Shift A") is None
+    assert parse_shift("08:00AM - 05:00PM, =MTWRF=, Weekday") is plain
+
+
+def test_format_round_trips():
+    """Test that formatting a parsed label gives back the label."""
+    for label in ["IRLC&D FND10:15AM - 07:15PM, SM==RFY, Both",
+                  "[4x10] 08:30AM - 07:30PM, ===WRFY, Sat",
+                  "12:00AM - 08:00AM, =MTWRF=, Weekday"]:
+        assert format_shift(parse_shift(label)) == label
+
+
+def test_shift_crossing_midnight_rotates_days():
+    """Test that moving a shift past midnight moves its days and weekend type."""
+    record = parse_shift("08:00PM - 05:00AM, =MTWRF=, Weekday")
+
+    later = shift_by_minutes(record, 5 * 60)
+    assert format_shift(later) == "01:00AM - 10:00AM, ==TWRFY, Sat"
+
+    earlier = shift_by_minutes(parse_shift("02:00AM - 11:00AM, =MTWRF=, Weekday"), -3 * 60)
+    assert format_shift(earlier) == "11:00PM - 08:00AM, SMTWR==, Sun"
+
+
+def test_convert_labels_uses_one_offset_for_the_date():
+    """Test batch conversion, including daylight saving."""
+    labels = ["08:00AM - 05:00PM, ==TWRFY, Sat", "Shift A"]
+
+    summer = convert_labels(labels, "UTC", "America/New_York", on=date(2025, 7, 1))
+    winter = convert_labels(labels, "UTC", "America/New_York", on=date(2025, 1, 15))
+
+    assert summer == ["04:00AM - 01:00PM, ==TWRFY, Sat", "Shift A"]
+    assert winter == ["03:00AM - 12:00PM, ==TWRFY, Sat", "Shift A"]
+    with pytest.raises(ValueError):
+        convert_labels(labels, "UTC", "Mars/Olympus")
+
+
+def test_export_in_requested_timezone():
+    """Test that export shows shifts in the requested timezone."""
+    engine = BidEngine()
+    engine.user_selections = {1: ["10:00AM - 07:00PM, =MTWRF=, Weekday"]}
+    engine.user_rankings = [(1, 1)]
+    engine.shift_timezone = "Asia/Kolkata"
+    engine.assign_items()
+
+    row, = engine.iter_assignment_rows("Asia/Kolkata")
+    assert row[1] == "10:00AM - 07:00PM, =MTWRF=, Weekday"
+    row, = engine.iter_assignment_rows("UTC")
+    assert row[1] == "04:30AM - 01:30PM, =MTWRF=, Weekday"
+    assert row[4] == ["04:30AM - 01:30PM, =MTWRF=, Weekday"]
+
+    with pytest.raises(ValidationError, match="Unknown timezone"):
+        engine.iter_assignment_rows("Mars/Olympus")
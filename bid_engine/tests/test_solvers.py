@@ -0,0 +1,150 @@
+"""
+Tests for the assignment solvers.
+"""
+import itertools
+import random
+from array import array
+
+import pytest
+
+from bid_engine.core.catalog import PreferenceMatrix
+from bid_engine.core.engine import BidEngine, ValidationError
+from bid_engine.core.solvers import (GreedySolver, MinCostSolver, draft, get_solver,
+                                     seniority_cost)
+
+
+def _total_cost(order, preferences, results):
+    position = {user: index for index, user in enumerate(order)}
+    assigned = {user: choice for user, _, choice in results}
+    unassigned = preferences.width + 1
+    return sum(seniority_cost(position[user], assigned.get(user, unassigned), len(order))
+               for user in order)
+
+
+def _brute_force(order, preferences, capacity):
+    """Cheapest feasible assignment by trying every combination."""
+    options = [list(preferences.row(user)) + [None] for user in order]
+    best = None
+    for combo in itertools.product(*options):
+        used = [0] * len(capacity)
+        results = []
+        for user, shift_id in zip(order, combo):
+            if shift_id is not None:
+                used[shift_id] += 1
+                results.append((user, shift_id, list(preferences.row(user)).index(shift_id) + 1))
+        if all(u <= c for u, c in zip(used, capacity)):
+            cost = _total_cost(order, preferences, results)
+            best = cost if best is None else min(best, cost)
+    return best
+
+
+def test_mincost_is_optimal_on_small_instances():
+    """Test the min-cost solver against exhaustive search."""
+    rng = random.Random(11)
+    for _ in range(100):
+        shifts = rng.randint(1, 4)
+        preferences = PreferenceMatrix()
+        for user in range(rng.randint(1, 5)):
+            preferences.set_row(user, rng.sample(range(shifts), rng.randint(1, shifts)))
+        capacity = [rng.randint(0, 2) for _ in range(shifts)]
+        order = rng.sample(preferences.users, len(preferences))
+
+        remaining = array('i', capacity)
+        results = list(MinCostSolver().solve(order, preferences, remaining))
+
+        assert _total_cost(order, preferences, results) == _brute_force(order, preferences, capacity)
+        assert all(seats >= 0 for seats in remaining)
+
+
+def test_mincost_trades_a_senior_choice_for_junior_gains():
+    """Test that the whole group can beat greedy on weighted cost."""
+    engine = BidEngine()
+    engine.user_selections = {
+        1: ['Shift A', 'Shift B'],
+        2: ['Shift A', 'Shift C', 'Shift D', 'Shift E'],
+        3: ['Shift C', 'Shift D', 'Shift E'],
+        4: ['Shift D', 'Shift E'],
+    }
+    engine.user_rankings = [(1, 1), (2, 2), (3, 3), (4, 4)]
+
+    greedy = engine.assign_items()
+    assert greedy[4] == ('Shift E', 2)
+
+    optimal = engine.assign_items(solver='mincost')
+    assert optimal == {
+        1: ('Shift B', 2),
+        2: ('Shift A', 1),
+        3: ('Shift C', 1),
+        4: ('Shift D', 1),
+    }
+    assert isinstance(engine.solver, MinCostSolver)
+
+
+def test_engine_solver_selection(temp_csv_files, tmp_path):
+    """Test solver lookup, export and incremental changes with another solver."""
+    selections_file, rankings_file = temp_csv_files
+    engine = BidEngine()
+    engine.import_user_selections(str(selections_file))
+    engine.import_user_rankings(str(rankings_file))
+
+    with pytest.raises(ValidationError, match="Unknown solver"):
+        engine.assign_items(solver='simplex')
+    assert isinstance(get_solver(GreedySolver), GreedySolver)
+
+    engine.assign_items(solver=MinCostSolver())
+    output_file = tmp_path / "assignments.csv"
+    engine.export_assignments(str(output_file), "TestGroup", "UTC")
+    assert "Shift B" in output_file.read_text()
+
+    # Non-incremental solvers re-solve the whole ranking
+    assert engine.apply_changes(selections={2: ['Shift A']}) == {1, 2}
+    assert engine.assignments[2] == ('Shift A', 1)
+
+
+class _CountingReads(list):
+    reads = 0
+
+    def __getitem__(self, index):
+        _CountingReads.reads += 1
+        return list.__getitem__(self, index)
+
+
+def _draft(preferences, capacity, rounds, snake):
+    remaining = array('i', capacity)
+    picks = list(draft(list(preferences.rows), preferences.rows, preferences.data, preferences.lengths,
+                       preferences.width, remaining, rounds, snake))
+    return picks, remaining
+
+
+def test_draft_snake_and_straight_orders():
+    """Test that snake drafts reverse every other round and nobody repeats a shift."""
+    preferences = PreferenceMatrix()
+    for user in (1, 2, 3):
+        preferences.set_row(user, [0, 1, 2, 3, 4, 5])
+    preferences.set_row(1, [0, 1, 0, 2])
+
+    picks, remaining = _draft(preferences, [2] * 6, rounds=2, snake=True)
+    assert picks == [(1, 1, 0, 1), (1, 2, 0, 1), (1, 3, 1, 2),
+                     (2, 3, 2, 3), (2, 2, 1, 2), (2, 1, 2, 4)]
+    assert list(remaining) == [0, 0, 0, 2, 2, 2]
+
+    straight, _ = _draft(preferences, [2] * 6, rounds=2, snake=False)
+    assert [user for _, user, _, _ in straight] == [1, 2, 3, 1, 2, 3]
+
+
+def test_draft_resumes_from_each_users_cursor():
+    """Test that later rounds never rescan entries a user has already passed."""
+    rng = random.Random(5)
+    users, shifts, rounds = 2000, 400, 5
+    preferences = PreferenceMatrix()
+    for user in range(users):
+        preferences.set_row(user, rng.sample(range(shifts), 40))
+    total_length = sum(preferences.lengths)
+
+    preferences.data = _CountingReads(preferences.data)
+    _CountingReads.reads = 0
+    picks, _ = _draft(preferences, [10] * shifts, rounds, snake=True)
+
+    assert len(picks) == shifts * 10
+    # Each entry is read once to check it, at most twice more if picked or held
+    assert _CountingReads.reads <= total_length + 2 * len(picks) + rounds * users
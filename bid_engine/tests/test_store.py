@@ -0,0 +1,149 @@
+"""
+Tests for the SQLite bid session store.
+"""
+import sqlite3
+
+import pytest
+
+from bid_engine.core.engine import BidEngine, ValidationError
+from bid_engine.core.store import SessionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(tmp_path / 'sessions.db')
+
+
+@pytest.fixture
+def engine(temp_csv_files):
+    selections_file, rankings_file = temp_csv_files
+    engine = BidEngine()
+    engine.import_user_selections(selections_file)
+    engine.import_user_rankings(rankings_file)
+    engine.set_shift_capacity({'Shift A': 2})
+    engine.assign_items()
+    return engine
+
+
+def test_round_trip(store, engine):
+    """Test that a loaded session exports exactly like the original engine."""
+    session_id = store.save(engine, name='selections.csv', queue_group='acuity')
+
+    loaded = store.load(session_id)
+    assert dict(loaded.user_selections) == dict(engine.user_selections)
+    assert loaded.user_rankings == engine.user_rankings
+    assert loaded.catalog.labels == engine.catalog.labels
+    assert loaded.shift_capacity == engine.shift_capacity
+    assert list(loaded.iter_export_lines()) == list(engine.iter_export_lines())
+
+    info, = store.sessions()
+    assert (info.id, info.queue_group, info.solver) == (session_id, 'acuity', 'greedy')
+    assert info.assigned_at is not None
+
+
+def test_draft_round_trip(store, engine, tmp_path):
+    """Test that draft picks are stored per round and restored for export and queries."""
+    engine.draft(rounds=2, order='straight')
+    session_id = store.save(engine)
+
+    loaded = store.load(session_id)
+    assert loaded.draft_picks == engine.draft_picks
+    assert list(loaded.iter_export_lines('jsonl')) == list(engine.iter_export_lines('jsonl'))
+    record = store.user(session_id, 1)
+    assert (record.assigned, record.choice) == engine.draft_picks[1][0]
+    assert record.picks == engine.draft_picks[1]
+    assert store.user(session_id, 2).picks == engine.draft_picks[2]
+    assert store.sessions()[0].assigned_at is not None
+
+    # Older databases gain the round and saved_at columns
+    old = tmp_path / 'old.db'
+    with sqlite3.connect(str(old)) as db:
+        db.execute("CREATE TABLE assignments (session_id INTEGER NOT NULL, seq INTEGER NOT NULL, "
+                   "user_id INTEGER NOT NULL, shift_id INTEGER NOT NULL, choice INTEGER NOT NULL, "
+                   "PRIMARY KEY (session_id, seq)) WITHOUT ROWID")
+        db.execute("CREATE TABLE sessions (id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+                   "queue_group TEXT NOT NULL, shift_timezone TEXT NOT NULL, solver TEXT NOT NULL, "
+                   "created_at REAL NOT NULL, assigned_at REAL)")
+        db.execute("INSERT INTO sessions VALUES (1, 'old', '', 'UTC', 'greedy', 1.0, NULL)")
+    old_store = SessionStore(old)
+    assert old_store.info(1).saved_at == 1.0
+    assert old_store.load(old_store.save(engine)).draft_picks == engine.draft_picks
+
+
+def test_queries(store, engine):
+    """Test looking up one user and one shift."""
+    session_id = store.save(engine)
+
+    record = store.user(session_id, 1)
+    assert record.rank == 2
+    assert record.selections == ['Shift A', 'Shift B', 'Shift C']
+    assert (record.assigned, record.choice) == ('Shift A', 1)
+    assert record.picks == []
+    assert store.user(session_id, 99) is None
+
+    report = store.shift(session_id, 'Shift A')
+    assert report['capacity'] == 2
+    assert sorted(report['assigned']) == [(1, 1)]
+    assert report['requested'] == [(1, 1), (2, 2), (3, 3)]
+    assert store.shift(session_id, 'Shift Z') is None
+
+
+def test_reassign_stored_session(store, engine):
+    """Test re-running a stored session with another solver and saving the result."""
+    session_id = store.save(engine)
+
+    loaded = store.load(session_id)
+    loaded.set_shift_capacity({'Shift D': 0})
+    loaded.assign_items(solver='mincost')
+    store.save_assignments(session_id, loaded)
+
+    assert store.info(session_id).solver == 'mincost'
+    assert store.load(session_id).assignments == loaded.assignments
+    assert store.shift(session_id, 'Shift D')['capacity'] == 0
+
+    store.delete(session_id)
+    assert store.sessions() == []
+    with pytest.raises(ValidationError, match="Unknown session"):
+        store.load(session_id)
+
+
+def test_reserved_sessions_and_pruning(tmp_path, engine):
+    """Test filling in a reserved session and pruning by count and age."""
+    store = SessionStore(tmp_path / 'sessions.db', max_sessions=2)
+    session_id = store.reserve(engine, name='selections.csv')
+    assert store.info(session_id).saved_at is None
+    with pytest.raises(ValidationError, match="still being saved"):
+        store.load(session_id)
+    assert store.save(engine, session_id=session_id) == session_id
+    assert store.info(session_id).name == 'selections.csv'
+    assert store.load(session_id).assignments == engine.assignments
+    with pytest.raises(ValidationError, match="Unknown reserved session"):
+        store.save(engine, session_id=session_id)
+
+    newer = [store.save(engine) for _ in range(2)]
+    assert [info.id for info in store.sessions()] == newer[::-1]
+    assert store.user(session_id, 1) is None
+    assert store.prune(max_age=0) == newer[::-1]
+    assert store.sessions() == []
+
+
+def test_explain_matches_engine(store, temp_csv_files):
+    """Test that a stored session explains choices like the engine's audit index."""
+    selections_file, rankings_file = temp_csv_files
+    engine = BidEngine()
+    engine.import_user_selections(selections_file)
+    engine.import_user_rankings(rankings_file)
+    engine.set_shift_capacity({'Shift A': 0})
+    engine.set_shift_requirements({'Shift C': ['night']})
+    engine.set_user_attributes(3, ['night'], max_hours=36)
+    engine.assign_items(audit=True)
+    session_id = store.save(engine)
+
+    for user in (1, 2, 3):
+        assert store.explain(session_id, user) == engine.explain(user)
+    assert [e.outcome for e in store.explain(session_id, 1)] == ['closed', 'full', 'ineligible']
+    assert store.explain(session_id, 99) is None
+
+    loaded = store.load(session_id).eligibility
+    assert loaded.requirements == {'Shift C': {'night'}}
+    assert (loaded.user_attributes, loaded.max_hours) == ({3: {'night'}}, {3: 36})
@@ -0,0 +1,103 @@
+"""
+Tests for the streaming upload parser.
+"""
+import hashlib
+import io
+
+import pytest
+
+from bid_engine.core.engine import BidEngine, ValidationError
+from bid_engine.web.streaming import read_bid_upload
+
+BOUNDARY = b'bidformboundary'
+SELECTIONS = b"\xef\xbb\xbfuser_id,selection_1,selection_2\r\n1,Shift A,Shift B\r\n2,Shift A,Shift B\r\n"
+RANKINGS = b"user_id,rank\n1,2\n2,1\n"
+
+
+def _form(*parts):
+    """Builds a multipart body from (name, filename or None, content) parts."""
+    body = b''
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += b'--' + BOUNDARY + b'\r\n'
+        body += f'Content-Disposition: {disposition}\r\n\r\n'.encode() + content + b'\r\n'
+    return body + b'--' + BOUNDARY + b'--\r\n'
+
+
+def _read(body, chunk_size=64 * 1024, **kwargs):
+    return read_bid_upload(io.BytesIO(body), BOUNDARY, BidEngine(), chunk_size=chunk_size, **kwargs)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64 * 1024])
+def test_imports_files_whatever_the_chunk_size(chunk_size):
+    """Test that parts split across any number of reads import the same."""
+    body = _form(('queue_group', None, b'acuity'),
+                 ('selections', 'selections.csv', SELECTIONS),
+                 ('rankings', 'rankings.csv', RANKINGS),
+                 ('timezone', None, b'UTC'))
+    upload = _read(body, chunk_size)
+
+    assert upload.error is None
+    assert upload.fields == {'queue_group': 'acuity', 'timezone': 'UTC'}
+    assert upload.filenames == {'selections': 'selections.csv', 'rankings': 'rankings.csv'}
+    assert upload.digests['selections'] == hashlib.sha256(SELECTIONS).hexdigest()
+    assert upload.imported_engine().assign_items() == {2: ('Shift A', 1), 1: ('Shift B', 2)}
+
+
+def test_skips_files_that_are_not_allowed():
+    """Test that rejected and unknown file parts are read past, not imported."""
+    body = _form(('selections', 'selections.txt', SELECTIONS),
+                 ('notes', 'notes.csv', b'anything'),
+                 ('rankings', 'rankings.csv', RANKINGS))
+    upload = _read(body, allowed=lambda filename: filename.endswith('.csv'))
+
+    assert upload.filenames['selections'] == 'selections.txt'
+    assert 'selections' not in upload.digests
+    assert not upload.engine.preferences
+    assert upload.digests.keys() == {'rankings'}
+
+
+def test_keeps_import_error_and_reads_rest_of_form():
+    """Test that a bad file doesn't stop the remaining fields being parsed."""
+    body = _form(('rankings', 'rankings.csv', b'user,rank\n1,1\n'),
+                 ('selections', 'selections.csv', SELECTIONS),
+                 ('queue_group', None, b'acuity'))
+    upload = _read(body)
+
+    assert upload.fields['queue_group'] == 'acuity'
+    assert 'rankings' not in upload.digests
+    assert not upload.engine.preferences
+    with pytest.raises(ValidationError, match='Error importing user rankings'):
+        upload.imported_engine()
+
+
+def test_truncated_body_is_rejected():
+    """Test that a body cut off mid-part raises rather than importing half a file."""
+    body = _form(('selections', 'selections.csv', SELECTIONS))
+    upload = _read(body[:-30])
+    assert not upload.engine.preferences
+    with pytest.raises(ValidationError, match='Malformed upload'):
+        upload.imported_engine()
+
+    with pytest.raises(ValidationError, match='Malformed upload'):
+        _read(_form(('queue_group', None, b'acuity'))[:-30])
+
+
+def test_deferred_imports_wait_for_the_engine():
+    """Test that spooled files are hashed at once but only imported on demand."""
+    body = _form(('selections', 'selections.csv', SELECTIONS),
+                 ('rankings', 'rankings.csv', RANKINGS))
+    upload = _read(body, spool_size=16)
+
+    assert upload.digests['selections'] == hashlib.sha256(SELECTIONS).hexdigest()
+    assert not upload.engine.preferences
+    assert upload.imported_engine().assign_items() == {2: ('Shift A', 1), 1: ('Shift B', 2)}
+
+    upload = _read(_form(('rankings', 'rankings.csv', b'user,rank\n1,1\n')), spool_size=16)
+    with pytest.raises(ValidationError, match='Error importing user rankings'):
+        upload.imported_engine()
+    upload = _read(body, spool_size=16)
+    upload.close()
+    assert not upload.imported_engine().preferences
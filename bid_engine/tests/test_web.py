@@ -0,0 +1,437 @@
+"""
+Tests for the web interface.
+"""
+import io
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from bid_engine.core.metrics import MetricsRegistry
+from bid_engine.core.store import SessionStore
+from bid_engine.web import app as web_app
+from bid_engine.web.app import app
+from bid_engine.web.cache import ResultCache
+from bid_engine.web.jobs import JobQueue, QueueFullError
+
+
+SELECTIONS = b"user_id,selection_1,selection_2\n1,Shift A,Shift B\n2,Shift A,Shift B\n"
+RANKINGS = b"user_id,rank\n1,2\n2,1\n"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    app.config['TESTING'] = True
+    monkeypatch.setattr(web_app, 'job_queue', JobQueue(tmp_path / 'jobs'))
+    monkeypatch.setattr(web_app, 'result_cache', ResultCache(tmp_path / 'cache'))
+    monkeypatch.setattr(web_app, 'metrics', MetricsRegistry())
+    monkeypatch.setattr(web_app, 'session_store', SessionStore(tmp_path / 'sessions.db'))
+    with app.test_client() as client:
+        yield client
+
+
+def _upload(client, **fields):
+    data = {
+        'selections': (io.BytesIO(SELECTIONS), 'selections.csv'),
+        'rankings': (io.BytesIO(RANKINGS), 'rankings.csv'),
+        'queue_group': 'acuity',
+        'timezone': 'UTC',
+    }
+    data.update(fields)
+    return client.post('/upload', data=data, content_type='multipart/form-data')
+
+
+def _stored_session(response):
+    """Returns the session a response reserved, once the background save has written it."""
+    response.get_data()
+    session_id = int(response.headers['X-Bid-Session'])
+    deadline = time.time() + 5
+    while web_app.session_store.info(session_id).saved_at is None:
+        assert time.time() < deadline, f"Session {session_id} was not saved"
+        time.sleep(0.01)
+    return session_id
+
+
+def test_upload_streams_assignments(client):
+    """Test that an upload returns the assignment CSV."""
+    response = _upload(client)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'user_item_assignments_acuity_UTC.csv' in response.headers['Content-Disposition']
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[1] == '2,Shift A,1 (1st),1,"Shift A, Shift B"'
+    assert lines[2] == '1,Shift B,2 (2nd),2,"Shift A, Shift B"'
+
+
+def test_upload_jsonl_format(client):
+    """Test the machine-readable output option."""
+    response = _upload(client, format='jsonl')
+
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.get_data(as_text=True).startswith('{"user": 2, "shift": "Shift A"')
+
+
+def test_repeated_upload_is_served_from_cache(client):
+    """Test that identical inputs skip the engine, whatever the queue group."""
+    def runs(phase='assign'):
+        return web_app.metrics.snapshot()['phases'].get(phase, {}).get('count', 0)
+
+    first = _upload(client).get_data(as_text=True)
+    response = _upload(client, queue_group='acuity-2')
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == first
+    assert 'user_item_assignments_acuity-2_UTC.csv' in response.headers['Content-Disposition']
+    assert runs() == 1
+    assert runs('import_selections') == runs('import_rankings') == 1
+
+    # A different parameter is a different result
+    assert _upload(client, format='jsonl').get_data(as_text=True).startswith('{"user": 2')
+    assert runs() == 2
+    assert web_app.result_cache.stats()['entries'] == 2
+
+
+def test_upload_converts_on_the_bid_date(client):
+    """Test that conversions use the bid date's offset, which is part of the cache key."""
+    shift = "08:00AM - 05:00PM, =MTWRF=, Weekday"
+    selections = (f'user_id,selection_1\n1,"{shift}"\n2,"{shift}"\n').encode()
+
+    def assigned(bid_date):
+        response = _upload(client, selections=(io.BytesIO(selections), 'selections.csv'),
+                           timezone='America/New_York', bid_date=bid_date)
+        return response.get_data(as_text=True).splitlines()[1].split(',')[1]
+
+    assert assigned('2025-01-15') == '"03:00AM - 12:00PM'
+    assert assigned('2025-07-01') == '"04:00AM - 01:00PM'
+    assert web_app.result_cache.stats()['entries'] == 2
+    assert _upload(client, bid_date='July').status_code == 302
+
+
+def test_upload_size_limit(client, monkeypatch):
+    """Test that bodies over MAX_CONTENT_LENGTH are refused while streaming."""
+    monkeypatch.setitem(app.config, 'MAX_CONTENT_LENGTH', 100)
+    assert _upload(client).status_code == 413
+
+
+def test_invalid_upload_redirects_with_error(client):
+    """Test that an import error found mid-stream is reported back on the form."""
+    response = _upload(client, rankings=(io.BytesIO(b'user,rank\n1,1\n'), 'rankings.csv'))
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        message = session['_flashes'][0][1]
+    assert message.startswith('Error processing files: Error importing user rankings')
+
+
+def test_metrics_endpoint(client):
+    """Test that bid phases and counters are exposed in Prometheus format."""
+    _upload(client).get_data()
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    lines = response.get_data(as_text=True).splitlines()
+    assert 'shiftbid_phase_seconds_count{phase="assign"} 1' in lines
+    assert 'shiftbid_phase_seconds_count{phase="export"} 1' in lines
+    assert 'shiftbid_selections_rows_last 2' in lines
+    assert 'shiftbid_distinct_shifts_last 2' in lines
+    assert 'shiftbid_jobs_queued 0' in lines
+    assert '# TYPE shiftbid_cache_misses_total counter' in lines
+    assert 'shiftbid_cache_misses_total 1' in lines
+    assert 'shiftbid_jobs_retained_done 0' in lines
+
+
+def test_uploads_are_stored_as_sessions(client):
+    """Test querying a stored session and re-running it without the files."""
+    session_id = _stored_session(_upload(client))
+
+    assert client.get('/sessions').get_json()[0]['queue_group'] == 'acuity'
+    user = client.get(f'/sessions/{session_id}/users/1').get_json()
+    assert user['assigned'] == 'Shift B' and user['choice'] == 2
+    assert client.get(f'/sessions/{session_id}/users/99').status_code == 404
+    shift = client.get(f'/sessions/{session_id}/shifts', query_string={'shift': 'Shift A'}).get_json()
+    assert shift['assigned'] == [[2, 1]]
+    explained = client.get(f'/sessions/{session_id}/users/1/explain').get_json()
+    assert explained[0]['reason'] == 'taken by rank 1 at their 1st choice'
+    assert explained[1]['outcome'] == 'assigned'
+
+    response = client.post(f'/sessions/{session_id}/assign', data={'solver': 'mincost'})
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).splitlines()[1].startswith('2,Shift A,1 (1st)')
+    assert client.post('/sessions/999/assign').status_code == 404
+
+    assert client.delete(f'/sessions/{session_id}').status_code == 204
+    assert client.get(f'/sessions/{session_id}/users/1').status_code == 404
+    assert client.delete(f'/sessions/{session_id}').status_code == 404
+
+
+def test_live_bid(client, monkeypatch):
+    """Test starting a live bid, picking in turn and streaming its events."""
+    monkeypatch.setattr(web_app, 'live_bids', {})
+    data = {
+        'selections': (io.BytesIO(SELECTIONS), 'selections.csv'),
+        'rankings': (io.BytesIO(RANKINGS), 'rankings.csv'),
+        'queue_group': 'acuity',
+    }
+    response = client.post('/live', data=data, content_type='multipart/form-data',
+                           headers={'Accept': 'application/json'})
+    assert response.status_code == 201
+    live_id = response.get_json()['live_id']
+
+    assert client.get(f'/live/{live_id}').status_code == 200
+    assert client.post(f'/live/{live_id}/pick', data={'user': 1, 'shift': 'Shift A'}).status_code == 409
+    assert client.post(f'/live/{live_id}/pick', data={'user': 2, 'shift': 'Shift B'}).status_code == 200
+    assert client.post(f'/live/{live_id}/auto').get_json()['shift'] == 'Shift A'
+
+    events = client.get(f'/live/{live_id}/events').get_data(as_text=True)
+    assert events.startswith('event: snapshot\ndata: {"current_user": null')
+    lines = client.get(f'/live/{live_id}/download').get_data(as_text=True).splitlines()
+    assert lines[1] == '2,Shift B,2 (2nd),1,"Shift A, Shift B"'
+    assert client.get('/live/unknown').status_code == 404
+
+
+def test_upload_requires_queue_group(client):
+    """Test that missing form fields redirect back with an error."""
+    response = _upload(client, queue_group='')
+    assert response.status_code == 302
+
+
+def test_coverage_page_and_csv(client):
+    """Test the coverage heatmap page and its CSV download."""
+    selections = b'user_id,selection_1\n1,"08:00AM - 05:00PM, =MTWRF=, Weekday"\n'
+
+    def form(**fields):
+        data = {
+            'selections': (io.BytesIO(selections), 'selections.csv'),
+            'rankings': (io.BytesIO(RANKINGS), 'rankings.csv'),
+            'queue_group': 'acuity',
+            'timezone': 'UTC',
+        }
+        data.update(fields)
+        return data
+
+    response = client.post('/coverage', data=form(), content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert b'Staffing Coverage' in response.data
+
+    response = client.post('/coverage', data=form(format='csv'), content_type='multipart/form-data')
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0].startswith('Day,00:00,00:15')
+    assert lines[2].split(',')[33] == '1'   # Monday 08:00
+
+
+def test_background_job_lifecycle(client):
+    """Test that a queued job can be polled and downloaded."""
+    json_headers = {'Accept': 'application/json'}
+    data = {
+        'selections': (io.BytesIO(SELECTIONS), 'selections.csv'),
+        'rankings': (io.BytesIO(RANKINGS), 'rankings.csv'),
+        'queue_group': 'acuity',
+        'timezone': 'UTC',
+    }
+    response = client.post('/jobs', data=data, content_type='multipart/form-data',
+                           headers=json_headers)
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+
+    deadline = time.time() + 10
+    while client.get(f'/jobs/{job_id}', headers=json_headers).get_json()['status'] in ('queued', 'running'):
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+    status = client.get(f'/jobs/{job_id}', headers=json_headers).get_json()
+    assert status['status'] == 'done'
+    assert status['run_seconds'] is not None
+
+    response = client.get(f'/jobs/{job_id}/download')
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).splitlines()[1].startswith('2,Shift A,1 (1st)')
+
+    stats = client.get('/jobs').get_json()
+    assert stats['done'] >= 1 and stats['queued'] == stats['reserved'] == 0
+    assert client.get('/jobs/unknown').status_code == 404
+
+
+def test_jobs_import_on_the_worker(client, monkeypatch):
+    """Test that a full queue is refused before the body is read and imports fail the job."""
+    json_headers = {'Accept': 'application/json'}
+    monkeypatch.setattr(web_app, 'job_queue', JobQueue(web_app.job_queue.result_dir, max_queued=0))
+    response = client.post('/jobs', data=b'not a form', content_type='text/plain',
+                           headers=json_headers)
+    assert response.status_code == 503
+    assert web_app.job_queue.stats()['reserved'] == 0
+
+    monkeypatch.setattr(web_app, 'job_queue', JobQueue(web_app.job_queue.result_dir))
+    data = {
+        'selections': (io.BytesIO(SELECTIONS), 'selections.csv'),
+        'rankings': (io.BytesIO(b'user,rank\n1,1\n'), 'rankings.csv'),
+        'queue_group': 'acuity',
+    }
+    response = client.post('/jobs', data=data, content_type='multipart/form-data',
+                           headers=json_headers)
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+    web_app.job_queue.shutdown()
+    status = client.get(f'/jobs/{job_id}', headers=json_headers).get_json()
+    assert status['status'] == 'failed'
+    assert status['error'].startswith('Error importing user rankings')
+
+    response = client.post('/jobs', data={'queue_group': 'acuity'},
+                           content_type='multipart/form-data', headers=json_headers)
+    assert response.status_code == 400
+    assert web_app.job_queue.stats()['reserved'] == 0
+
+
+def test_job_queue_is_bounded(tmp_path):
+    """Test that submissions beyond the queue limit are rejected."""
+    queue = JobQueue(tmp_path, max_workers=1, max_queued=1)
+    release = threading.Event()
+    queue.submit(lambda path: release.wait(5), 'first.csv')
+    deadline = time.time() + 5
+    while queue.stats()['running'] != 1:
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+    queue.reserve()
+    with pytest.raises(QueueFullError):
+        queue.submit(lambda path: None, 'third.csv')
+    queue.submit(lambda path: path.write_text('ok'), 'second.csv', reserved=True)
+    with pytest.raises(QueueFullError):
+        queue.reserve()
+
+    release.set()
+    queue.shutdown()
+    assert queue.stats()['done'] == queue.stats()['completed_total'] == 2
+
+
+def test_api_streams_ndjson_assignments(client):
+    """Test that a JSON bid body comes back as NDJSON rows with a stored session."""
+    response = client.post('/api/v1/bids', json={
+        'queue_group': 'acuity',
+        'selections': [{'user_id': 1, 'selections': ['Shift A', 'Shift B']},
+                       {'user_id': 2, 'selections': ['Shift A', 'Shift B']}],
+        'rankings': [{'user_id': 1, 'rank': 2}, {'user_id': 2, 'rank': 1}],
+    })
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(row['user'], row['shift'], row['choice']) for row in rows] == [
+        (2, 'Shift A', 1), (1, 'Shift B', 2)]
+    session_id = _stored_session(response)
+    assert client.get(f'/sessions/{session_id}/users/1').get_json()['assigned'] == 'Shift B'
+
+
+def test_api_reports_structured_errors(client, monkeypatch):
+    """Test that bad records, engine errors and other content types get JSON errors."""
+    body = (b'{"type": "options", "queue_group": "acuity", "solver": "fastest"}\n'
+            b'{"type": "selection", "user_id": 1, "selections": ["Shift A"]}\n'
+            b'{"type": "ranking", "user_id": 1, "rank": 1}\n')
+    response = client.post('/api/v1/bids', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 400
+    assert 'Unknown solver' in response.get_json()['error']
+
+    response = client.post('/api/v1/bids', data=body.replace(b'"rank": 1', b'"rank": -1'),
+                           content_type='application/x-ndjson')
+    assert response.get_json()['details'] == [
+        {'location': 'line 3', 'message': 'rank must be a non-negative integer'}]
+
+    response = client.post('/api/v1/bids', data=SELECTIONS, content_type='text/csv')
+    assert response.status_code == 415
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(web_app.session_store, 'reserve', locked)
+    response = client.post('/api/v1/bids', data=body.replace(b'fastest', b'greedy'),
+                           content_type='application/x-ndjson')
+    assert response.status_code == 503
+    assert response.get_json()['details'] == [
+        {'location': 'bid', 'message': 'Could not store the bid session: database is locked'}]
+
+
+def test_api_diff_of_two_exports(client):
+    """Test diffing uploaded exports; before must come first."""
+    before = b"User,Assigned Item\n1,Shift A\n2,Shift B\n"
+    after = b'{"user": 1, "shift": "Shift B"}\n{"user": 2, "shift": "Shift B"}\n'
+    response = client.post('/api/v1/diff?unchanged=1', data={
+        'before': (io.BytesIO(before), 'before.csv'),
+        'after': (io.BytesIO(after), 'after.jsonl'),
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['counts'] == {'moved': 1, 'unchanged': 1, 'newly_assigned': 0, 'newly_unassigned': 0}
+    assert [change['status'] for change in body['changes']] == ['moved', 'unchanged']
+    assert body['headcount'] == [
+        {'shift': 'Shift A', 'before': 1, 'after': 0, 'delta': -1},
+        {'shift': 'Shift B', 'before': 1, 'after': 2, 'delta': 1},
+    ]
+
+    response = client.post('/api/v1/diff', data={'after': (io.BytesIO(after), 'after.jsonl')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert 'Missing before file' in response.get_json()['error']
+    assert client.post('/api/v1/diff', data=after, content_type='text/csv').status_code == 415
+
+
+def test_diff_of_stored_sessions(client):
+    """Test comparing a stored session with a re-run under other capacities."""
+    first_id = _stored_session(_upload(client))
+    second_id = _stored_session(
+        _upload(client, capacity=(io.BytesIO(b"shift,capacity\nShift A,0\n"), 'capacity.csv')))
+
+    body = client.get(f'/sessions/{first_id}/diff/{second_id}').get_json()
+    assert body['counts']['moved'] == 1 and body['counts']['newly_unassigned'] == 1
+    assert client.get(f'/sessions/{first_id}/diff/999').status_code == 404
+
+
+def test_live_bids_are_evicted_and_capped(client, monkeypatch):
+    """Test that ended bids make room for new ones and open bids are capped."""
+    monkeypatch.setattr(web_app, 'live_bids', {})
+    monkeypatch.setitem(app.config, 'LIVE_BID_LIMIT', 1)
+
+    def start():
+        data = {
+            'selections': (io.BytesIO(SELECTIONS), 'selections.csv'),
+            'rankings': (io.BytesIO(RANKINGS), 'rankings.csv'),
+            'queue_group': 'acuity',
+        }
+        return client.post('/live', data=data, content_type='multipart/form-data',
+                           headers={'Accept': 'application/json'})
+
+    first = start().get_json()['live_id']
+    response = start()
+    assert response.status_code == 503
+    assert 'limit 1' in response.get_json()['error']
+
+    client.post(f'/live/{first}/auto')
+    client.post(f'/live/{first}/auto')
+    assert client.get(f'/live/{first}', headers={'Accept': 'application/json'}).get_json()['finished']
+    second = start().get_json()['live_id']
+    assert client.get(f'/live/{first}').status_code == 404
+
+    # Bids idle for LIVE_BID_IDLE seconds are dropped too
+    monkeypatch.setitem(app.config, 'LIVE_BID_IDLE', 0)
+    assert client.get(f'/live/{second}').status_code == 404
+    assert web_app.live_bids == {}
+
+
+def test_api_draft_is_stored_with_its_picks(client):
+    """Test that a multi-round API bid stores every pick in its session."""
+    response = client.post('/api/v1/bids', json={
+        'queue_group': 'acuity', 'rounds': 2, 'draft_order': 'straight',
+        'selections': [{'user_id': 1, 'selections': ['Shift A', 'Shift B']},
+                       {'user_id': 2, 'selections': ['Shift A', 'Shift B']}],
+        'rankings': [{'user_id': 1, 'rank': 2}, {'user_id': 2, 'rank': 1}],
+        'capacity': [{'shift': 'Shift A', 'capacity': 1}, {'shift': 'Shift B', 'capacity': 2}],
+    })
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    session_id = _stored_session(response)
+
+    user = client.get(f'/sessions/{session_id}/users/2').get_json()
+    assert user['assigned'] == 'Shift A'
+    assert user['picks'] == [[row['shift'], row['choice']] for row in rows if row['user'] == 2]
+    shift = client.get(f'/sessions/{session_id}/shifts', query_string={'shift': 'Shift B'}).get_json()
+    assert sorted(user for user, _ in shift['assigned']) == [1, 2]
@@ -0,0 +1,263 @@
+"""
+JSON and NDJSON request bodies for the bid API.
+
+Scheduling systems that already hold selections and rankings in memory
+can POST them as records instead of writing CSV files for the upload
+form.  A body is either one JSON object, with the options at the top
+level and a list of records per kind, or NDJSON with one record per line
+and a ``type`` key naming its kind.  NDJSON is read from the request
+stream a line at a time and each record goes straight into the engine,
+so a large bid is never held as one parsed document.
+
+Records::
+
+    {"type": "selection", "user_id": 1, "selections": ["Shift A", "Shift B"]}
+    {"type": "ranking", "user_id": 1, "rank": 1}
+    {"type": "capacity", "shift": "Shift A", "capacity": 2}
+    {"type": "attributes", "user_id": 1, "attributes": ["spanish"], "max_hours": 40}
+    {"type": "requirement", "shift": "Shift A", "requires": ["spanish"]}
+    {"type": "options", "queue_group": "acuity", "solver": "greedy", ...}
+
+Bad records are collected with their location (``line 12`` or
+``rankings[3]``) and reported together, like the CSV importers' row errors.
+"""
+import io
+import json
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Tuple
+
+from ..core.engine import MAX_REPORTED_ERRORS, BidEngine, ValidationError
+from ..core.solvers import DRAFT_ORDERS
+
+JSON_MIMETYPE = 'application/json'
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl')
+CHUNK_SIZE = 64 * 1024
+
+# Option -> default; options are validated before any assignment runs
+DEFAULT_OPTIONS: Dict[str, Any] = {
+    'queue_group': '',
+    'solver': 'greedy',
+    'timezone': 'UTC',
+    'shift_timezone': 'UTC',
+    'rounds': 1,
+    'draft_order': 'snake',
+}
+
+
+class BidRequestError(ValidationError):
+    """
+    A bid API body that failed validation.
+
+    Attributes:
+        details: ``{'location', 'message'}`` for each bad record or option,
+            at most MAX_REPORTED_ERRORS of them
+        total: Number of problems found, including any not in ``details``
+    """
+
+    def __init__(self, message: str, details: List[Dict[str, str]], total: int = 0):
+        super().__init__(message, errors=[f"{item['location']}: {item['message']}" for item in details])
+        self.details = details
+        self.total = total or len(details)
+
+    def to_dict(self) -> dict:
+        return {'error': str(self), 'details': self.details, 'total': self.total}
+
+
+def _user_id(record: dict) -> int:
+    value = record.get('user_id')
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError("user_id must be a non-negative integer")
+    return value
+
+
+def _count(record: dict, key: str) -> int:
+    value = record.get(key)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError(f"{key} must be a non-negative integer")
+    return value
+
+
+def _label(record: dict) -> str:
+    value = record.get('shift')
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError("shift must be a non-empty string")
+    return value
+
+
+def _names(record: dict, key: str) -> List[str]:
+    value = record.get(key, [])
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"{key} must be a list of strings")
+    return [item for item in value if item.strip()]
+
+
+def _selection(engine: BidEngine, record: dict) -> None:
+    user = _user_id(record)
+    selections = _names(record, 'selections')
+    if not selections:
+        raise ValueError(f"No selections found for user {user}")
+    engine.set_user_selections(user, selections)
+
+
+def _ranking(engine: BidEngine, record: dict) -> None:
+    engine.user_rankings.append((_user_id(record), _count(record, 'rank')))
+
+
+def _capacity(engine: BidEngine, record: dict) -> None:
+    engine.set_shift_capacity({_label(record): _count(record, 'capacity')})
+
+
+def _attributes(engine: BidEngine, record: dict) -> None:
+    max_hours = record.get('max_hours')
+    if max_hours is not None and (isinstance(max_hours, bool)
+                                  or not isinstance(max_hours, (int, float)) or max_hours < 0):
+        raise ValueError("max_hours must be a non-negative number or null")
+    engine.set_user_attributes(_user_id(record), _names(record, 'attributes'), max_hours)
+
+
+def _requirement(engine: BidEngine, record: dict) -> None:
+    engine.set_shift_requirements({_label(record): _names(record, 'requires')})
+
+
+# Record type -> (list key in a JSON body, handler applying it to the engine)
+RECORDS: Dict[str, Tuple[str, Callable[[BidEngine, dict], None]]] = {
+    'selection': ('selections', _selection),
+    'ranking': ('rankings', _ranking),
+    'capacity': ('capacity', _capacity),
+    'attributes': ('attributes', _attributes),
+    'requirement': ('requirements', _requirement),
+}
+
+
+class BidRequest:
+    """
+    A bid API body read into an engine.
+
+    Attributes:
+        engine: Engine holding the records
+        options: DEFAULT_OPTIONS updated from the body
+    """
+
+    def __init__(self, engine: BidEngine):
+        self.engine = engine
+        self.options = dict(DEFAULT_OPTIONS)
+        self._problems: List[Dict[str, str]] = []
+        self._total = 0
+
+    def _problem(self, location: str, message: str) -> None:
+        self._total += 1
+        if len(self._problems) < MAX_REPORTED_ERRORS:
+            self._problems.append({'location': location, 'message': message})
+
+    def _apply(self, location: str, kind: Any, record: Any) -> None:
+        if not isinstance(record, dict):
+            self._problem(location, "record must be a JSON object")
+            return
+        if kind == 'options':
+            self._set_options(location, record)
+            return
+        entry = RECORDS.get(kind)
+        if entry is None:
+            self._problem(location, f"unknown record type {kind!r}, expected one of "
+                                    f"{sorted(RECORDS) + ['options']}")
+            return
+        try:
+            entry[1](self.engine, record)
+        except (ValueError, ValidationError) as e:
+            self._problem(location, str(e))
+
+    def _set_options(self, location: str, record: dict) -> None:
+        for key, value in record.items():
+            if key == 'type':
+                continue
+            if key not in DEFAULT_OPTIONS:
+                self._problem(location, f"unknown option {key!r}")
+            elif key == 'rounds':
+                if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+                    self._problem(location, "rounds must be an integer of at least 1")
+                else:
+                    self.options[key] = value
+            elif not isinstance(value, str):
+                self._problem(location, f"{key} must be a string")
+            elif key == 'draft_order' and value not in DRAFT_ORDERS:
+                self._problem(location, f"draft_order must be one of {list(DRAFT_ORDERS)}")
+            else:
+                self.options[key] = value
+
+    def _check(self) -> None:
+        """Raises every problem found so far, and checks the bid can be assigned."""
+        engine = self.engine
+        if not self._problems:
+            if not len(engine.preferences):
+                self._problem('body', "no selection records")
+            if not engine.user_rankings:
+                self._problem('body', "no ranking records")
+            if not self.options['queue_group']:
+                self._problem('options', "queue_group is required")
+        if self._problems:
+            raise BidRequestError(f"Invalid bid request: {self._total} problem(s)",
+                                  self._problems, self._total)
+        engine.shift_timezone = self.options['shift_timezone']
+
+
+def read_bid_request(stream: BinaryIO, mimetype: str, engine: BidEngine) -> BidRequest:
+    """
+    Reads a JSON or NDJSON bid body into ``engine``.
+
+    Args:
+        stream: Request body
+        mimetype: Content type without parameters
+        engine: Fresh engine to fill; it should be discarded on error
+
+    Returns:
+        The parsed request
+
+    Raises:
+        BidRequestError: If the body is malformed, a record or option is
+            invalid, or there are no selections or rankings
+    """
+    request = BidRequest(engine)
+    if mimetype in NDJSON_MIMETYPES:
+        for location, record in _ndjson_records(request, stream):
+            request._apply(location, record.get('type') if isinstance(record, dict) else None,
+                           record)
+    elif mimetype == JSON_MIMETYPE:
+        _read_json(request, stream)
+    else:
+        raise BidRequestError("Unsupported content type", [{
+            'location': 'body',
+            'message': f"expected {JSON_MIMETYPE} or one of {list(NDJSON_MIMETYPES)}, got {mimetype!r}",
+        }])
+    request._check()
+    return request
+
+
+def _ndjson_records(request: BidRequest, stream: BinaryIO) -> Iterator[Tuple[str, Any]]:
+    """Yields (location, decoded record) per non-blank line, reporting bad JSON."""
+    for number, line in enumerate(io.BufferedReader(stream, CHUNK_SIZE), 1):
+        if not line.strip():
+            continue
+        try:
+            yield f"line {number}", json.loads(line)
+        except ValueError as e:
+            request._problem(f"line {number}", f"invalid JSON: {str(e)}")
+
+
+def _read_json(request: BidRequest, stream: BinaryIO) -> None:
+    try:
+        body = json.load(stream)
+    except ValueError as e:
+        request._problem('body', f"invalid JSON: {str(e)}")
+        return
+    if not isinstance(body, dict):
+        request._problem('body', "expected a JSON object")
+        return
+    lists = {key: kind for kind, (key, _) in RECORDS.items()}
+    options = {key: value for key, value in body.items() if key not in lists}
+    request._set_options('options', options)
+    for key, kind in lists.items():
+        records = body.get(key, [])
+        if not isinstance(records, list):
+            request._problem(key, "expected a list of records")
+            continue
+        for index, record in enumerate(records):
+            request._apply(f"{key}[{index}]", kind, record)
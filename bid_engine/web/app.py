@@ -1,22 +1,79 @@
 """
 Web interface for the Shift Bidding Engine.
 """
+import io
+import json
 import os
 import argparse
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import date, datetime
 from pathlib import Path
-from flask import Flask, render_template, request, flash, redirect, url_for, send_file
+from functools import partial
+from flask import (Flask, Response, abort, jsonify, render_template, request, flash, redirect,
+                   send_file, url_for, stream_with_context)
 from werkzeug.utils import secure_filename
 import pytz
+from ..core.coverage import DAYS, slot_labels, write_coverage
+from ..core.diff import diff_assignments
 from ..core.engine import BidEngine, ValidationError
+from ..core.live import LiveBid, TurnError
+from ..core.metrics import MetricsRegistry
+from ..core.shifts import utc_offset_minutes
+from ..core.store import SessionStore
+from .api import JSON_MIMETYPE, NDJSON_MIMETYPES, BidRequestError, read_bid_request
+from .cache import ResultCache, cache_key
+from .jobs import DONE, JobQueue, QueueFullError, run_bid
+from .streaming import read_bid_upload, read_diff_upload
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev')
 app.config['UPLOAD_FOLDER'] = Path(__file__).parent / 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Uploads are streamed into the engine, so the request size limit can be generous
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_BYTES', 1024 * 1024 * 1024))
+# Uploads that may be served from the result cache are held until the cache is checked,
+# in memory up to this size per file and in a temporary file past it
+app.config['UPLOAD_SPOOL_BYTES'] = int(os.environ.get('UPLOAD_SPOOL_BYTES', 8 * 1024 * 1024))
+
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+app.config['JOB_QUEUE_LIMIT'] = int(os.environ.get('JOB_QUEUE_LIMIT', 20))
+app.config['RESULT_CACHE_BYTES'] = int(os.environ.get('RESULT_CACHE_BYTES', 256 * 1024 * 1024))
+app.config['RESULT_CACHE_AGE'] = float(os.environ.get('RESULT_CACHE_AGE', 7 * 24 * 3600))
+# Live bids kept in memory at once; ended bids stay downloadable for LIVE_BID_RETENTION
+# seconds, and bids without a pick for LIVE_BID_IDLE seconds are dropped
+app.config['LIVE_BID_LIMIT'] = int(os.environ.get('LIVE_BID_LIMIT', 50))
+app.config['LIVE_BID_RETENTION'] = float(os.environ.get('LIVE_BID_RETENTION', 3600))
+app.config['LIVE_BID_IDLE'] = float(os.environ.get('LIVE_BID_IDLE', 24 * 3600))
+app.config['SESSION_DB'] = Path(os.environ.get('SESSION_DB', app.config['UPLOAD_FOLDER'] / 'sessions.db'))
+# Stored sessions are pruned to the newest SESSION_LIMIT, and to SESSION_MAX_AGE seconds
+app.config['SESSION_LIMIT'] = int(os.environ.get('SESSION_LIMIT', 100))
+app.config['SESSION_MAX_AGE'] = float(os.environ.get('SESSION_MAX_AGE', 30 * 24 * 3600))
 
 # Ensure upload directory exists
 app.config['UPLOAD_FOLDER'].mkdir(parents=True, exist_ok=True)
 
+job_queue = JobQueue(
+    app.config['UPLOAD_FOLDER'] / 'jobs',
+    max_workers=app.config['JOB_WORKERS'],
+    max_queued=app.config['JOB_QUEUE_LIMIT'],
+)
+result_cache = ResultCache(
+    app.config['UPLOAD_FOLDER'] / 'cache',
+    max_bytes=app.config['RESULT_CACHE_BYTES'],
+    max_age=app.config['RESULT_CACHE_AGE'],
+)
+session_store = SessionStore(app.config['SESSION_DB'], max_sessions=app.config['SESSION_LIMIT'],
+                             max_age=app.config['SESSION_MAX_AGE'])
+
+# Live bids in progress, by ID; each keeps its own engine and event broker
+live_bids = {}
+live_bids_lock = threading.Lock()
+
+# Engine phase timings and counters for every bid run by this process
+metrics = MetricsRegistry()
+
 ALLOWED_EXTENSIONS = {'csv'}
 
 def allowed_file(filename):
@@ -30,62 +87,152 @@ def index():
     timezones = pytz.common_timezones
     return render_template('index.html', timezones=timezones)
 
+def _stream_upload(defer=False):
+    """
+    Reads the bid form from the request stream, importing its CSV files as they arrive.
+
+    The body is never buffered by Werkzeug (request.files and request.form
+    are left untouched), so the request size is only capped by
+    MAX_CONTENT_LENGTH.  With ``defer`` the files are only hashed and
+    spooled, and imported by upload.imported_engine(), so a cached result
+    can be served without running the engine at all.
+
+    Returns:
+        (upload, error): The StreamedUpload, and a message if the form is
+        incomplete.  Import errors are raised by upload.imported_engine().
+    """
+    if request.mimetype != 'multipart/form-data' or not request.mimetype_params.get('boundary'):
+        return None, 'Both files are required'
+    engine = BidEngine()
+    engine.profiler = metrics
+    try:
+        upload = read_bid_upload(request.stream, request.mimetype_params['boundary'].encode(),
+                                 engine, allowed=allowed_file,
+                                 spool_size=app.config['UPLOAD_SPOOL_BYTES'] if defer else None)
+    except ValidationError as e:
+        return None, str(e)
+    engine.shift_timezone = upload.fields.get('shift_timezone', 'UTC')
+    try:
+        engine.bid_date = _form_date(upload.fields, 'bid_date')
+    except ValidationError as e:
+        return upload, str(e)
+    return upload, _check_upload_form(upload)
+
+def _check_upload_form(upload):
+    """Returns an error message if the upload form is incomplete, else None."""
+    filenames = upload.filenames
+    if 'selections' not in filenames or 'rankings' not in filenames:
+        return 'Both files are required'
+
+    if not upload.fields.get('queue_group', ''):
+        return 'Queue group is required'
+
+    if not all([filenames['selections'], filenames['rankings']]):
+        return 'Please select both files'
+
+    uploads = [filenames['selections'], filenames['rankings']]
+    uploads.extend(filenames[name] for name in ('capacity', 'attributes', 'requirements')
+                   if filenames.get(name))
+    if not all(allowed_file(filename) for filename in uploads):
+        return 'Only CSV files are allowed'
+    return None
+
+def _store_session(engine, name, queue_group):
+    """
+    Reserves a session for an engine and saves it on the job pool.
+
+    Writing a large bid to SQLite takes longer than assigning and exporting
+    it, so the response streams while the session is written.
+
+    Returns:
+        The session ID, which can be looked up once its saved_at is set
+    """
+    session_id = session_store.reserve(engine, name=name, queue_group=queue_group)
+    job_queue.run_background(partial(_save_session, engine, session_id))
+    return session_id
+
+def _save_session(engine, session_id):
+    """Fills in a reserved session, dropping it if the write fails."""
+    try:
+        session_store.save(engine, session_id=session_id)
+    except Exception:
+        app.logger.exception("Could not store session %s", session_id)
+        session_store.delete(session_id)
+
+def _result_key(upload, timezone, output_format):
+    """
+    Cache key for an export; the queue group only names the file, so it's left out.
+
+    Converted labels depend on the UTC offsets on the bid date (today if the
+    form has none), so the offset is part of the key and an export cached
+    before a daylight saving change isn't served after it.
+    """
+    shift_timezone = upload.fields.get('shift_timezone', 'UTC')
+    try:
+        offset = str(utc_offset_minutes(timezone, upload.engine.bid_date)
+                     - utc_offset_minutes(shift_timezone, upload.engine.bid_date))
+    except ValueError:
+        # The export reports the unknown timezone
+        offset = None
+    return cache_key(
+        upload.digests['selections'],
+        upload.digests['rankings'],
+        upload.digests.get('capacity'),
+        upload.digests.get('attributes'),
+        upload.digests.get('requirements'),
+        shift_timezone,
+        upload.fields.get('solver', 'greedy'),
+        timezone,
+        offset,
+        output_format,
+    )
+
 @app.route('/upload', methods=['POST'])
 def upload_files():
     """Handle file uploads and process assignments."""
     print("Processing file upload")  # Debug output
-    if 'selections' not in request.files or 'rankings' not in request.files:
-        flash('Both files are required', 'error')
+    upload, error = _stream_upload(defer=True)
+    if error:
+        if upload is not None:
+            upload.close()
+        flash(error, 'error')
         return redirect(url_for('index'))
 
-    selections_file = request.files['selections']
-    rankings_file = request.files['rankings']
-    queue_group = request.form.get('queue_group', '')
-    timezone = request.form.get('timezone', 'UTC')
+    queue_group = upload.fields['queue_group']
+    timezone = upload.fields.get('timezone', 'UTC')
+    output_format = upload.fields.get('format', 'csv')
 
-    if not queue_group:
-        flash('Queue group is required', 'error')
-        return redirect(url_for('index'))
+    extension = 'jsonl' if output_format == 'jsonl' else 'csv'
+    output_filename = secure_filename(f"user_item_assignments_{queue_group}_{timezone}.{extension}")
+    mimetype = 'application/x-ndjson' if output_format == 'jsonl' else 'text/csv'
 
-    if not all([selections_file.filename, rankings_file.filename]):
-        flash('Please select both files', 'error')
-        return redirect(url_for('index'))
+    try:
+        print(f"Processing files: {upload.filenames['selections']}, "
+              f"{upload.filenames['rankings']}")  # Debug output
+        if upload.error is not None:
+            upload.close()
+            raise upload.error
+        # The files were only hashed so far; a hit never imports them
+        key = _result_key(upload, timezone, output_format)
+        cached = result_cache.open(key)
+        if cached is not None:
+            upload.close()
+            app.logger.info("Serving cached output file: %s", output_filename)
+            return send_file(cached, mimetype=mimetype, as_attachment=True,
+                             download_name=output_filename)
 
-    if not all(allowed_file(f.filename) for f in [selections_file, rankings_file]):
-        flash('Only CSV files are allowed', 'error')
-        return redirect(url_for('index'))
+        engine = upload.imported_engine()
+        engine.assign_items(solver=upload.fields.get('solver', 'greedy'))
+        lines = engine.iter_export_lines(output_format, timezone)
+        session_id = _store_session(engine, upload.filenames['selections'], queue_group)
 
-    try:
-        print(f"Processing files: {selections_file.filename}, {rankings_file.filename}")  # Debug output
-        # Save uploaded files
-        selections_path = app.config['UPLOAD_FOLDER'] / secure_filename(selections_file.filename)
-        rankings_path = app.config['UPLOAD_FOLDER'] / secure_filename(rankings_file.filename)
-        
-        selections_file.save(str(selections_path))
-        rankings_file.save(str(rankings_path))
-
-        # Process assignments
-        engine = BidEngine()
-        engine.import_user_selections(str(selections_path))
-        engine.import_user_rankings(str(rankings_path))
-        assignments = engine.assign_items()
-
-        # Generate output file
-        output_filename = f"user_item_assignments_{queue_group}_{timezone}.csv"
-        output_path = app.config['UPLOAD_FOLDER'] / output_filename
-        engine.export_assignments(str(output_path), queue_group, timezone)
-
-        # Clean up input files
-        selections_path.unlink()
-        rankings_path.unlink()
-
-        print(f"Generated output file: {output_filename}")  # Debug output
-        # Send the output file
-        return send_file(
-            output_path,
-            as_attachment=True,
-            download_name=output_filename,
-            mimetype='text/csv'
+        app.logger.info("Streaming output file: %s", output_filename)
+        # Stream the output straight into the response, keeping a copy in the cache
+        return Response(
+            stream_with_context(result_cache.tee(key, lines)),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{output_filename}"',
+                     'X-Bid-Session': str(session_id)}
         )
 
     except ValidationError as e:
@@ -97,6 +244,497 @@ def upload_files():
         flash(f'An unexpected error occurred: {str(e)}', 'error')
         return redirect(url_for('index'))
 
+@app.route('/coverage', methods=['POST'])
+def coverage():
+    """Run assignments and show or download the staffing coverage grid."""
+    upload, error = _stream_upload()
+    if error:
+        flash(error, 'error')
+        return redirect(url_for('index'))
+
+    queue_group = upload.fields['queue_group']
+    timezone = upload.fields.get('timezone', 'UTC')
+
+    try:
+        engine = upload.imported_engine()
+        engine.assign_items(solver=upload.fields.get('solver', 'greedy'))
+        grid = engine.coverage_matrix(timezone)
+    except ValidationError as e:
+        flash(f'Error processing files: {str(e)}', 'error')
+        return redirect(url_for('index'))
+    except Exception as e:
+        app.logger.exception("Coverage request failed")
+        flash(f'An unexpected error occurred: {str(e)}', 'error')
+        return redirect(url_for('index'))
+
+    if upload.fields.get('format') == 'csv':
+        output = io.StringIO()
+        write_coverage(grid, output)
+        output_filename = secure_filename(f"coverage_{queue_group}_{timezone}.csv")
+        return Response(
+            output.getvalue(),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename="{output_filename}"'}
+        )
+
+    return render_template(
+        'coverage.html',
+        queue_group=queue_group,
+        timezone=timezone,
+        days=DAYS,
+        slots=slot_labels(),
+        grid=grid.tolist(),
+        peak=max(int(grid.max()), 1),
+    )
+
+def _wants_json():
+    """True if the client prefers a JSON response over HTML."""
+    best = request.accept_mimetypes.best_match(['application/json', 'text/html'])
+    return best == 'application/json'
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a bid run in the background and return its job ID right away."""
+    # Refuse a full queue before reading the body
+    try:
+        job_queue.reserve()
+    except QueueFullError as e:
+        return _job_error(str(e), 503)
+    try:
+        job = _queue_upload()
+    except ValidationError as e:
+        job_queue.release()
+        return _job_error(str(e), 400)
+    except BaseException:
+        job_queue.release()
+        raise
+
+    app.logger.info("Queued job %s", job.id)
+    if _wants_json():
+        return jsonify({
+            'job_id': job.id,
+            'status_url': url_for('job_status', job_id=job.id),
+            'download_url': url_for('download_job', job_id=job.id),
+        }), 202
+    return redirect(url_for('job_status', job_id=job.id))
+
+def _job_error(message, status):
+    if _wants_json():
+        return jsonify({'error': message}), status
+    flash(message, 'error')
+    return redirect(url_for('index'))
+
+def _queue_upload():
+    """
+    Reads the bid form into spooled files and submits it in the place reserve() holds.
+
+    The files are imported by the worker, so requests waiting for the pool
+    hold raw files rather than engines and imports run at most JOB_WORKERS
+    at a time.  Errors in the files themselves fail the job.
+
+    Raises:
+        ValidationError: If the form is incomplete
+    """
+    upload, error = _stream_upload(defer=True)
+    if error is None and upload.error is not None:
+        error = f'Error processing files: {upload.error}'
+    if error:
+        if upload is not None:
+            upload.close()
+        raise ValidationError(error)
+
+    queue_group = upload.fields['queue_group']
+    timezone = upload.fields.get('timezone', 'UTC')
+    output_format = upload.fields.get('format', 'csv')
+    extension = 'jsonl' if output_format == 'jsonl' else 'csv'
+    work = partial(
+        _run_upload_job,
+        upload=upload,
+        key=_result_key(upload, timezone, output_format),
+        queue_group=queue_group,
+        timezone=timezone,
+        solver=upload.fields.get('solver', 'greedy'),
+        output_format=output_format,
+        store=session_store,
+    )
+    return job_queue.submit(
+        work,
+        download_name=secure_filename(f"user_item_assignments_{queue_group}_{timezone}.{extension}"),
+        mimetype='application/x-ndjson' if output_format == 'jsonl' else 'text/csv',
+        reserved=True,
+    )
+
+def _run_upload_job(result_path, upload, key, **options):
+    """Copies identical inputs' result from the cache, or imports and runs the upload."""
+    try:
+        result_cache.run(key, partial(run_bid, upload=upload, **options), result_path)
+    finally:
+        upload.close()
+
+def _api_error(error, status=400):
+    """JSON error body shared by the API routes: message, per-record details and count."""
+    if isinstance(error, BidRequestError):
+        body = error.to_dict()
+    else:
+        details = [{'location': 'bid', 'message': message} for message in error.errors]
+        body = {'error': str(error), 'details': details or [{'location': 'bid', 'message': str(error)}],
+                'total': len(details) or 1}
+    return jsonify(body), status
+
+@app.route('/api/v1/bids', methods=['POST'])
+def api_run_bid():
+    """
+    Run a bid from a JSON or NDJSON body and stream the assignments back as NDJSON.
+
+    The records are imported as the body is read; once the bid is assigned
+    (or drafted, with rounds > 1) each export row is sent as soon as it is
+    formatted, while the session is stored in the background.  Validation
+    errors come back as 400 with one detail per bad record, before any row
+    is sent, and a session store that can't be written to as 503.
+    """
+    if request.mimetype != JSON_MIMETYPE and request.mimetype not in NDJSON_MIMETYPES:
+        return _api_error(BidRequestError("Unsupported content type", [{
+            'location': 'body',
+            'message': f"expected {JSON_MIMETYPE} or one of {list(NDJSON_MIMETYPES)}",
+        }]), 415)
+    engine = BidEngine()
+    engine.profiler = metrics
+    try:
+        bid = read_bid_request(request.stream, request.mimetype, engine)
+        options = bid.options
+        if options['rounds'] > 1:
+            engine.draft(options['rounds'], options['draft_order'])
+        else:
+            engine.assign_items(solver=options['solver'])
+        lines = engine.iter_export_lines('jsonl', options['timezone'])
+        session_id = _store_session(engine, 'api', options['queue_group'])
+    except ValidationError as e:
+        return _api_error(e)
+    except sqlite3.Error as e:
+        return _api_error(ValidationError(f"Could not store the bid session: {e}"), 503)
+
+    return Response(
+        stream_with_context(lines),
+        mimetype='application/x-ndjson',
+        headers={'X-Bid-Session': str(session_id)}
+    )
+
+def _keep_unchanged():
+    """True if ?unchanged=1 asks for unchanged users to be listed in a diff."""
+    return request.args.get('unchanged', '').lower() in ('1', 'true', 'yes')
+
+@app.route('/api/v1/diff', methods=['POST'])
+def api_diff():
+    """
+    Compare two assignment exports, uploaded as the files before and after.
+
+    Returns moved, unchanged, newly assigned and newly unassigned counts,
+    the users who changed (add ?unchanged=1 for everyone) and per-shift
+    headcount deltas.
+    """
+    boundary = request.mimetype_params.get('boundary')
+    if request.mimetype != 'multipart/form-data' or not boundary:
+        return _api_error(ValidationError("Expected a multipart form with before and after files"),
+                          415)
+    try:
+        diff = read_diff_upload(request.stream, boundary.encode(), keep_unchanged=_keep_unchanged())
+    except ValidationError as e:
+        return _api_error(e)
+    return jsonify(diff.to_dict())
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Report queue depth, worker usage, per-job timings and result cache usage."""
+    return jsonify(dict(job_queue.stats(), cache=result_cache.stats()))
+
+def _form_date(fields, field):
+    """Parses an optional ISO 8601 date form field."""
+    value = fields.get(field)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError(f"Invalid {field}: {value!r}, expected an ISO 8601 date")
+
+def _form_timestamp(fields, field):
+    """Parses an optional ISO 8601 form field into epoch seconds."""
+    value = fields.get(field)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValidationError(f"Invalid {field}: {value!r}, expected an ISO 8601 time")
+
+def _prune_live_bids(now):
+    """Drop ended bids past their retention and idle bids; the caller holds live_bids_lock."""
+    for live_id, live in list(live_bids.items()):
+        ended = live.ended_at(now)
+        idle_since = max(live.active_at, live.opens_at or 0)
+        if ((ended is not None and now - ended >= app.config['LIVE_BID_RETENTION'])
+                or now - idle_since >= app.config['LIVE_BID_IDLE']):
+            live_bids.pop(live_id).broker.close()
+
+def _add_live_bid(live):
+    """Register a live bid under a new ID, or return None if LIVE_BID_LIMIT bids are still open."""
+    now = time.time()
+    with live_bids_lock:
+        _prune_live_bids(now)
+        # At the limit, make room by dropping the bids that ended first
+        ended = sorted((other.ended_at(now), other_id) for other_id, other in live_bids.items()
+                       if other.ended_at(now) is not None)
+        for _, other_id in ended[:max(len(live_bids) - app.config['LIVE_BID_LIMIT'] + 1, 0)]:
+            live_bids.pop(other_id).broker.close()
+        if len(live_bids) >= app.config['LIVE_BID_LIMIT']:
+            return None
+        live_id = uuid.uuid4().hex
+        live_bids[live_id] = live
+    return live_id
+
+def _get_live_bid(live_id):
+    with live_bids_lock:
+        _prune_live_bids(time.time())
+        live = live_bids.get(live_id)
+    if live is None:
+        abort(404)
+    return live
+
+@app.route('/live', methods=['POST'])
+def start_live_bid():
+    """Start a live bid where ranked users pick shifts in turn."""
+    upload, error = _stream_upload()
+    if error:
+        if _wants_json():
+            return jsonify({'error': error}), 400
+        flash(error, 'error')
+        return redirect(url_for('index'))
+
+    try:
+        live = LiveBid(upload.imported_engine(), queue_group=upload.fields['queue_group'],
+                       opens_at=_form_timestamp(upload.fields, 'opens_at'),
+                       closes_at=_form_timestamp(upload.fields, 'closes_at'))
+    except ValidationError as e:
+        if _wants_json():
+            return jsonify({'error': str(e)}), 400
+        flash(f'Error processing files: {str(e)}', 'error')
+        return redirect(url_for('index'))
+
+    live_id = _add_live_bid(live)
+    if live_id is None:
+        error = f"Too many live bids in progress (limit {app.config['LIVE_BID_LIMIT']})"
+        if _wants_json():
+            return jsonify({'error': error}), 503
+        flash(error, 'error')
+        return redirect(url_for('index'))
+    if _wants_json():
+        return jsonify({
+            'live_id': live_id,
+            'state_url': url_for('live_bid', live_id=live_id),
+            'events_url': url_for('live_events', live_id=live_id),
+        }), 201
+    return redirect(url_for('live_bid', live_id=live_id))
+
+@app.route('/live/<live_id>')
+def live_bid(live_id):
+    """Show a live bid's turn and open shifts."""
+    live = _get_live_bid(live_id)
+    if _wants_json():
+        return jsonify(live.snapshot())
+    return render_template('live.html', live_id=live_id, queue_group=live.queue_group,
+                           state=live.snapshot())
+
+@app.route('/live/<live_id>/pick', methods=['POST'])
+def live_pick(live_id):
+    """Pick a shift for the user whose turn it is (form fields user and shift)."""
+    live = _get_live_bid(live_id)
+    try:
+        user = int(request.form.get('user', ''))
+    except ValueError:
+        return jsonify({'error': 'user must be a user ID'}), 400
+    try:
+        return jsonify(live.pick(user, request.form.get('shift', '')))
+    except TurnError as e:
+        return jsonify({'error': str(e)}), 409
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/live/<live_id>/auto', methods=['POST'])
+def live_auto_pick(live_id):
+    """Pick for the current user from their uploaded list, e.g. when they miss their turn."""
+    live = _get_live_bid(live_id)
+    try:
+        return jsonify(live.auto_pick())
+    except TurnError as e:
+        return jsonify({'error': str(e)}), 409
+
+@app.route('/live/<live_id>/events')
+def live_events(live_id):
+    """Stream picks to the browser as Server-Sent Events."""
+    live = _get_live_bid(live_id)
+    # Subscribe before the snapshot so no pick falls between the two
+    subscriber = live.broker.subscribe()
+    snapshot = live.snapshot()
+
+    def stream():
+        yield f"event: snapshot\ndata: {json.dumps(snapshot)}\n\n"
+        if snapshot['finished']:
+            live.broker.unsubscribe(subscriber)
+            return
+        for event in live.broker.listen(subscriber):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            if event['type'] == 'finished':
+                return
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/live/<live_id>/download')
+def live_download(live_id):
+    """Download the picks made so far."""
+    live = _get_live_bid(live_id)
+    timezone = request.args.get('timezone', 'UTC')
+    try:
+        lines = live.export_lines('csv', timezone)
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    output_filename = secure_filename(f"user_item_assignments_{live.queue_group}_{timezone}.csv")
+    return Response(
+        lines,
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{output_filename}"'}
+    )
+
+@app.route('/sessions')
+def list_sessions():
+    """List stored bid sessions, newest first."""
+    return jsonify([info._asdict() for info in session_store.sessions()])
+
+@app.route('/sessions/<int:session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    """Delete a stored session and everything stored with it."""
+    try:
+        session_store.info(session_id)
+    except ValidationError:
+        abort(404)
+    session_store.delete(session_id)
+    return '', 204
+
+@app.route('/sessions/<int:session_id>/users/<int:user>')
+def session_user(session_id, user):
+    """Show what one user asked for and got in a stored session."""
+    record = session_store.user(session_id, user)
+    if record is None:
+        abort(404)
+    return jsonify(record._asdict())
+
+@app.route('/sessions/<int:session_id>/users/<int:user>/explain')
+def explain_user(session_id, user):
+    """Explain why a user didn't get each choice above the one they got."""
+    explanations = session_store.explain(session_id, user)
+    if explanations is None:
+        abort(404)
+    return jsonify([explanation.to_dict() for explanation in explanations])
+
+@app.route('/sessions/<int:session_id>/shifts')
+def session_shift(session_id):
+    """Show who asked for and who got one shift, given as ?shift=<label>."""
+    label = request.args.get('shift')
+    if not label:
+        return jsonify({'error': 'shift is required'}), 400
+    report = session_store.shift(session_id, label)
+    if report is None:
+        abort(404)
+    return jsonify(report)
+
+@app.route('/sessions/<int:session_id>/diff/<int:other_id>')
+def diff_sessions(session_id, other_id):
+    """Compare the assignments of two stored sessions, e.g. two re-runs of a bid."""
+    try:
+        before = session_store.assignment_rows(session_id)
+        after = session_store.assignment_rows(other_id)
+    except ValidationError:
+        abort(404)
+    return jsonify(diff_assignments(before, after, keep_unchanged=_keep_unchanged()).to_dict())
+
+@app.route('/sessions/<int:session_id>/assign', methods=['POST'])
+def reassign_session(session_id):
+    """Re-run assignment on a stored session and download the new result."""
+    timezone = request.form.get('timezone', 'UTC')
+    output_format = request.form.get('format', 'csv')
+    try:
+        info = session_store.info(session_id)
+    except ValidationError:
+        abort(404)
+    try:
+        engine = session_store.load(session_id)
+        engine.profiler = metrics
+        engine.assign_items(solver=request.form.get('solver', info.solver))
+        session_store.save_assignments(session_id, engine)
+        lines = engine.iter_export_lines(output_format, timezone)
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    extension = 'jsonl' if output_format == 'jsonl' else 'csv'
+    output_filename = secure_filename(
+        f"user_item_assignments_{info.queue_group or session_id}_{timezone}.{extension}")
+    return Response(
+        stream_with_context(lines),
+        mimetype='application/x-ndjson' if output_format == 'jsonl' else 'text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{output_filename}"',
+                 'X-Bid-Session': str(session_id)}
+    )
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Expose engine phase timings, counters, queue depth and cache usage to Prometheus."""
+    jobs = job_queue.stats()
+    cache = result_cache.stats()
+    gauges = {
+        'jobs_queued': jobs['queued'],
+        'jobs_running': jobs['running'],
+        # Finished jobs still held for download; these drop as jobs are pruned
+        'jobs_retained_done': jobs['done'],
+        'jobs_retained_failed': jobs['failed'],
+        'cache_entries': cache['entries'],
+        'cache_bytes': cache['bytes'],
+    }
+    counters = {
+        'jobs_completed_total': jobs['completed_total'],
+        'jobs_failed_total': jobs['failed_total'],
+        'cache_hits_total': cache['hits'],
+        'cache_misses_total': cache['misses'],
+    }
+    return Response(metrics.render(gauges, counters), mimetype='text/plain; version=0.0.4')
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Show the status of a background job."""
+    job = job_queue.get(job_id)
+    if job is None:
+        abort(404)
+    if _wants_json():
+        return jsonify(job.to_dict())
+    return render_template('job.html', job=job)
+
+@app.route('/jobs/<job_id>/download')
+def download_job(job_id):
+    """Download the result of a finished background job."""
+    job = job_queue.get(job_id)
+    if job is None:
+        abort(404)
+    if job.status != DONE:
+        return jsonify(job.to_dict()), 409
+    return send_file(
+        job.result_path,
+        as_attachment=True,
+        download_name=job.download_name,
+        mimetype=job.mimetype
+    )
+
 def main():
     """Entry point for the console script."""
     parser = argparse.ArgumentParser(description='Start the Shift Bidding Engine web interface.')
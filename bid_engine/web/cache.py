@@ -0,0 +1,198 @@
+"""
+Content-addressed cache of bid results.
+
+Results are keyed by hashes of the uploaded files and the run parameters
+that change the output, so re-uploading the same files (even under another
+queue group) is answered from disk without running the assignment.  Entries
+are evicted least recently used first once the cache outgrows its size
+limit, and dropped when they haven't been read for ``max_age`` seconds.
+"""
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import IO, Callable, Iterable, Iterator, Optional, Union
+
+# Bump when the export output or the key's parts change so stale entries stop matching
+CACHE_VERSION = 3
+# Seconds a temp file is left alone at startup, as another worker may still be writing it
+TEMP_GRACE = 24 * 3600
+
+
+def cache_key(*parts: Union[bytes, str, None]) -> str:
+    """
+    Hashes run inputs into a cache key.
+
+    Each part is length-prefixed so that moving bytes between neighbouring
+    parts gives a different key; None is distinct from an empty value.
+    """
+    digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for part in parts:
+        if part is None:
+            digest.update(b'-')
+            continue
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(f"{len(part)}:".encode())
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    LRU cache of result files on disk.
+
+    Args:
+        directory: Where entries are stored, one file per key
+        max_bytes: Total size the cache is trimmed back to after each store
+        max_age: Seconds since last use after which an entry expires
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = 256 * 1024 * 1024,
+                 max_age: float = 7 * 24 * 3600):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> (size, last used), least recently used first
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._total = 0
+        self._load()
+
+    def open(self, key: str) -> Optional[IO[bytes]]:
+        """
+        Opens the stored result for ``key`` and marks it used, or returns None.
+
+        The file is opened under the lock, so an eviction by another thread
+        can only unlink it once the caller holds it open.  The caller closes it.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry is not None and now - entry[1] > self.max_age:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                file = open(path, 'rb')
+            except FileNotFoundError:
+                # Removed from disk behind the cache's back
+                self._drop(key)
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries[key] = (entry[0], now)
+            self._entries.move_to_end(key)
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        return file
+
+    def store(self, key: str, source: Path) -> Path:
+        """Copies a finished result file into the cache."""
+        temp = self._temp_path(key)
+        shutil.copyfile(source, temp)
+        return self._commit(key, temp)
+
+    def tee(self, key: str, chunks: Iterable[Union[str, bytes]]) -> Iterator[Union[str, bytes]]:
+        """
+        Passes chunks through while writing them to the cache.
+
+        The entry is only stored once ``chunks`` is exhausted, so an
+        aborted download or a failing export leaves nothing behind.
+        """
+        temp = self._temp_path(key)
+        committed = False
+        try:
+            with open(temp, 'wb') as file:
+                for chunk in chunks:
+                    file.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+                    yield chunk
+            self._commit(key, temp)
+            committed = True
+        finally:
+            if not committed:
+                temp.unlink(missing_ok=True)
+
+    def run(self, key: str, work: Callable[[Path], None], result_path: Path) -> None:
+        """Fills ``result_path`` from the cache, or runs ``work`` and caches what it wrote."""
+        cached = self.open(key)
+        if cached is not None:
+            with cached, open(result_path, 'wb') as file:
+                shutil.copyfileobj(cached, file)
+            return
+        work(result_path)
+        self.store(key, result_path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key
+
+    def _temp_path(self, key: str) -> Path:
+        return self.directory / f"{key}.{uuid.uuid4().hex}.tmp"
+
+    def _commit(self, key: str, temp: Path) -> Path:
+        path = self._path(key)
+        size = temp.stat().st_size
+        os.replace(temp, path)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total -= previous[0]
+            self._entries[key] = (size, time.time())
+            self._total += size
+            self._evict()
+        return path
+
+    def _evict(self) -> None:
+        """Drops expired entries, then least recently used ones until under max_bytes."""
+        cutoff = time.time() - self.max_age
+        for key, (_, used) in list(self._entries.items()):
+            if used < cutoff:
+                self._drop(key)
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str) -> None:
+        size, _ = self._entries.pop(key)
+        self._total -= size
+        self._path(key).unlink(missing_ok=True)
+
+    def _load(self) -> None:
+        """Indexes entries left by a previous run, oldest use first."""
+        found = []
+        stale = time.time() - TEMP_GRACE
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            if entry.name.endswith('.tmp'):
+                # Left behind by an interrupted store, unless still being written
+                if stat.st_mtime < stale:
+                    Path(entry.path).unlink(missing_ok=True)
+                continue
+            found.append((stat.st_mtime, entry.name, stat.st_size))
+        for used, key, size in sorted(found):
+            self._entries[key] = (size, used)
+            self._total += size
+        self._evict()
@@ -0,0 +1,227 @@
+"""
+Background job queue for bid runs.
+
+Uploads in job mode are only hashed and spooled while the request
+streams in; a bounded thread pool imports, assigns and exports them, so
+the request returns a job ID straight away instead of holding a web
+worker for the whole run.  A place in the queue is reserved before the
+body is read, so a full queue is refused without reading the upload.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from ..core.store import SessionStore
+from .streaming import StreamedUpload
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+    pass
+
+
+class Job:
+    """One submitted bid run and its timings."""
+
+    def __init__(self, job_id: str, download_name: str, mimetype: str):
+        self.id = job_id
+        self.download_name = download_name
+        self.mimetype = mimetype
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.result_path: Optional[Path] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def wait_seconds(self) -> Optional[float]:
+        """Time spent queued before a worker picked the job up."""
+        if self.started_at is None:
+            return None
+        return self.started_at - self.submitted_at
+
+    @property
+    def run_seconds(self) -> Optional[float]:
+        """Time the worker spent running the job."""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'status': self.status,
+            'error': self.error,
+            'download_name': self.download_name,
+            'submitted_at': self.submitted_at,
+            'wait_seconds': self.wait_seconds,
+            'run_seconds': self.run_seconds,
+        }
+
+
+class JobQueue:
+    """
+    Bounded pool of worker threads running bid jobs.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queued``
+    more may wait, counting places reserved for submissions still being
+    read; beyond that reserve and submit raise QueueFullError.  Finished
+    jobs and their result files are dropped after ``retention`` seconds;
+    ``completed`` and ``failures`` count every job since startup.
+    """
+
+    def __init__(self, result_dir: Path, max_workers: int = 2, max_queued: int = 20,
+                 retention: float = 3600):
+        self.result_dir = Path(result_dir)
+        self.result_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bid-job')
+        self._jobs: Dict[str, Job] = {}
+        self._reserved = 0
+        self.completed = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> None:
+        """
+        Holds a place in the queue for a job whose input is still being read.
+
+        Pass ``reserved=True`` to submit to take the place, or call release
+        if the job is never submitted.
+
+        Raises:
+            QueueFullError: If max_queued jobs are already waiting or reserved
+        """
+        with self._lock:
+            self._prune()
+            self._check_capacity()
+            self._reserved += 1
+
+    def release(self) -> None:
+        """Gives back a place held by reserve."""
+        with self._lock:
+            self._reserved -= 1
+
+    def submit(self, work: Callable[[Path], None], download_name: str,
+               mimetype: str = 'text/csv', reserved: bool = False) -> Job:
+        """
+        Queues ``work(result_path)`` to run in the background.
+
+        Args:
+            work: Writes the job's result to the path it is given
+            download_name: File name the result is downloaded as
+            mimetype: Content type of the result
+            reserved: Take the place held by an earlier reserve call
+
+        Raises:
+            QueueFullError: If max_queued jobs are already waiting or reserved
+        """
+        with self._lock:
+            self._prune()
+            if reserved:
+                self._reserved -= 1
+            else:
+                self._check_capacity()
+            job = Job(uuid.uuid4().hex, download_name, mimetype)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def run_background(self, work: Callable[[], None]) -> Future:
+        """
+        Runs housekeeping work, such as storing a session, on the worker pool.
+
+        It isn't a job: it has no ID or result file and doesn't count
+        towards max_queued.
+        """
+        return self._executor.submit(work)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        """Queue depth, worker usage and timings of recent jobs."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        finished = [job for job in jobs if job.run_seconds is not None]
+        return {
+            'workers': self.max_workers,
+            'max_queued': self.max_queued,
+            'reserved': self._reserved,
+            'queued': sum(job.status == QUEUED for job in jobs),
+            'running': sum(job.status == RUNNING for job in jobs),
+            'done': sum(job.status == DONE for job in jobs),
+            'failed': sum(job.status == FAILED for job in jobs),
+            'completed_total': self.completed,
+            'failed_total': self.failures,
+            'mean_wait_seconds': _mean([job.wait_seconds for job in finished]),
+            'mean_run_seconds': _mean([job.run_seconds for job in finished]),
+            'jobs': [job.to_dict() for job in sorted(jobs, key=lambda j: j.submitted_at)],
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: Job, work: Callable[[Path], None]) -> None:
+        job.started_at = time.time()
+        job.status = RUNNING
+        result_path = self.result_dir / job.id
+        try:
+            work(result_path)
+            job.result_path = result_path
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if job.status == DONE:
+                    self.completed += 1
+                else:
+                    self.failures += 1
+
+    def _check_capacity(self) -> None:
+        if self._count(QUEUED) + self._reserved >= self.max_queued:
+            raise QueueFullError(f"Job queue is full ({self.max_queued} jobs waiting)")
+
+    def _count(self, status: str) -> int:
+        return sum(job.status == status for job in self._jobs.values())
+
+    def _prune(self) -> None:
+        """Drops finished jobs older than the retention period."""
+        cutoff = time.time() - self.retention
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and job.finished_at < cutoff:
+                del self._jobs[job_id]
+                if job.result_path is not None:
+                    job.result_path.unlink(missing_ok=True)
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+def run_bid(result_path: Path, upload: StreamedUpload, queue_group: str, timezone: str,
+            solver: str, output_format: str, store: Optional[SessionStore] = None) -> None:
+    """Imports a spooled upload, then runs assignment and export on its engine."""
+    try:
+        engine = upload.imported_engine()
+    finally:
+        upload.close()
+    engine.assign_items(solver=solver)
+    if store is not None:
+        store.save(engine, queue_group=queue_group)
+    engine.export_assignments(str(result_path), queue_group, timezone, output_format=output_format)
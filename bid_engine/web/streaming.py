@@ -0,0 +1,246 @@
+"""
+Streaming parser for bid upload forms.
+
+Reading ``request.files`` makes Werkzeug buffer each upload in full
+(spilling to temporary files past 500KB) before the view runs.  Bid forms
+are instead read from the request stream in fixed-size chunks through
+Werkzeug's sans-IO multipart decoder, and each CSV part is handed to the
+matching engine importer while it is still arriving.  Memory is bounded
+by a chunk and a CSV row on top of the engine's own tables, and nothing
+is written to disk.  Each file is hashed on the way through so results
+can still be cached by content.
+
+A caller that may answer from that cache can defer the imports instead:
+the files are then hashed into spooled temporary files (in memory up to
+``spool_size`` bytes each) and only imported if the engine is asked for.
+"""
+import hashlib
+import io
+import tempfile
+from typing import IO, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from werkzeug.sansio.multipart import Data, Epilogue, Event, Field, File, MultipartDecoder, NeedData
+
+from ..core.diff import AssignmentDiff, AssignmentRow, diff_assignments, iter_assignment_file
+from ..core.engine import BidEngine, ValidationError
+
+CHUNK_SIZE = 64 * 1024
+MAX_FIELD_SIZE = 64 * 1024
+
+# File field -> engine importer it is streamed into
+IMPORTERS = {
+    'selections': BidEngine.import_user_selections,
+    'rankings': BidEngine.import_user_rankings,
+    'capacity': BidEngine.import_shift_capacity,
+    'attributes': BidEngine.import_user_attributes,
+    'requirements': BidEngine.import_shift_requirements,
+}
+
+
+class StreamedUpload:
+    """
+    A bid form read from the request stream.
+
+    Attributes:
+        engine: Engine the uploaded CSV files were imported into
+        fields: Plain form fields; the first value wins if one is repeated
+        filenames: Client filename of each file field, '' if none was chosen
+        digests: SHA-256 hex digest of each imported (or deferred) file, by
+            field name
+        error: The ValidationError that stopped the import, if any
+    """
+
+    def __init__(self, engine: BidEngine):
+        self.engine = engine
+        self.fields: Dict[str, str] = {}
+        self.filenames: Dict[str, str] = {}
+        self.digests: Dict[str, str] = {}
+        self.error: Optional[ValidationError] = None
+        # (field name, spooled file) of deferred imports, in form order
+        self._deferred: List[Tuple[str, IO[bytes]]] = []
+
+    def imported_engine(self) -> BidEngine:
+        """
+        Returns the engine holding the uploaded files, importing deferred ones first.
+
+        Raises:
+            ValidationError: If one of the files failed to import
+        """
+        deferred, self._deferred = self._deferred, []
+        for name, spool in deferred:
+            with spool:
+                if self.error is None:
+                    spool.seek(0)
+                    try:
+                        IMPORTERS[name](self.engine, spool)
+                    except ValidationError as e:
+                        self.error = e
+        if self.error is not None:
+            raise self.error
+        return self.engine
+
+    def close(self) -> None:
+        """Discards deferred files that were never imported."""
+        deferred, self._deferred = self._deferred, []
+        for _, spool in deferred:
+            spool.close()
+
+
+class _PartReader(io.RawIOBase):
+    """Read-only binary stream over the chunks of one multipart part."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._pending = memoryview(b'')
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self._pending:
+            self._pending = memoryview(next(self._chunks, b''))
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def read_bid_upload(stream: BinaryIO, boundary: bytes, engine: BidEngine,
+                    allowed: Callable[[str], bool] = lambda filename: True,
+                    chunk_size: int = CHUNK_SIZE, spool_size: Optional[int] = None) -> StreamedUpload:
+    """
+    Parses a multipart bid form, importing its CSV files into ``engine``.
+
+    The parts named in IMPORTERS are imported as they are read; other file parts, files whose name ``allowed`` rejects and
+    everything after a failed import are read past without being kept.
+    An import error, including a body that ends inside a CSV part, is kept
+    on the result so the caller can still check the rest of the form first.
+
+    Args:
+        stream: Request body
+        boundary: Multipart boundary from the Content-Type header
+        engine: Engine to import into
+        allowed: Returns True for client filenames that may be imported
+        chunk_size: Bytes read from ``stream`` at a time
+        spool_size: If set, defer the imports to ``imported_engine()``,
+            keeping each file in memory up to this many bytes and in a
+            temporary file past that
+
+    Returns:
+        The parsed form
+
+    Raises:
+        ValidationError: If the body is not a multipart form or a plain
+            field is larger than MAX_FIELD_SIZE
+    """
+    upload = StreamedUpload(engine)
+    events = _events(stream, boundary, chunk_size)
+    for event in events:
+        if isinstance(event, Field):
+            value = _read_field(events, event.name)
+            upload.fields.setdefault(event.name, value)
+        elif isinstance(event, File):
+            digest = hashlib.sha256()
+            chunks = _part_data(events, digest)
+            importer = IMPORTERS.get(event.name)
+            imported = False
+            if (importer is not None and event.name not in upload.filenames
+                    and event.filename and allowed(event.filename) and upload.error is None):
+                if spool_size is not None:
+                    spool = tempfile.SpooledTemporaryFile(spool_size)
+                    upload._deferred.append((event.name, spool))
+                    try:
+                        for chunk in chunks:
+                            spool.write(chunk)
+                        upload.digests[event.name] = digest.hexdigest()
+                    except ValidationError as e:
+                        upload.error = e
+                    upload.filenames[event.name] = event.filename
+                    continue
+                try:
+                    importer(engine, io.BufferedReader(_PartReader(chunks), chunk_size))
+                    imported = True
+                except ValidationError as e:
+                    upload.error = e
+            upload.filenames.setdefault(event.name, event.filename or '')
+            # Skip whatever the importer didn't read
+            for _ in chunks:
+                pass
+            if imported:
+                upload.digests[event.name] = digest.hexdigest()
+    return upload
+
+
+def read_diff_upload(stream: BinaryIO, boundary: bytes, keep_unchanged: bool = False,
+                     chunk_size: int = CHUNK_SIZE) -> AssignmentDiff:
+    """
+    Diffs the ``before`` and ``after`` assignment files of a multipart form.
+
+    The before file is read into the diff's user table as it arrives and
+    the after file is streamed past it, so neither is buffered; the form
+    must send ``before`` first.  Other parts are read past.
+
+    Raises:
+        ValidationError: If the body is malformed, a file is missing or is
+            not an assignment export
+    """
+    events = _events(stream, boundary, chunk_size)
+
+    def part_rows(name: str) -> Iterator[AssignmentRow]:
+        for event in events:
+            if isinstance(event, Field):
+                _read_field(events, event.name)
+            elif isinstance(event, File):
+                chunks = _part_data(events)
+                if event.name == name:
+                    yield from iter_assignment_file(io.BufferedReader(_PartReader(chunks), chunk_size))
+                    for _ in chunks:
+                        pass
+                    return
+                for _ in chunks:
+                    pass
+        raise ValidationError(f"Missing {name} file; send before, then after")
+
+    diff = diff_assignments(part_rows('before'), part_rows('after'), keep_unchanged)
+    for _ in events:
+        pass
+    return diff
+
+
+def _events(stream: BinaryIO, boundary: bytes, chunk_size: int) -> Iterator[Event]:
+    """Yields multipart events, reading ``stream`` one chunk at a time as needed."""
+    decoder = MultipartDecoder(boundary)
+    while True:
+        try:
+            event = decoder.next_event()
+        except ValueError as e:
+            raise ValidationError(f"Malformed upload: {str(e)}")
+        if isinstance(event, Epilogue):
+            return
+        if isinstance(event, NeedData):
+            # None marks the end of the body; the decoder raises if a part is still open
+            decoder.receive_data(stream.read(chunk_size) or None)
+            continue
+        yield event
+
+
+def _part_data(events: Iterator[Event], digest=None) -> Iterator[bytes]:
+    """Yields the data of the current part, stopping at its end."""
+    for event in events:
+        if not isinstance(event, Data):
+            raise ValidationError("Malformed upload: unexpected part")
+        if digest is not None:
+            digest.update(event.data)
+        if event.data:
+            yield event.data
+        if not event.more_data:
+            return
+
+
+def _read_field(events: Iterator[Event], name: str) -> str:
+    value = bytearray()
+    for data in _part_data(events):
+        value += data
+        if len(value) > MAX_FIELD_SIZE:
+            raise ValidationError(f"Form field {name!r} is larger than {MAX_FIELD_SIZE} bytes")
+    return value.decode('utf-8', 'replace')
@@ -16,7 +16,7 @@ setup(
     include_package_data=True,
     install_requires=[
         "Flask>=3.0.2",
-        "pandas>=2.2.0",
+        "numpy>=1.24",
         "python-dotenv>=1.0.1",
         "Werkzeug>=3.0.1",
         "Flask-WTF>=1.2.1",
@@ -42,6 +42,7 @@ setup(
     entry_points={
         "console_scripts": [
             "shift-bid-engine=bid_engine.web.app:main",
+            "shift-bid=bid_engine.cli:main",
         ],
     },
 ) 
\ No newline at end of file
@@ -104,25 +104,26 @@ def ordinal(n):
         suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
     return f"{n}{suffix}"
 
-# Prompt the user for input file paths, queue group, and timezone
-user_selections_csv = input("Enter the path to the user selections CSV file: ")
-user_rankings_csv = input("Enter the path to the user rankings CSV file: ")
-queue_group = input("Enter the queue group: ")
-timezone = input("Enter the timezone: ")
+if __name__ == '__main__':
+    # Prompt the user for input file paths, queue group, and timezone
+    user_selections_csv = input("Enter the path to the user selections CSV file: ")
+    user_rankings_csv = input("Enter the path to the user rankings CSV file: ")
+    queue_group = input("Enter the queue group: ")
+    timezone = input("Enter the timezone: ")
 
-# Import user selections and rankings from CSV
-user_selections = import_user_selections(user_selections_csv)
-user_rankings = import_user_rankings(user_rankings_csv)
+    # Import user selections and rankings from CSV
+    user_selections = import_user_selections(user_selections_csv)
+    user_rankings = import_user_rankings(user_rankings_csv)
 
-# Assign items to users based on ranking
-assignments = assign_items_based_on_ranking(user_selections, user_rankings)
+    # Assign items to users based on ranking
+    assignments = assign_items_based_on_ranking(user_selections, user_rankings)
 
-# Define the output CSV file name
-output_csv = f"user_item_assignments_{queue_group}_{timezone}.csv"
+    # Define the output CSV file name
+    output_csv = f"user_item_assignments_{queue_group}_{timezone}.csv"
 
-# Export to CSV with ranking, full user selections, and assigned item index
-export_to_csv(assignments, user_rankings, user_selections, output_csv)
+    # Export to CSV with ranking, full user selections, and assigned item index
+    export_to_csv(assignments, user_rankings, user_selections, output_csv)
 
-# Display the assignments
-for user, (item, index) in assignments.items():
-    print(f"{user} is assigned {item} (their {ordinal(index)} choice)")
+    # Display the assignments
+    for user, (item, index) in assignments.items():
+        print(f"{user} is assigned {item} (their {ordinal(index)} choice)")